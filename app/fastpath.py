@@ -0,0 +1,179 @@
+import re
+import threading
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import markdown
+from app.response_cache import CachedResponse
+from rag_index import STOP_WORDS, SYNONYMS, TOKEN_PATTERN, normalize_term, synonym_terms, tokenize
+from rag_integration import RAGIntegration
+
+# "Key: value" lines inside a section, optionally as list items
+FIELD_PATTERN = re.compile(r"^(?:-\s*)?([A-Za-z][A-Za-z ]{0,30}):\s+(\S.*)$")
+
+# Words that say nothing about which fact is asked for
+FILLER_WORDS = frozenset("""
+s give show list share please say info information detail whats profile link url account id address
+""".split())
+
+
+class FastPathEntry:
+    """One answerable fact: a whole section or a single field of one."""
+
+    __slots__ = ("name", "keys", "terms", "specificity", "reply")
+
+    def __init__(self, name: str, keys: FrozenSet[str], terms: FrozenSet[str], specificity: int, text: str):
+        self.name = name
+        self.keys = keys
+        self.terms = terms
+        self.specificity = specificity
+        self.reply = CachedResponse(text, markdown.markdown(text), float("inf"))
+
+
+class FastPathTable:
+    """Entries of one version of the knowledge base, indexed by key term."""
+
+    def __init__(self, sections: Dict[str, str], aliases: Dict[str, Tuple[str, ...]] = SYNONYMS):
+        self.entries: List[FastPathEntry] = []
+        self.by_term: Dict[str, List[FastPathEntry]] = {}
+        self.aliases = synonym_terms(aliases)
+        self.filler = set(FILLER_WORDS)
+
+        for name, content in sections.items():
+            lines = content.split("\n")
+            section_terms = frozenset(_header_terms(name)) if name != "general" else frozenset()
+            fields = [(match.group(1).strip(), match.group(2).strip()) for match in map(FIELD_PATTERN.match, lines)
+                      if match]
+            field_terms = set()
+            for field, value in fields:
+                keys = frozenset(_header_terms(field))
+                if not keys:
+                    continue
+                field_terms |= keys
+                self._add(FastPathEntry(f"{name}/{field.lower()}", keys, keys | section_terms, 2,
+                                        f"**{field}:** {_value(value)}"))
+                # The owner's name is implied by every question
+                if name == "general" and field.lower() == "name":
+                    self.filler.update(tokenize(value))
+            if section_terms:
+                self._add(FastPathEntry(name, section_terms, section_terms | field_terms, 1,
+                                        f"**{name.title()}:**\n\n{_section_text(lines, fields)}"))
+
+    def _add(self, entry: FastPathEntry) -> None:
+        self.entries.append(entry)
+        for term in entry.terms:
+            self.by_term.setdefault(term, []).append(entry)
+
+    def terms(self, message: str) -> List[str]:
+        """The query terms that can decide the answer, with aliases resolved."""
+        terms = []
+        for token in TOKEN_PATTERN.findall(message.lower()):
+            if token in STOP_WORDS:
+                continue
+            term = normalize_term(token)
+            term = self.aliases.get(term, term)
+            if term not in self.filler:
+                terms.append(term)
+        return terms
+
+    def match(self, terms: List[str]) -> Tuple[Optional[FastPathEntry], float]:
+        """Return the best entry for ``terms`` and the share of the terms it explains.
+
+        Entries that explain more of the query win; among those, the one whose
+        own keys are named most, then fields over whole sections. A tie
+        between different entries has no answer.
+        """
+        query = set(terms)
+        candidates = {id(entry): entry for term in query for entry in self.by_term.get(term, ())}
+        best: Optional[FastPathEntry] = None
+        best_rank: Tuple[float, int, int] = (0.0, 0, 0)
+        tied = False
+        for entry in candidates.values():
+            rank = (len(query & entry.terms) / len(query), len(query & entry.keys), entry.specificity)
+            if rank > best_rank:
+                best, best_rank, tied = entry, rank, False
+            elif rank == best_rank:
+                tied = True
+        if best is None or tied:
+            return None, best_rank[0]
+        return best, best_rank[0]
+
+
+def _header_terms(text: str) -> List[str]:
+    """Terms of a header or field name; one made only of stop words ("About Me") keeps them,
+    so it can still be reached through its aliases."""
+    return tokenize(text) or [normalize_term(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+def _value(value: str) -> str:
+    return f"<{value}>" if value.startswith(("http://", "https://")) else value
+
+
+def _section_text(lines: List[str], fields: List[Tuple[str, str]]) -> str:
+    # Lists and "Key: value" lines become a markdown list; prose stays a paragraph
+    if len(fields) == len(lines) or all(line.startswith("- ") for line in lines):
+        items = []
+        for line in lines:
+            match = FIELD_PATTERN.match(line)
+            items.append(f"- **{match.group(1).strip()}:** {_value(match.group(2).strip())}" if match
+                         else line if line.startswith("- ") else f"- {line}")
+        return "\n".join(items)
+    return " ".join(lines)
+
+
+class FastPathRouter:
+    """Answers direct lookups of ``info.txt`` facts without calling the LLM.
+
+    A table of entries is compiled from the sections that ``RAGIntegration``
+    parses: one per section, keyed by the header terms, and one per
+    ``Key: value`` line, keyed by the field name. A message is answered from
+    the entry that explains the largest share of its terms (stop words,
+    filler and the owner's name aside) when that share reaches
+    ``min_confidence`` and no other entry explains as much; anything else
+    goes to the LLM. Messages with more than ``max_terms`` terms are left to
+    the LLM too. The table is rebuilt when the RAG sources are reloaded.
+    """
+
+    def __init__(self, rag: RAGIntegration, min_confidence: float = 1.0, max_terms: int = 6):
+        self.rag = rag
+        self.min_confidence = min_confidence
+        self.max_terms = max_terms
+        self._table: Optional[FastPathTable] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses = {"no_match": 0, "low_confidence": 0}
+
+    @property
+    def table(self) -> FastPathTable:
+        version = self.rag.version
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._table = FastPathTable(self.rag.sections)
+                    self._version = version
+        return self._table
+
+    def route(self, message: str) -> Optional[CachedResponse]:
+        """Return the reply to ``message`` if it is a direct lookup, else None."""
+        table = self.table
+        terms = table.terms(message)
+        if not terms or len(terms) > self.max_terms:
+            self.misses["no_match"] += 1
+            return None
+        entry, confidence = table.match(terms)
+        if entry is None or confidence < self.min_confidence:
+            self.misses["no_match" if confidence == 0 else "low_confidence"] += 1
+            return None
+        self.hits[entry.name] = self.hits.get(entry.name, 0) + 1
+        return entry.reply
+
+    def stats(self) -> Dict:
+        hits = sum(self.hits.values())
+        total = hits + sum(self.misses.values())
+        return {
+            "min_confidence": self.min_confidence,
+            "entries": len(self.table.entries),
+            "hits": hits,
+            "misses": dict(self.misses),
+            "hit_rate": hits / total if total else 0.0,
+            "hits_by_entry": dict(self.hits)
+        }
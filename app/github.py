@@ -0,0 +1,271 @@
+import os
+import time
+import base64
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional
+import httpx
+
+
+class CacheEntry:
+    """A cached GitHub API response along with its validators."""
+
+    def __init__(self, data: Any, etag: Optional[str], last_modified: Optional[str], fetched_at: float):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+
+class GitHubCache:
+    """TTL cache for GitHub API responses that revalidates with conditional requests.
+
+    Fresh entries are served without touching the network. Once an entry is
+    older than ``ttl`` it is revalidated with ``If-None-Match`` /
+    ``If-Modified-Since`` so an unchanged resource only costs a 304. If GitHub
+    errors or is unreachable, the last good copy is served instead. Requests
+    are made by ``AsyncGitHubFetcher``.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.entries: Dict[str, CacheEntry] = {}
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "revalidations": 0,
+            "stale": 0,
+            "errors": 0
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def conditional_headers(self, entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """Build the validator headers for revalidating an entry."""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """Return the entry for ``url`` if it is still fresh, counting a hit."""
+        entry = self.entries.get(url)
+        if entry is not None and time.monotonic() - entry.fetched_at < self.ttl:
+            self._count("hits")
+            return entry
+        return None
+
+    def store(self, url: str, status: int, headers: Any, data: Any) -> Any:
+        """Record a response for ``url`` and return the data to serve.
+
+        ``status`` is the HTTP status and ``data`` the already parsed body
+        (ignored for 304s and errors).
+        """
+        entry = self.entries.get(url)
+        now = time.monotonic()
+
+        if status == 304 and entry is not None:
+            entry.fetched_at = now
+            self._count("revalidations")
+            return entry.data
+
+        if 200 <= status < 300 or status == 404:
+            # A 404 (e.g. a repository without a README) is cached as a
+            # negative entry so it is not requested again until the TTL expires.
+            self.entries[url] = CacheEntry(
+                data=data if status != 404 else None,
+                etag=headers.get("ETag"),
+                last_modified=headers.get("Last-Modified"),
+                fetched_at=now
+            )
+            self._count("misses")
+            return self.entries[url].data
+
+        return self.fallback(url)
+
+    def fallback(self, url: str) -> Any:
+        """Serve the last good copy of ``url`` after an upstream error."""
+        self._count("errors")
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        self._count("stale")
+        return entry.data
+
+    def etags(self, urls: List[str]) -> List[Optional[str]]:
+        """The ETag of the cached response for each of ``urls``, if any."""
+        return [entry.etag if entry is not None else None for entry in map(self.entries.get, urls)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and the number of cached entries."""
+        with self._lock:
+            stats = dict(self.counters)
+        stats["entries"] = len(self.entries)
+        return stats
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self.entries.clear()
+
+    def export_state(self) -> Dict[str, Any]:
+        """Checkpoint columns; fetch times are stored as wall-clock time."""
+        offset = time.time() - time.monotonic()
+        return {
+            "entries": [
+                [url, entry.data, entry.etag, entry.last_modified, entry.fetched_at + offset]
+                for url, entry in list(self.entries.items())
+            ]
+        }
+
+    def load_state(self, state: Any) -> None:
+        """Replace the entries with those saved by ``export_state``; they keep their age across the restart."""
+        offset = time.monotonic() - time.time()
+        self.entries = {
+            url: CacheEntry(data, etag, last_modified, fetched_at + offset)
+            for url, data, etag, last_modified, fetched_at in state["entries"]
+        }
+
+
+def decode_readme(payload: Dict[str, Any]) -> str:
+    """Decode the base64 content of a GitHub README response."""
+    return base64.b64decode(payload["content"]).decode("utf-8")
+
+
+github_cache = GitHubCache(ttl=float(os.getenv("GITHUB_CACHE_TTL", "300")))
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+
+def _github_headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}",
+        "Accept": "application/vnd.github.v3+json"
+    }
+
+
+def build_github_context(username: str, repos_data: List[Dict[str, Any]], readmes: List[Optional[str]],
+                         events_data: List[Dict[str, Any]],
+                         readme_etags: Optional[List[Optional[str]]] = None) -> Dict[str, Any]:
+    """Assemble the context dict used by the prompt from raw API payloads.
+
+    ``readme_etags`` lets the README index tell which READMEs changed.
+    """
+    repos_info = []
+    readme_etags = readme_etags or [None] * len(repos_data)
+    for repo, readme_content, readme_etag in zip(repos_data, readmes, readme_etags):
+        # Get repository details
+        repo_info = {
+            "name": repo["name"],
+            "description": repo.get("description", ""),
+            "language": repo.get("language", ""),
+            "stars": repo.get("stargazers_count", 0),
+            "forks": repo.get("forks_count", 0),
+            "readme": readme_content or "",
+            "readme_etag": readme_etag,
+            "url": repo.get("html_url", ""),
+            "created_at": repo.get("created_at", ""),
+            "updated_at": repo.get("updated_at", "")
+        }
+        repos_info.append(repo_info)
+
+    return {
+        "username": username,
+        "repositories": repos_info,
+        "recent_activity": [event["type"] for event in events_data[:5]]
+    }
+
+
+class AsyncGitHubFetcher:
+    """Fetches GitHub context concurrently over one pooled keep-alive client.
+
+    READMEs are requested in parallel, bounded by ``max_concurrency``, so the
+    wall-clock time of a refresh tracks the slowest README rather than the sum
+    of all of them. Responses go through a ``GitHubCache``.
+    """
+
+    def __init__(self, cache: Optional[GitHubCache] = None, max_concurrency: int = 8,
+                 timeout: float = 10.0, client: Optional[httpx.AsyncClient] = None):
+        self.cache = cache or github_cache
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._client = client
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def get_json(self, url: str, headers: Dict[str, str], parse: Optional[Callable[[Any], Any]] = None) -> Any:
+        """Fetch ``url`` through the cache, returning ``None`` if nothing is available.
+
+        ``parse`` is applied to the decoded JSON of a 200 response before it is
+        cached, so expensive post-processing only runs when the resource changes.
+        """
+        entry = self.cache.lookup(url)
+        if entry is not None:
+            return entry.data
+
+        request_headers = dict(headers)
+        request_headers.update(self.cache.conditional_headers(self.cache.entries.get(url)))
+        async with self.semaphore:
+            try:
+                response = await self.client.get(url, headers=request_headers)
+                data = None
+                if 200 <= response.status_code < 300:
+                    data = response.json()
+                    if parse is not None:
+                        data = parse(data)
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                print(f"GitHub request failed for {url}: {str(e)}")
+                return self.cache.fallback(url)
+
+        return self.cache.store(url, response.status_code, response.headers, data)
+
+    async def get_github_context(self) -> Dict[str, Any]:
+        """Fetch repositories, READMEs and recent activity for ``GITHUB_USER``."""
+        username = os.getenv("GITHUB_USER")
+        headers = _github_headers()
+
+        repos_data, events_data = await asyncio.gather(
+            self.get_json(f"{GITHUB_API_URL}/users/{username}/repos", headers),
+            self.get_json(f"{GITHUB_API_URL}/users/{username}/events", headers)
+        )
+        repos_data = repos_data or []
+
+        readme_urls = [f"{GITHUB_API_URL}/repos/{username}/{repo['name']}/readme" for repo in repos_data]
+        readmes = await asyncio.gather(*(self.get_json(url, headers, parse=decode_readme) for url in readme_urls))
+
+        return build_github_context(username, repos_data, readmes, events_data or [],
+                                    self.cache.etags(readme_urls))
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+github_fetcher = AsyncGitHubFetcher(
+    max_concurrency=int(os.getenv("GITHUB_MAX_CONCURRENCY", "8")),
+    timeout=float(os.getenv("GITHUB_TIMEOUT", "10"))
+)
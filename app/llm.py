@@ -0,0 +1,209 @@
+import os
+import time
+import random
+import asyncio
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+import groq
+from groq import AsyncGroq
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class LLMOverloaded(Exception):
+    """Raised when the LLM wait queue is full and a request is rejected."""
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight LLM calls and bounds how many callers may wait for a slot.
+
+    Callers beyond ``max_in_flight`` queue up; once ``max_queue`` callers are
+    already waiting, new ones are rejected immediately with ``LLMOverloaded``.
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_queue: int = 32):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    def is_full(self) -> bool:
+        """Whether a new caller would be rejected right now."""
+        return self.in_flight >= self.max_in_flight and self.waiting >= self.max_queue
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one in-flight slot for the duration of the block."""
+        if self.is_full():
+            self.rejected += 1
+            raise LLMOverloaded("LLM queue is full, try again later")
+
+        start = time.monotonic()
+        if self.semaphore.locked():
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                await self.semaphore.acquire()
+            finally:
+                self.waiting -= 1
+        else:
+            await self.semaphore.acquire()
+
+        wait = time.monotonic() - start
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and wait-time metrics."""
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "peak_queue_depth": self.peak_waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait_seconds": self.max_wait
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    """Async Groq completions behind a concurrency limiter with retry and backoff.
+
+    429, 408/409 and 5xx responses as well as connection errors are retried
+    up to ``max_retries`` times with full-jitter exponential backoff; a
+    ``Retry-After`` header from the server is used as the minimum delay.
+    """
+
+    def __init__(self, client: AsyncGroq, limiter: ConcurrencyLimiter, model: str = "llama-3.1-8b-instant",
+                 max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.client = client
+        self.limiter = limiter
+        self.model = model
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number ``attempt`` (0-based)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def _create(self, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                return await self.client.chat.completions.create(model=self.model, **kwargs)
+            except groq.APIStatusError as e:
+                retryable = e.status_code in RETRYABLE_STATUS or e.status_code >= 500
+                if not retryable or attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                delay = self.backoff(attempt, parse_retry_after(e.response.headers.get("retry-after")))
+            except groq.APIConnectionError:
+                if attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def complete(self, messages: List[Dict[str, str]], **kwargs: Any) -> Any:
+        """Run a non-streaming completion and return the full response."""
+        async with self.limiter.slot():
+            response = await self._create(messages=messages, stream=False, **kwargs)
+        self._count_usage(getattr(response, "usage", None))
+        return response
+
+    async def stream(self, messages: List[Dict[str, str]], **kwargs: Any) -> AsyncIterator[str]:
+        """Yield completion text as it is generated.
+
+        The in-flight slot is held until the stream is exhausted. Retries only
+        happen while opening the stream, never after tokens have been sent.
+        Closing the generator early, e.g. on a timeout or a client disconnect,
+        closes the HTTP response too.
+        """
+        async with self.limiter.slot():
+            stream = await self._create(messages=messages, stream=True, **kwargs)
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    # Groq reports usage on the last chunk, under x_groq
+                    x_groq = getattr(chunk, "x_groq", None)
+                    self._count_usage(getattr(chunk, "usage", None) or getattr(x_groq, "usage", None))
+
+    def _count_usage(self, usage: Any) -> None:
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return limiter metrics together with retry counters."""
+        stats = self.limiter.stats()
+        stats["requests"] = self.requests
+        stats["retries"] = self.retries
+        stats["failures"] = self.failures
+        stats["prompt_tokens"] = self.prompt_tokens
+        stats["completion_tokens"] = self.completion_tokens
+        return stats
+
+
+def create_llm_client() -> LLMClient:
+    """Build the LLM client from environment configuration."""
+    return LLMClient(
+        AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            timeout=float(os.getenv("GROQ_TIMEOUT", "60")),
+            max_retries=0
+        ),
+        ConcurrencyLimiter(
+            max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "8")),
+            max_queue=int(os.getenv("LLM_MAX_QUEUE", "32"))
+        ),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "3"))
+    )
@@ -1,22 +1,60 @@
 import os
-from fastapi import FastAPI, Request, WebSocket
-from fastapi.responses import HTMLResponse
+import json
+import uuid
+import gc
+import asyncio
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.websockets import WebSocketState
 from pydantic import BaseModel
-from groq import Groq
-import requests
 from dotenv import load_dotenv
 from mcp.protocol import MCPProtocol
 from mcp.context import ContextManager
 from mcp.memory import MemoryManager
+from mcp.sqlite_memory import SQLiteMemoryBackend
+from mcp.store import ContextStore
+from mcp.conversation import ConversationStore
 from rag_integration import RAGIntegration
-import markdown
+from app.github import github_fetcher
+from app.snapshot import SnapshotRefresher
+from app.persistence import StateCheckpointer
+from app.shared import SharedState
+from app.llm import LLMOverloaded, create_llm_client
+from app.response_cache import ResponseCache
+from app.fastpath import FastPathRouter
+from app.pipeline import HTTP_SESSION, RequestPipeline, StageTimeout
+from app.prompt import PromptBuilder, estimate_tokens
+from app.metrics import Family, StageProfiler, registry
 
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if checkpointer.restore():
+        # Restored items live as long as the process; move them out of the
+        # collector's generations so full collections stop rescanning them
+        gc.freeze()
+    refresher.start()
+    checkpointer.start()
+    try:
+        yield
+    finally:
+        # Buffered memory writes go out first, whatever fails after them
+        memory_manager.close()
+        try:
+            await refresher.stop()
+            await checkpointer.stop()
+            await github_fetcher.aclose()
+        finally:
+            if shared_state is not None:
+                shared_state.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -34,256 +72,345 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 # Initialize MCP components
-mcp_protocol = MCPProtocol()
-context_manager = ContextManager(mcp_protocol)
-memory_manager = MemoryManager(mcp_protocol)
-rag = RAGIntegration()
+mcp_protocol = MCPProtocol(relevance_half_life=float(os.getenv("CONTEXT_RELEVANCE_HALF_LIFE", "900")))
+context_store = ContextStore(
+    mcp_protocol,
+    max_items_per_session=int(os.getenv("CONTEXT_MAX_ITEMS_PER_SESSION", "200")),
+    max_bytes_per_session=int(os.getenv("CONTEXT_MAX_BYTES_PER_SESSION", "1000000")),
+    max_sessions=int(os.getenv("CONTEXT_MAX_SESSIONS", "1000")),
+    max_total_items=int(os.getenv("CONTEXT_MAX_TOTAL_ITEMS", "50000")),
+    max_total_bytes=int(os.getenv("CONTEXT_MAX_TOTAL_BYTES", "100000000"))
+)
+conversations = ConversationStore(
+    max_turns=int(os.getenv("CONVERSATION_MAX_TURNS", "20")),
+    token_budget=int(os.getenv("CONVERSATION_TOKEN_BUDGET", "1000")),
+    max_sessions=int(os.getenv("CONTEXT_MAX_SESSIONS", "1000")),
+    tokenizer=estimate_tokens
+)
+context_manager = ContextManager(mcp_protocol, context_store, conversations)
+
+# State shared by worker processes (uvicorn --workers N) on this host
+shared_state = SharedState(os.environ["SHARED_STATE_PATH"]) if os.getenv("SHARED_STATE_PATH") else None
+
+# Workers sharing state also share memories, through one SQLite file
+memory_backend = None
+if os.getenv("MEMORY_BACKEND", "sqlite" if shared_state is not None else "memory") == "sqlite":
+    memory_backend = SQLiteMemoryBackend(os.getenv("MEMORY_DB_PATH", "memory.db"))
+memory_manager = MemoryManager(mcp_protocol, memory_backend)
+rag = RAGIntegration(
+    os.getenv("RAG_SOURCES", "info.txt").split(os.pathsep),
+    mode=os.getenv("RAG_MODE", "keyword")
+)
+
+# Background refresher for GitHub and RAG context
+refresher = SnapshotRefresher(
+    github_fetcher,
+    rag,
+    interval=float(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "300")),
+    rag_poll_interval=float(os.getenv("RAG_POLL_INTERVAL", "5")),
+    shared=shared_state,
+    shared_poll_interval=float(os.getenv("SHARED_POLL_INTERVAL", "5"))
+)
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", str(3 * refresher.interval)))
+
+llm = create_llm_client()
+response_cache = ResponseCache(
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", "16000000")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    shared=shared_state
+)
+prompt_builder = PromptBuilder(token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "2000")))
+
+# Direct answers to lookups of info.txt facts, without the LLM
+fast_path = FastPathRouter(
+    rag,
+    min_confidence=float(os.getenv("FASTPATH_MIN_CONFIDENCE", "1.0"))
+) if os.getenv("FASTPATH_ENABLED", "true").lower() == "true" else None
+
+# Warm restarts: context, memory and caches are checkpointed to disk
+checkpointer = StateCheckpointer(
+    os.getenv("STATE_CHECKPOINT_PATH", ""),
+    {
+        "protocol": mcp_protocol,
+        "context_store": context_store,
+        "github_cache": github_fetcher.cache,
+        "snapshot": refresher,
+        "response_cache": response_cache
+    },
+    interval=float(os.getenv("STATE_CHECKPOINT_INTERVAL", "300"))
+)
+
+# Per-stage latency metrics; a sampled share of requests also gets a breakdown
+profiler = StageProfiler(
+    sample_rate=float(os.getenv("METRICS_PROFILE_SAMPLE_RATE", "0")),
+    path=os.getenv("METRICS_PROFILE_PATH") or None
+)
 
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+@registry.collector
+def service_metrics():
+    """Counters the components keep themselves, read at scrape time."""
+    github = github_fetcher.cache.stats()
+    llm_stats = llm.stats()
+    cache = response_cache.stats()
+    yield Family("chatbot_upstream_requests_total", "counter", "Requests sent to upstream APIs",
+                 ("service", "outcome")) \
+        .add(github["misses"], "github", "ok") \
+        .add(github["revalidations"], "github", "not_modified") \
+        .add(github["errors"], "github", "error") \
+        .add(llm_stats["requests"] - llm_stats["retries"] - llm_stats["failures"], "groq", "ok") \
+        .add(llm_stats["retries"], "groq", "retried") \
+        .add(llm_stats["failures"], "groq", "error")
+    yield Family("chatbot_cache_lookups_total", "counter", "Cache lookups by result", ("cache", "result")) \
+        .add(github["hits"], "github", "hit") \
+        .add(github["misses"] + github["revalidations"] + github["errors"], "github", "miss") \
+        .add(cache["hits"], "response", "hit") \
+        .add(cache["misses"], "response", "miss") \
+        .add(cache["coalesced"], "response", "coalesced")
+    yield Family("chatbot_llm_tokens_total", "counter", "Tokens reported by the Groq API", ("kind",)) \
+        .add(llm_stats["prompt_tokens"], "prompt") \
+        .add(llm_stats["completion_tokens"], "completion")
+    yield Family("chatbot_llm_in_flight", "gauge", "Completions currently running").add(llm_stats["in_flight"])
+    yield Family("chatbot_llm_queued", "gauge", "Requests waiting for a completion slot") \
+        .add(llm_stats["queue_depth"])
+    yield Family("chatbot_llm_rejected_total", "counter", "Requests refused because the LLM queue was full") \
+        .add(llm_stats["rejected"])
+    yield Family("chatbot_response_cache_bytes", "gauge", "Approximate size of the LLM reply cache") \
+        .add(cache["bytes"])
+    yield Family("chatbot_context_items", "gauge", "Stored context items").add(context_store.total_items)
+    if fast_path is not None:
+        fast = fast_path.stats()
+        yield Family("chatbot_fastpath_total", "counter", "Messages checked for a direct answer by result",
+                     ("result",)) \
+            .add(fast["hits"], "hit") \
+            .add(fast["misses"]["low_confidence"], "low_confidence") \
+            .add(fast["misses"]["no_match"], "no_match")
+        hits = Family("chatbot_fastpath_hits_total", "counter", "Direct answers by table entry", ("entry",))
+        for entry, count in fast["hits_by_entry"].items():
+            hits.add(count, entry)
+        yield hits
+    status = refresher.status()
+    if status["age_seconds"] is not None:
+        yield Family("chatbot_snapshot_age_seconds", "gauge", "Age of the GitHub/RAG snapshot") \
+            .add(status["age_seconds"])
+
+# Shared request pipeline; stages without their own timeout get the default
+pipeline = RequestPipeline(
+    refresher,
+    context_manager,
+    rag,
+    memory_manager,
+    prompt_builder,
+    response_cache,
+    llm,
+    timeouts={"llm": float(os.getenv("PIPELINE_LLM_TIMEOUT", "120"))},
+    default_timeout=float(os.getenv("PIPELINE_STAGE_TIMEOUT", "10")),
+    fast_path=fast_path
+)
 
 class ChatMessage(BaseModel):
     message: str
+    session_id: Optional[str] = None
+
+class ChatBatch(BaseModel):
+    messages: List[str]
+
+BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", "100"))
 
 @app.get("/", response_class=HTMLResponse)
 async def get_chat_page(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+def check_admin_token(token):
+    expected = os.getenv("ADMIN_TOKEN")
+    if expected and token != expected:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.get("/ready")
+async def readiness():
+    status = refresher.status()
+    if not status["ready"] or status["age_seconds"] > SNAPSHOT_MAX_AGE:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+@app.post("/admin/refresh")
+async def admin_refresh(x_admin_token: str = Header(None)):
+    check_admin_token(x_admin_token)
+    await refresher.refresh()
+    return refresher.status()
+
+@app.get("/admin/stats")
+async def admin_stats(x_admin_token: str = Header(None)):
+    check_admin_token(x_admin_token)
+    return {
+        "snapshot": refresher.status(),
+        "github_cache": github_fetcher.cache.stats(),
+        "llm": llm.stats(),
+        "context_store": context_store.stats(),
+        "relevance": mcp_protocol.relevance.stats(),
+        "conversations": conversations.stats(),
+        "memory": memory_manager.backend.stats(),
+        "rag": rag.stats(),
+        "response_cache": response_cache.stats(),
+        "prompt": prompt_builder.stats(),
+        "pipeline": pipeline.stats(),
+        "checkpoint": checkpointer.stats(),
+        "shared": await asyncio.to_thread(shared_state.stats) if shared_state is not None else None,
+        "profiler": {"sample_rate": profiler.sample_rate, "sampled": profiler.sampled}
+    }
+
+@app.get("/admin/profile")
+async def admin_profile(x_admin_token: str = Header(None)):
+    """Stage breakdowns of the most recently sampled requests."""
+    check_admin_token(x_admin_token)
+    return {"sample_rate": profiler.sample_rate, "requests": list(profiler.recent)}
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.post("/chat")
 async def chat(message: ChatMessage):
     try:
-        # Get context from all sources
-        github_context = get_github_context()
-        context_manager.add_github_context(github_context)
-        
-        rag_context = rag.get_context()
-        context_manager.add_rag_context(rag_context)
-
-        # Add user message to context
-        context_manager.add_user_message(message.message)
-
-        # Search RAG content for relevant information
-        rag_search = rag.search_content(message.message)
-        rag_data = rag_search["content"] if rag_search["found"] else "No specific information found in the records."
-
-        # Get relevant memories
-        relevant_memories = memory_manager.get_relevant_memories(message.message)
-
-        # Create system message with repository information
-        repo_info = ""
-        for repo in github_context["repositories"]:
-            repo_info += f"\nRepository: {repo['name']}\n"
-            repo_info += f"Description: {repo['description']}\n"
-            repo_info += f"Language: {repo['language']}\n"
-            if repo['readme']:
-                repo_info += f"README Preview: {repo['readme'][:200]}...\n"
-            repo_info += "---\n"
-
-        system_message = f"""Hi! I'm Dhurkesh's personal assistant. I have access to his information and can help answer questions about him.
-
-        Here's what I know about Dhurkesh:
-        {rag_data}
-
-        Repository Information:
-        {repo_info}
-
-        Recent Activity:
-        {', '.join(github_context['recent_activity'])}
-        
-        I can help you with:
-        - Information about Dhurkesh's background and experience
-        - Details about his projects and work
-        - Any other questions you might have about him
-        
-        Please feel free to ask your question, and I'll provide a helpful response based on the available information."""
-
-        # Generate response with Groq
-        chat_completion = groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": message.message
-                }
-            ],
-            temperature=0.5,
-            max_tokens=1024,
-            stream=False,
-        )
-
-        # Convert the response to HTML using markdown
-        response_text = chat_completion.choices[0].message.content
-        response_html = markdown.markdown(response_text)
-
-        # Add assistant response to context
-        context_manager.add_assistant_message(response_text)
-
-        # Store important information in memory
-        if "project" in message.message.lower():
-            memory_manager.add_important_fact(f"User asked about projects: {message.message}")
-
-        return {"response": response_html}
-
+        with profiler.request("chat"):
+            reply, usage = await pipeline.answer(message.message, message.session_id or HTTP_SESSION)
+            return {"response": reply.html, "context_tokens": usage}
+
+    except LLMOverloaded as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    except StageTimeout as e:
+        return JSONResponse(status_code=504, content={"error": str(e)})
     except Exception as e:
         return {"error": str(e)}
 
+@app.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """Stream the reply as Server-Sent Events: start, delta..., end."""
+    if llm.limiter.is_full():
+        return JSONResponse(status_code=503, content={"error": "LLM queue is full, try again later"})
+
+    async def events():
+        try:
+            with profiler.request("chat_stream"):
+                async with aclosing(pipeline.run(message.message, message.session_id or HTTP_SESSION)) as replies:
+                    async for kind, payload in replies:
+                        if kind == "start":
+                            yield sse_event("start", {"context_tokens": payload})
+                        elif kind == "delta":
+                            yield sse_event("delta", {"content": payload})
+                        else:
+                            yield sse_event("end", {"response": payload.html})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/chat/batch")
+async def chat_batch(batch: ChatBatch):
+    """Answer many questions at once, one NDJSON line per question as each completes."""
+    if len(batch.messages) > BATCH_MAX_MESSAGES:
+        return JSONResponse(status_code=413, content={"error": f"At most {BATCH_MAX_MESSAGES} messages per batch"})
+
+    async def lines():
+        try:
+            with profiler.request("chat_batch"):
+                # Fan out up to the LLM's own limit, without filling its wait queue
+                async with aclosing(pipeline.batch(batch.messages, llm.limiter.max_in_flight)) as results:
+                    async for indices, reply, usage in results:
+                        for index in indices:
+                            line = {"index": index, "message": batch.messages[index]}
+                            if isinstance(reply, Exception):
+                                line["error"] = str(reply)
+                            else:
+                                line.update(response=reply.html, context_tokens=usage)
+                            yield json.dumps(line) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def answer_websocket(websocket: WebSocket, message: str, session_id: str) -> None:
+    """Stream the reply to one message as start/delta/end frames."""
+    try:
+        with profiler.request("ws"):
+            async with aclosing(pipeline.run(message, session_id)) as replies:
+                async for kind, payload in replies:
+                    if kind == "start":
+                        await websocket.send_json({"type": "start", "context_tokens": payload})
+                    elif kind == "delta":
+                        await websocket.send_json({"type": "delta", "content": payload})
+                    else:
+                        await websocket.send_json({"type": "end", "html": payload.html})
+        print("Response sent successfully")
+    except (WebSocketDisconnect, asyncio.CancelledError):
+        raise
+    except Exception as e:
+        print(f"Error processing message: {str(e)}")
+        if websocket.application_state == WebSocketState.CONNECTED:
+            await websocket.send_json({"type": "error", "message": f"Error: {str(e)}"})
+
+async def read_websocket(websocket: WebSocket, incoming: asyncio.Queue) -> None:
+    """Queue incoming messages until the client disconnects, then return."""
+    try:
+        while True:
+            message = await websocket.receive_text()
+            print(f"Received message: {message}")
+            await incoming.put(message)
+    except WebSocketDisconnect:
+        print("WebSocket disconnected")
+
+async def unless_disconnected(task: asyncio.Task, reader: asyncio.Task) -> bool:
+    """Wait for ``task``; if the reader finishes first the client is gone and ``task`` is cancelled.
+
+    The cancelled task unwinds on its own (releasing its LLM slot and
+    failing its cache entry) while the connection is torn down.
+    """
+    await asyncio.wait({task, reader}, return_when=asyncio.FIRST_COMPLETED)
+    if task.done():
+        return True
+    task.cancel()
+    # Nobody awaits it any more; don't log what it raises while unwinding
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return False
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
+    # Each connection owns its own context session
+    session_id = f"ws-{uuid.uuid4().hex}"
+    reader = None
     try:
         await websocket.accept()
         print("WebSocket connection accepted")
-        
+
+        # Messages are read by a separate task so a disconnect is noticed,
+        # and the reply in progress cancelled, while a reply is being built
+        incoming: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.create_task(read_websocket(websocket, incoming))
         while True:
-            try:
-                message = await websocket.receive_text()
-                print(f"Received message: {message}")
-                
-                # Get context from all sources
-                github_context = get_github_context()
-                context_manager.add_github_context(github_context)
-                
-                rag_context = rag.get_context()
-                context_manager.add_rag_context(rag_context)
-
-                # Add user message to context
-                context_manager.add_user_message(message)
-
-                # Search RAG content for relevant information
-                rag_search = rag.search_content(message)
-                rag_data = rag_search["content"] if rag_search["found"] else "No specific information found in the records."
-
-                # Get relevant memories
-                relevant_memories = memory_manager.get_relevant_memories(message)
-
-                # Create system message with repository information
-                repo_info = ""
-                for repo in github_context["repositories"]:
-                    repo_info += f"\nRepository: {repo['name']}\n"
-                    repo_info += f"Description: {repo['description']}\n"
-                    repo_info += f"Language: {repo['language']}\n"
-                    if repo['readme']:
-                        repo_info += f"README Preview: {repo['readme'][:200]}...\n"
-                    repo_info += "---\n"
-
-                system_message = f"""Hi! I'm Dhurkesh's personal assistant. I have access to his information and can help answer questions about him.
-
-                Here's what I know about Dhurkesh:
-                {rag_data}
-
-                Repository Information:
-                {repo_info}
-
-                Recent Activity:
-                {', '.join(github_context['recent_activity'])}
-                
-                I can help you with:
-                - Information about Dhurkesh's background and experience
-                - Details about his projects and work
-                - Any other questions you might have about him
-                
-                Please feel free to ask your question, and I'll provide a helpful response based on the available information."""
-
-                # Generate response with Groq
-                chat_completion = groq_client.chat.completions.create(
-                    model="llama-3.1-8b-instant",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": system_message
-                        },
-                        {
-                            "role": "user",
-                            "content": message
-                        }
-                    ],
-                    temperature=0.5,
-                    max_tokens=1024,
-                    stream=False,
-                )
-
-                # Convert the response to HTML using markdown
-                response_text = chat_completion.choices[0].message.content
-                response_html = markdown.markdown(response_text)
-
-                # Add assistant response to context
-                context_manager.add_assistant_message(response_text)
-
-                # Store important information in memory
-                if "project" in message.lower():
-                    memory_manager.add_important_fact(f"User asked about projects: {message}")
-
-                await websocket.send_text(response_html)
-                print("Response sent successfully")
-                
-            except Exception as e:
-                print(f"Error processing message: {str(e)}")
-                await websocket.send_text(f"Error: {str(e)}")
-                
+            next_message = asyncio.create_task(incoming.get())
+            if not await unless_disconnected(next_message, reader):
+                break
+            answer = asyncio.create_task(answer_websocket(websocket, next_message.result(), session_id))
+            if not await unless_disconnected(answer, reader):
+                print("Client left mid-reply; reply cancelled")
+                break
+            answer.result()
+
+    except WebSocketDisconnect:
+        print("WebSocket disconnected")
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
     finally:
+        if reader is not None:
+            reader.cancel()
+        context_manager.end_session(session_id)
         try:
             await websocket.close()
         except:
             pass
-
-def get_github_context():
-    token = os.getenv("GITHUB_TOKEN")
-    username = os.getenv("GITHUB_USER")
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-    
-    # Get user repositories
-    repos_response = requests.get(
-        f"https://api.github.com/users/{username}/repos",
-        headers=headers
-    )
-    repos_data = repos_response.json() if repos_response.ok else []
-    
-    # Process each repository
-    repos_info = []
-    for repo in repos_data:
-        repo_name = repo["name"]
-        
-        # Get README content
-        readme_response = requests.get(
-            f"https://api.github.com/repos/{username}/{repo_name}/readme",
-            headers=headers
-        )
-        
-        readme_content = ""
-        if readme_response.ok:
-            import base64
-            readme_content = base64.b64decode(readme_response.json()["content"]).decode("utf-8")
-        
-        # Get repository details
-        repo_info = {
-            "name": repo_name,
-            "description": repo.get("description", ""),
-            "language": repo.get("language", ""),
-            "stars": repo.get("stargazers_count", 0),
-            "forks": repo.get("forks_count", 0),
-            "readme": readme_content,
-            "url": repo.get("html_url", ""),
-            "created_at": repo.get("created_at", ""),
-            "updated_at": repo.get("updated_at", "")
-        }
-        repos_info.append(repo_info)
-    
-    # Get user activity
-    events_response = requests.get(
-        f"https://api.github.com/users/{username}/events",
-        headers=headers
-    )
-    events = [event["type"] for event in events_response.json()[:5]] if events_response.ok else []
-    
-    return {
-        "username": username,
-        "repositories": repos_info,
-        "recent_activity": events
-    }
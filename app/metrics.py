@@ -0,0 +1,256 @@
+import json
+import time
+import random
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds in seconds: stages range from microseconds (cache lookups)
+# to tens of seconds (slow completions)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing value per label combination."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Counts of observations per bucket, with their sum, per label combination."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (last one is +Inf), sum]
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+class Family:
+    """Samples read from a component's own counters when metrics are scraped."""
+
+    def __init__(self, name: str, type: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.type = type
+        self.help = help
+        self.label_names = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def add(self, value: float, *labels: str) -> "Family":
+        self.values[labels] = value
+        return self
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class MetricsRegistry:
+    """Metrics served at ``/metrics`` in the Prometheus text format.
+
+    Hot-path metrics (counters and histograms) are updated in place from the
+    event loop. Components that already keep their own counters are exposed
+    through collectors instead: callables returning ``Family`` objects, run
+    only when the metrics are scraped.
+    """
+
+    def __init__(self):
+        self.metrics: List[Any] = []
+        self.collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, collect: Callable[[], Iterable[Family]]) -> Callable[[], Iterable[Family]]:
+        """Register ``collect``; usable as a decorator."""
+        self.collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        families = list(self.metrics)
+        for collect in self.collectors:
+            try:
+                families.extend(collect())
+            except Exception as e:
+                print(f"Metrics collector failed: {str(e)}")
+        lines = []
+        for family in families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            lines.extend(family.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "chatbot_stage_seconds", "Time spent in each stage of handling a message", ("stage",)
+)
+REQUEST_SECONDS = registry.histogram(
+    "chatbot_request_seconds", "Time to handle a chat message, end to end", ("endpoint",)
+)
+ERRORS = registry.counter("chatbot_errors_total", "Chat messages that failed", ("endpoint", "error"))
+
+
+class RequestTrace:
+    """Stage timings of one sampled request."""
+
+    __slots__ = ("endpoint", "started", "stages")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.time()
+        self.stages: List[Tuple[str, float]] = []
+
+
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+class span:
+    """Time a stage: ``with span("rag_search"): ...``.
+
+    The duration goes to the stage histogram and, if the current request is
+    being profiled, to its trace.
+    """
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        record_stage(self.stage, time.perf_counter() - self.start)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record a stage measured by the caller (e.g. time to the first token)."""
+    STAGE_SECONDS.observe(seconds, stage)
+    trace = _trace.get()
+    if trace is not None:
+        trace.stages.append((stage, seconds))
+
+
+class StageProfiler:
+    """Opt-in per-request stage breakdowns.
+
+    A ``sample_rate`` share of requests is traced; the breakdown of each is
+    kept in a ring of the last ``keep`` and, with ``path``, appended to that
+    file as one JSON line. With ``sample_rate`` 0 only the aggregate
+    histograms are recorded.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, path: Optional[str] = None, keep: int = 100):
+        self.sample_rate = sample_rate
+        self.path = path
+        self.recent: "deque[Dict[str, Any]]" = deque(maxlen=keep)
+        self.sampled = 0
+
+    def request(self, endpoint: str) -> "RequestTimer":
+        """Time one request to ``endpoint``: ``with profiler.request("ws"): ...``."""
+        return RequestTimer(self, endpoint)
+
+    def dump(self, trace: RequestTrace, seconds: float, error: Optional[str]) -> None:
+        breakdown = {
+            "endpoint": trace.endpoint,
+            "started": trace.started,
+            "seconds": round(seconds, 6),
+            "stages": [[stage, round(elapsed, 6)] for stage, elapsed in trace.stages],
+            "error": error
+        }
+        self.recent.append(breakdown)
+        self.sampled += 1
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(breakdown) + "\n")
+
+
+class RequestTimer:
+    """Context manager behind ``StageProfiler.request``."""
+
+    __slots__ = ("profiler", "endpoint", "start", "trace", "token")
+
+    def __init__(self, profiler: StageProfiler, endpoint: str):
+        self.profiler = profiler
+        self.endpoint = endpoint
+
+    def __enter__(self) -> "RequestTimer":
+        self.trace = None
+        if self.profiler.sample_rate > 0 and random.random() < self.profiler.sample_rate:
+            self.trace = RequestTrace(self.endpoint)
+        self.token = _trace.set(self.trace)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        seconds = time.perf_counter() - self.start
+        _trace.reset(self.token)
+        REQUEST_SECONDS.observe(seconds, self.endpoint)
+        if exc is not None:
+            ERRORS.inc(self.endpoint, exc_type.__name__)
+        if self.trace is not None:
+            self.profiler.dump(self.trace, seconds, None if exc is None else str(exc))
@@ -0,0 +1,137 @@
+import time
+import asyncio
+from typing import Any, Dict, Optional
+from mcp.checkpoint import read_checkpoint, write_checkpoint
+
+
+class StateCheckpointer:
+    """Saves service state to a checkpoint file and restores it at startup.
+
+    ``components`` maps section names to objects with ``export_state`` and
+    ``load_state``; they are restored in that order, and ``load_state``
+    replaces a component's state. If any section fails to load, the
+    sections loaded before it are put back as they were, so the components
+    never start out of step with each other. Columns are collected
+    on the event loop, so the checkpoint is consistent, and encoded and
+    written from a worker thread. A background task saves every
+    ``interval`` seconds and ``stop`` saves once more on shutdown.
+    """
+
+    def __init__(self, path: str, components: Dict[str, Any], interval: float = 300.0):
+        self.path = path
+        self.components = components
+        self.interval = interval
+        self.saves = 0
+        self.restored_sections = 0
+        self.last_save: Optional[Dict[str, Any]] = None
+        self.last_restore: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def restore(self) -> bool:
+        """Load the checkpoint, if there is one; returns whether anything was restored."""
+        if not self.enabled:
+            return False
+        start = time.perf_counter()
+        try:
+            checkpoint = read_checkpoint(self.path)
+            if checkpoint is None:
+                return False
+            try:
+                self._load(checkpoint)
+            finally:
+                checkpoint.close()
+        except Exception as e:
+            print(f"State restore from {self.path} failed: {str(e)}")
+            self.last_error = str(e)
+            return False
+        self.last_restore = {
+            "seconds": round(time.perf_counter() - start, 3),
+            "written_at": checkpoint.written_at
+        }
+        return True
+
+    def _load(self, checkpoint: Any) -> None:
+        sections = checkpoint.sections()
+        names = [name for name in self.components if name in sections]
+        # At startup the components are empty, so this costs next to nothing
+        previous = {name: self.components[name].export_state() for name in names}
+        loaded = []
+        try:
+            for name in names:
+                loaded.append(name)
+                self.components[name].load_state(checkpoint.section(name))
+        except Exception:
+            # The failing section may be half loaded, so it is put back too
+            for name in reversed(loaded):
+                try:
+                    self.components[name].load_state(previous[name])
+                except Exception as e:
+                    print(f"Rolling back section {name} failed: {str(e)}")
+            raise
+        self.restored_sections += len(names)
+
+    async def save(self) -> int:
+        """Write a checkpoint now and return its size in bytes."""
+        if not self.enabled:
+            return 0
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            start = time.perf_counter()
+            state = {name: component.export_state() for name, component in self.components.items()}
+            size = await asyncio.to_thread(write_checkpoint, self.path, state)
+            self.saves += 1
+            self.last_error = None
+            self.last_save = {
+                "seconds": round(time.perf_counter() - start, 3),
+                "bytes": size,
+                "at": time.time()
+            }
+            return size
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+            except Exception as e:
+                print(f"State checkpoint failed: {str(e)}")
+                self.last_error = str(e)
+
+    def start(self) -> None:
+        """Start saving periodically."""
+        if self.enabled and self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic task and write a final checkpoint."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.save()
+        except Exception as e:
+            print(f"State checkpoint failed: {str(e)}")
+            self.last_error = str(e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "interval": self.interval,
+            "saves": self.saves,
+            "restored_sections": self.restored_sections,
+            "last_save": self.last_save,
+            "last_restore": self.last_restore,
+            "last_error": self.last_error
+        }
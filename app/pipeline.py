@@ -0,0 +1,286 @@
+import time
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple
+import markdown
+from app.fastpath import FastPathRouter
+from app.llm import LLMClient
+from app.metrics import record_stage, span
+from app.prompt import PromptBuilder
+from app.response_cache import CachedResponse, ResponseCache
+from app.snapshot import SnapshotRefresher
+from mcp.context import ContextManager
+from mcp.memory import MemoryManager
+from rag_integration import RAGIntegration
+
+# Session used for /chat requests that do not name one; it keeps no history
+HTTP_SESSION = "http"
+
+
+class StageTimeout(Exception):
+    """Raised when a pipeline stage takes longer than its timeout."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} did not finish within {timeout:g}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class RequestPipeline:
+    """Turns a user message into a reply; shared by ``/chat``, ``/chat/stream`` and ``/ws``.
+
+    The lookups that do not depend on each other run concurrently: the
+    snapshot is awaited on the event loop while the RAG search runs in a
+    worker thread, and the conversation context is recorded while it runs.
+    The search only reads the RAG state it starts with, which is never
+    changed once published. The memory lookup runs in a thread only for a
+    backend that does I/O; the in-memory one reads protocol state that the
+    loop changes, so it runs on the loop. Markdown rendering also runs in a
+    thread.
+
+    Every stage is bounded by its entry in ``timeouts`` (``default_timeout``
+    when it has none) and raises ``StageTimeout`` when it runs over. For
+    the ``llm`` stage the timeout covers the whole reply. Cancelling the
+    caller, e.g. when a WebSocket client goes away, cancels the stage in
+    progress and releases the LLM slot.
+
+    With a ``fast_path`` router, direct lookups of ``info.txt`` facts are
+    answered from it and skip the lookups and the LLM altogether.
+    """
+
+    def __init__(self, refresher: SnapshotRefresher, context_manager: ContextManager, rag: RAGIntegration,
+                 memory_manager: MemoryManager, prompt_builder: PromptBuilder, response_cache: ResponseCache,
+                 llm: LLMClient, timeouts: Optional[Dict[str, float]] = None, default_timeout: float = 10.0,
+                 fast_path: Optional[FastPathRouter] = None):
+        self.refresher = refresher
+        self.context_manager = context_manager
+        self.rag = rag
+        self.memory_manager = memory_manager
+        self.prompt_builder = prompt_builder
+        self.response_cache = response_cache
+        self.llm = llm
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.fast_path = fast_path
+        self.timed_out: Dict[str, int] = {}
+
+    def timeout(self, stage: str) -> float:
+        return self.timeouts.get(stage, self.default_timeout)
+
+    def _deadline(self, stage: str) -> Optional[float]:
+        timeout = self.timeout(stage)
+        return asyncio.get_running_loop().time() + timeout if timeout > 0 else None
+
+    def _timed_out(self, stage: str) -> StageTimeout:
+        self.timed_out[stage] = self.timed_out.get(stage, 0) + 1
+        return StageTimeout(stage, self.timeout(stage))
+
+    async def _stage(self, stage: str, awaitable: Awaitable[Any]) -> Any:
+        with span(stage):
+            try:
+                # Cancels in place rather than in a wrapper task, so
+                # cancellation from the caller reaches the stage directly
+                async with asyncio.timeout_at(self._deadline(stage)):
+                    return await awaitable
+            except TimeoutError:
+                raise self._timed_out(stage) from None
+
+    async def _memories(self, message: str) -> List[Any]:
+        if self.memory_manager.backend.blocking:
+            return await asyncio.to_thread(self.memory_manager.get_prompt_memories, message)
+        return self.memory_manager.get_prompt_memories(message)
+
+    async def prepare(self, message: str, session_id: str) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+        """Record the user message and build the chat messages for the LLM.
+
+        Also returns the prompt tokens used per context section.
+        """
+        if not self.refresher.ready:
+            # Building the first snapshot also indexes the READMEs searched below
+            await self._stage("snapshot", self.refresher.current())
+        lookups = asyncio.gather(
+            self._stage("rag_search", asyncio.to_thread(self.rag.search, message)),
+            self._stage("memory", self._memories(message))
+        )
+        try:
+            snapshot = await self._stage("snapshot", self.refresher.current())
+            with span("context"):
+                self.context_manager.add_github_context(snapshot.github, session_id)
+                self.context_manager.add_rag_context(snapshot.rag_context, session_id)
+                # Earlier turns of this conversation; the shared HTTP session has no history
+                history, history_tokens = ([], 0) if session_id == HTTP_SESSION else \
+                    self.context_manager.get_conversation_history(session_id)
+                self.context_manager.add_user_message(message, session_id)
+            rag_result, memories = await lookups
+        except BaseException:
+            lookups.cancel()
+            raise
+
+        # Pack the best RAG hits, memories and repositories into the token budget
+        with span("prompt"):
+            return self.prompt_builder.messages(snapshot, rag_result, message, memories, history, history_tokens)
+
+    async def render(self, text: str) -> str:
+        """Convert a reply to HTML off the event loop."""
+        return await self._stage("markdown", asyncio.to_thread(markdown.markdown, text))
+
+    def record(self, message: str, response_text: str, session_id: str) -> None:
+        """Record the assistant reply in context and memory."""
+        with span("record"):
+            self.context_manager.add_assistant_message(response_text, session_id)
+            # Store important information in memory
+            if "project" in message.lower():
+                self.memory_manager.add_user_query(message)
+
+    async def reply(self, message: str, messages: List[Dict[str, str]]) -> CachedResponse:
+        """Return the reply for ``messages``, from the response cache when possible."""
+        async def compute():
+            completion = await self._stage(
+                "llm", self.llm.complete(messages, temperature=0.5, max_tokens=1024)
+            )
+            response_text = completion.choices[0].message.content
+            return response_text, await self.render(response_text)
+
+        reply, _ = await self.response_cache.get_or_compute(self.response_cache.key(message, messages), compute)
+        return reply
+
+    async def stream_reply(self, message: str, messages: List[Dict[str, str]]) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ``("delta", text)`` chunks and finally ``("end", CachedResponse)``.
+
+        Cached replies are sent as a single delta. Identical questions asked while
+        one is already streaming wait for it instead of calling the LLM again;
+        if it fails, one of the waiters takes over and the others wait for it.
+        """
+        key = self.response_cache.key(message, messages)
+        while True:
+            reply = await self.response_cache.get(key)
+            if reply is None:
+                if self.response_cache.claim(key):
+                    break
+                reply = await self.response_cache.wait(key)
+            if reply is not None:
+                yield "delta", reply.text
+                yield "end", reply
+                return
+
+        parts = []
+        start = time.perf_counter()
+        deadline = self._deadline("llm")
+        try:
+            async with aclosing(self.llm.stream(messages, temperature=0.5, max_tokens=1024)) as stream:
+                while True:
+                    # One deadline for the whole reply, first token included
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            delta = await anext(stream)
+                    except StopAsyncIteration:
+                        break
+                    except TimeoutError:
+                        raise self._timed_out("llm") from None
+                    if not parts:
+                        record_stage("llm_first_token", time.perf_counter() - start)
+                    parts.append(delta)
+                    yield "delta", delta
+        except BaseException as e:
+            self.response_cache.fail(key, e)
+            raise
+        # Includes the time the client took to accept each delta
+        record_stage("llm", time.perf_counter() - start)
+        response_text = "".join(parts)
+        try:
+            html = await self.render(response_text)
+        except BaseException as e:
+            self.response_cache.fail(key, e)
+            raise
+        yield "end", await self.response_cache.resolve(key, response_text, html)
+
+    async def run(self, message: str, session_id: str, stream: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+        """Answer ``message``: yields ``("start", usage)``, then ``("delta", text)``
+        chunks when streaming, and ``("end", CachedResponse)`` once the reply
+        has been recorded."""
+        if self.fast_path is not None:
+            with span("fast_path"):
+                reply = self.fast_path.route(message)
+            if reply is not None:
+                self.context_manager.add_user_message(message, session_id)
+                yield "start", {"total": 0}
+                if stream:
+                    yield "delta", reply.text
+                self.record(message, reply.text, session_id)
+                yield "end", reply
+                return
+
+        messages, usage = await self.prepare(message, session_id)
+        yield "start", usage
+        if not stream:
+            reply = await self.reply(message, messages)
+            self.record(message, reply.text, session_id)
+            yield "end", reply
+            return
+        async with aclosing(self.stream_reply(message, messages)) as events:
+            async for kind, payload in events:
+                if kind == "end":
+                    self.record(message, payload.text, session_id)
+                yield kind, payload
+
+    async def answer(self, message: str, session_id: str) -> Tuple[CachedResponse, Dict[str, int]]:
+        """Return the whole reply to ``message`` and the prompt token usage."""
+        async with aclosing(self.run(message, session_id, stream=False)) as events:
+            async for kind, payload in events:
+                if kind == "start":
+                    usage = payload
+                else:
+                    return payload, usage
+        raise RuntimeError("Pipeline ended without a reply")
+
+    async def batch(self, messages: List[str],
+                    concurrency: int = 8) -> AsyncIterator[Tuple[List[int], Any, Dict[str, int]]]:
+        """Answer independent questions together, yielding results in completion order.
+
+        Each result is ``(indices, reply, usage)``: the positions in
+        ``messages`` of one question (identical questions, as the response
+        cache compares them, are answered once) and its ``CachedResponse``,
+        or the exception that question failed with. All questions share one
+        snapshot; at most ``concurrency`` are answered at a time, and the LLM
+        calls also count against the global limit. Batch questions have no
+        conversation history and are not recorded in the context.
+        """
+        groups: Dict[str, List[int]] = {}
+        for index, message in enumerate(messages):
+            groups.setdefault(self.response_cache.normalize(message), []).append(index)
+        snapshot = await self._stage("snapshot", self.refresher.current())
+        slots = asyncio.Semaphore(concurrency)
+
+        async def answer(indices: List[int]) -> Tuple[List[int], Any, Dict[str, int]]:
+            message = messages[indices[0]]
+            try:
+                if self.fast_path is not None:
+                    with span("fast_path"):
+                        reply = self.fast_path.route(message)
+                    if reply is not None:
+                        return indices, reply, {"total": 0}
+                async with slots:
+                    rag_result, memories = await asyncio.gather(
+                        self._stage("rag_search", asyncio.to_thread(self.rag.search, message)),
+                        self._stage("memory", self._memories(message))
+                    )
+                    with span("prompt"):
+                        chat, usage = self.prompt_builder.messages(snapshot, rag_result, message, memories)
+                    return indices, await self.reply(message, chat), usage
+            except Exception as e:
+                return indices, e, {}
+
+        tasks = [asyncio.create_task(answer(indices)) for indices in groups.values()]
+        try:
+            for result in asyncio.as_completed(tasks):
+                yield await result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "timeouts": dict(self.timeouts, default=self.default_timeout),
+            "timed_out": dict(self.timed_out),
+            "fast_path": self.fast_path.stats() if self.fast_path is not None else None
+        }
@@ -0,0 +1,324 @@
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from app.snapshot import ContextSnapshot
+from rag_index import tokenize
+from rag_integration import NO_RESULTS, SearchResult
+
+PROMPT_HEADER = """Hi! I'm Dhurkesh's personal assistant. I have access to his information and can help answer questions about him.
+
+    Here's what I know about Dhurkesh:
+    """
+
+MEMORY_HEADER = "\n\n    Things I remember from earlier conversations:\n"
+REPOSITORY_HEADER = "\n\n    Repository Information:\n    "
+ACTIVITY_HEADER = "\n\n    Recent Activity:\n    "
+
+PROMPT_FOOTER = (
+    "\n    \n"
+    "    I can help you with:\n"
+    "    - Information about Dhurkesh's background and experience\n"
+    "    - Details about his projects and work\n"
+    "    - Any other questions you might have about him\n"
+    "    \n"
+    "    Please feel free to ask your question, and I'll provide a helpful response based on the available information."
+)
+
+# Relative value of one unit of relevance in each section when the packer
+# ranks snippets against each other.
+SECTION_WEIGHTS = {
+    "rag": 1.0,
+    "memories": 0.8,
+    "repositories": 0.6
+}
+
+TOKEN_ESTIMATE_PATTERN = re.compile(r"\w{1,6}|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate of the LLM token count of ``text``.
+
+    Words are counted in pieces of up to six characters and every punctuation
+    mark as one token, which tracks BPE tokenizers closely enough for
+    budgeting without loading a vocabulary.
+    """
+    return len(TOKEN_ESTIMATE_PATTERN.findall(text))
+
+
+def render_repository(repo: Dict[str, Any]) -> str:
+    """Render one repository entry of the prompt.
+
+    README text is not included here; the passages relevant to the query
+    come in with the RAG hits.
+    """
+    return "".join((
+        f"\nRepository: {repo['name']}\n",
+        f"Description: {repo['description']}\n",
+        f"Language: {repo['language']}\n",
+        "---\n"
+    ))
+
+
+class Snippet:
+    """One candidate piece of context competing for the token budget.
+
+    ``group_tokens`` is the cost of the header the snippet needs, charged
+    only for the first snippet of its ``group`` that is packed.
+    """
+
+    __slots__ = ("section", "score", "tokens", "order", "payload", "group", "group_tokens")
+
+    def __init__(self, section: str, score: float, tokens: int, order: int, payload: Any,
+                 group: Optional[str] = None, group_tokens: int = 0):
+        self.section = section
+        self.score = score
+        self.tokens = tokens
+        self.order = order
+        self.payload = payload
+        self.group = group
+        self.group_tokens = group_tokens
+
+
+class ContextPacker:
+    """Greedily fills a token budget with the highest ranked snippets.
+
+    Ranked candidates are taken best first; one that does not fit is skipped
+    and the next, possibly smaller, one is tried. ``filler`` snippets (context
+    unrelated to the query) then use up what is left, in the order given,
+    until less than ``filler_min_tokens`` remain. Returns the packed snippets and the tokens they use per section.
+    """
+
+    def __init__(self, budget: int = 0):
+        self.budget = budget
+
+    def pack(self, candidates: Iterable[Snippet], available: int,
+             filler: Iterable[Snippet] = (), filler_min_tokens: int = 0) -> Tuple[List[Snippet], Dict[str, int]]:
+        packed: List[Snippet] = []
+        used: Dict[str, int] = {section: 0 for section in SECTION_WEIGHTS}
+        groups = set()
+        for snippet in sorted(candidates, key=lambda s: (-s.score, s.order)):
+            cost = snippet.tokens + (snippet.group_tokens if snippet.group not in groups else 0)
+            if cost > available:
+                continue
+            available -= cost
+            groups.add(snippet.group)
+            used[snippet.section] += cost
+            packed.append(snippet)
+        for snippet in filler:
+            if available < filler_min_tokens:
+                break
+            if snippet.tokens <= available:
+                available -= snippet.tokens
+                used[snippet.section] += snippet.tokens
+                packed.append(snippet)
+        return packed, used
+
+
+class RepositoryEntry:
+    """A repository rendered once per snapshot, with its size and search terms."""
+
+    __slots__ = ("text", "tokens", "terms")
+
+    def __init__(self, repo: Dict[str, Any], tokenizer: Callable[[str], int]):
+        self.text = render_repository(repo)
+        self.tokens = tokenizer(self.text)
+        self.terms = frozenset(tokenize(self.text))
+
+
+class PromptBuilder:
+    """Builds the system prompt within a token budget.
+
+    Everything that depends only on the snapshot (the rendered repositories,
+    their token counts and search terms, the recent activity and fixed text)
+    is prepared once per ``ContextSnapshot`` version. Per request the RAG
+    hits, relevant memories and repositories are ranked against the query and
+    packed into ``token_budget`` tokens by ``ContextPacker``. A budget of 0
+    includes everything.
+    """
+
+    def __init__(self, token_budget: int = 0, tokenizer: Callable[[str], int] = estimate_tokens):
+        self.tokenizer = tokenizer
+        self.packer = ContextPacker(token_budget)
+        self._version: Optional[int] = None
+        self._repositories: List[Snippet] = []
+        self._repository_terms: Dict[str, List[int]] = {}
+        self._repository_block = ""
+        self._repository_tokens = 0
+        self._smallest_repository = 0
+        self._suffix = ""
+        self._fixed_tokens = 0
+        self._memory_header_tokens = tokenizer(MEMORY_HEADER)
+        self.builds = 0
+        self.rebuilds = 0
+        self.last_usage: Dict[str, int] = {}
+        self.total_usage: Dict[str, int] = {}
+
+    @property
+    def token_budget(self) -> int:
+        return self.packer.budget
+
+    def _prepare(self, snapshot: ContextSnapshot) -> None:
+        github = snapshot.github
+        entries = [RepositoryEntry(repo, self.tokenizer) for repo in github["repositories"]]
+        self._repositories = [
+            Snippet("repositories", 0.0, entry.tokens, order, entry) for order, entry in enumerate(entries)
+        ]
+        self._repository_terms = {}
+        for order, entry in enumerate(entries):
+            for term in entry.terms:
+                self._repository_terms.setdefault(term, []).append(order)
+        self._repository_block = "".join(entry.text for entry in entries)
+        self._repository_tokens = sum(entry.tokens for entry in entries)
+        self._smallest_repository = min((entry.tokens for entry in entries), default=0)
+        self._suffix = "".join((ACTIVITY_HEADER, ", ".join(github["recent_activity"]), PROMPT_FOOTER))
+        self._fixed_tokens = sum(map(self.tokenizer, (PROMPT_HEADER, REPOSITORY_HEADER, self._suffix)))
+        self._version = snapshot.version
+        self.rebuilds += 1
+
+    def _rag_snippets(self, rag: SearchResult) -> List[Snippet]:
+        if not rag.hits:
+            return []
+        best = rag.hits[0][0] or 1.0
+        header_tokens: Dict[str, int] = {}
+        snippets = []
+        for order, hit in enumerate(rag.hits):
+            section = hit[1]
+            if section not in header_tokens:
+                header_tokens[section] = self.tokenizer(section) + 1 if section != "general" else 0
+            snippets.append(Snippet(
+                "rag", SECTION_WEIGHTS["rag"] * hit[0] / best, self.tokenizer(rag.text(hit)), order, hit,
+                group=f"rag:{section}", group_tokens=header_tokens[section]
+            ))
+        return snippets
+
+    def _memory_snippets(self, memories: Iterable[Any]) -> List[Snippet]:
+        snippets = []
+        for order, memory in enumerate(memories):
+            text = f"    - {memory.content}"
+            snippets.append(Snippet(
+                "memories", SECTION_WEIGHTS["memories"] * memory.importance_score, self.tokenizer(text), order, text,
+                group="memories", group_tokens=self._memory_header_tokens
+            ))
+        return snippets
+
+    def _repository_matches(self, query: str) -> Dict[int, float]:
+        """Share of the query terms found in each matching repository.
+
+        Terms found in more than half of the repositories do not tell them
+        apart and are ignored, like stop words.
+        """
+        common = max(1, len(self._repositories) // 2)
+        terms = set(tokenize(query))
+        matches: Dict[int, float] = {}
+        for term in terms:
+            orders = self._repository_terms.get(term, ())
+            if len(orders) > common:
+                continue
+            for order in orders:
+                matches[order] = matches.get(order, 0.0) + 1.0 / len(terms)
+        return matches
+
+    def build(self, snapshot: ContextSnapshot, rag: Union[SearchResult, str], query: str = "",
+              memories: Iterable[Any] = ()) -> Tuple[str, Dict[str, int]]:
+        """Return the system prompt for ``query`` and the tokens used per section.
+
+        ``rag`` is either the search result to pack or preformatted text that
+        is always included whole.
+        """
+        if snapshot.version != self._version:
+            self._prepare(snapshot)
+        if isinstance(rag, SearchResult):
+            rag_snippets = self._rag_snippets(rag)
+            fixed_tokens = self._fixed_tokens + (0 if rag.hits else self.tokenizer(NO_RESULTS))
+        else:
+            rag_snippets = []
+            fixed_tokens = self._fixed_tokens + self.tokenizer(rag)
+        memory_snippets = self._memory_snippets(memories)
+
+        if self.token_budget > 0:
+            matches = self._repository_matches(query)
+            candidates = [
+                Snippet("repositories", SECTION_WEIGHTS["repositories"] * overlap, self._repositories[order].tokens,
+                        order, self._repositories[order].payload)
+                for order, overlap in matches.items()
+            ]
+            candidates.extend(rag_snippets)
+            candidates.extend(memory_snippets)
+            filler = (snippet for snippet in self._repositories if snippet.order not in matches)
+            packed, usage = self.packer.pack(candidates, max(0, self.token_budget - fixed_tokens), filler,
+                                             self._smallest_repository)
+            candidate_count = len(self._repositories) + len(rag_snippets) + len(memory_snippets)
+        else:
+            # No budget: everything goes in, no ranking needed
+            packed = rag_snippets + memory_snippets
+            usage = {section: 0 for section in SECTION_WEIGHTS}
+            for snippet in packed:
+                usage[snippet.section] += snippet.tokens
+            usage["rag"] += sum({s.group: s.group_tokens for s in rag_snippets}.values())
+            usage["memories"] += self._memory_header_tokens if memory_snippets else 0
+            usage["repositories"] = self._repository_tokens
+            candidate_count = len(packed)
+
+        by_section: Dict[str, List[Snippet]] = {section: [] for section in SECTION_WEIGHTS}
+        for snippet in packed:
+            by_section[snippet.section].append(snippet)
+        if isinstance(rag, SearchResult):
+            rag_text = rag.render([snippet.payload for snippet in by_section["rag"]])
+            if rag.hits and not by_section["rag"]:
+                fixed_tokens += self.tokenizer(NO_RESULTS)
+        else:
+            rag_text = rag
+        memory_text = ""
+        if by_section["memories"]:
+            memory_text = MEMORY_HEADER + "\n".join(s.payload for s in sorted(by_section["memories"], key=lambda s: s.order))
+        if self.token_budget <= 0 or len(by_section["repositories"]) == len(self._repositories):
+            repo_text = self._repository_block
+        else:
+            repo_text = "".join(s.payload.text for s in sorted(by_section["repositories"], key=lambda s: s.order))
+
+        usage["fixed"] = fixed_tokens
+        usage["total"] = fixed_tokens + sum(usage[section] for section in SECTION_WEIGHTS)
+        usage["dropped"] = candidate_count - len(packed)
+        self._record(usage)
+        prompt = "".join((PROMPT_HEADER, rag_text, memory_text, REPOSITORY_HEADER, repo_text, self._suffix))
+        return prompt, usage
+
+    def messages(self, snapshot: ContextSnapshot, rag: Union[SearchResult, str], message: str,
+                 memories: Iterable[Any] = (), history: List[Dict[str, str]] = (),
+                 history_tokens: int = 0) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+        """Return the chat messages for the LLM and the prompt token usage.
+
+        ``history`` holds earlier turns of the conversation, sent between the
+        system prompt and the new message.
+        """
+        system_message, usage = self.build(snapshot, rag, message, memories)
+        usage["history"] = history_tokens
+        usage["total"] += history_tokens
+        return [
+            {
+                "role": "system",
+                "content": system_message
+            },
+            *history,
+            {
+                "role": "user",
+                "content": message
+            }
+        ], usage
+
+    def _record(self, usage: Dict[str, int]) -> None:
+        self.builds += 1
+        self.last_usage = usage
+        for section, tokens in usage.items():
+            self.total_usage[section] = self.total_usage.get(section, 0) + tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "builds": self.builds,
+            "rebuilds": self.rebuilds,
+            "snapshot_version": self._version,
+            "token_budget": self.token_budget,
+            "last_usage": self.last_usage,
+            "average_usage": {
+                section: round(tokens / self.builds, 1) for section, tokens in self.total_usage.items()
+            } if self.builds else {}
+        }
@@ -0,0 +1,236 @@
+import re
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.shared import SharedState
+
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class CachedResponse:
+    """A completed LLM reply: the raw text and its rendered markdown HTML."""
+
+    __slots__ = ("text", "html", "size", "expires_at")
+
+    def __init__(self, text: str, html: str, expires_at: float):
+        self.text = text
+        self.html = html
+        self.size = len(text) + len(html) + ENTRY_OVERHEAD_BYTES
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM replies with single-flight for concurrent misses.
+
+    Keys combine the normalized user message with a hash of every message
+    sent before it (system prompt and any history), so a context refresh that
+    changes the prompt never serves an answer built from the old context.
+
+    With ``shared`` state, replies are written through to it and a local
+    miss is looked up there, so other worker processes reuse them. Both
+    run in a worker thread to keep SQLite off the event loop.
+    """
+
+    def __init__(self, max_bytes: int = 16_000_000, ttl: float = 3600.0,
+                 shared: Optional[SharedState] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared = shared
+        self.shared_hits = 0
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Lowercase, collapse whitespace and drop surrounding punctuation."""
+        return re.sub(r"\s+", " ", message.lower()).strip(" \t?!.,;:")
+
+    def key(self, message: str, messages: List[Dict[str, str]]) -> str:
+        """Cache key for ``message`` asked with the preceding chat ``messages``."""
+        prompt = hashlib.sha256()
+        for previous in messages[:-1]:
+            prompt.update(previous["role"].encode("utf-8"))
+            prompt.update(b"\0")
+            prompt.update(previous["content"].encode("utf-8"))
+            prompt.update(b"\0")
+        return hashlib.sha256(f"{self.normalize(message)}\0{prompt.hexdigest()}".encode("utf-8")).hexdigest()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """Return a fresh cached reply, counting a hit or a miss."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self._remove(key)
+        if self.enabled and self.shared is not None:
+            entry = await self._get_shared(key)
+            if entry is not None:
+                self.hits += 1
+                self.shared_hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    async def _get_shared(self, key: str) -> Optional[CachedResponse]:
+        try:
+            row = await asyncio.to_thread(self.shared.get_response, key)
+        except Exception as e:
+            print(f"Shared response lookup failed: {str(e)}")
+            return None
+        if row is None:
+            return None
+        text, html, expires_at = row
+        entry = CachedResponse(text, html, expires_at - time.time() + time.monotonic())
+        if entry.size <= self.max_bytes:
+            self._insert(key, entry)
+        return entry
+
+    def put(self, key: str, text: str, html: str) -> CachedResponse:
+        """Store a reply locally and evict least recently used entries beyond ``max_bytes``."""
+        entry = CachedResponse(text, html, time.monotonic() + self.ttl)
+        if self.enabled and entry.size <= self.max_bytes:
+            self._insert(key, entry)
+        return entry
+
+    async def _put_shared(self, key: str, entry: CachedResponse) -> None:
+        if not self.enabled or self.shared is None or entry.size > self.max_bytes:
+            return
+        try:
+            await asyncio.to_thread(self.shared.put_response, key, entry.text, entry.html, time.time() + self.ttl)
+        except Exception as e:
+            print(f"Shared response write failed: {str(e)}")
+
+    def _insert(self, key: str, entry: CachedResponse) -> None:
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self.entries.pop(key)
+        self.bytes -= entry.size
+
+    def inflight(self, key: str) -> Optional[asyncio.Future]:
+        """Return the pending computation for ``key``, if another request owns it."""
+        return self._inflight.get(key)
+
+    def claim(self, key: str) -> bool:
+        """Register the caller as the one computing ``key``.
+
+        Returns False if another request is computing it already; the caller
+        should ``wait`` for that one instead.
+        """
+        if key in self._inflight:
+            return False
+        future = asyncio.get_running_loop().create_future()
+        # Waiters handle failures themselves; don't log unretrieved exceptions
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        return True
+
+    async def resolve(self, key: str, text: str, html: str) -> CachedResponse:
+        """Store the computed reply, wake every waiter and share the reply."""
+        entry = self.put(key, text, html)
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(entry)
+        await self._put_shared(key, entry)
+        return entry
+
+    def fail(self, key: str, error: BaseException) -> None:
+        """Release waiters after the computation for ``key`` failed."""
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(error if isinstance(error, Exception) else RuntimeError("Request cancelled"))
+
+    async def wait(self, key: str) -> Optional[CachedResponse]:
+        """Wait for an in-flight computation of ``key``; ``None`` if there is none or it failed."""
+        future = self._inflight.get(key)
+        if future is None:
+            return None
+        self.coalesced += 1
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            return None
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Tuple[str, str]]]) -> Tuple[CachedResponse, bool]:
+        """Return the cached reply for ``key`` or compute it once for all concurrent callers.
+
+        ``compute`` returns ``(text, html)``. The second element of the result
+        tells whether the reply came from the cache (or another caller).
+        """
+        while True:
+            entry = await self.get(key)
+            if entry is not None:
+                return entry, True
+            if self.claim(key):
+                break
+            entry = await self.wait(key)
+            if entry is not None:
+                return entry, True
+
+        try:
+            text, html = await compute()
+        except BaseException as e:
+            self.fail(key, e)
+            raise
+        return await self.resolve(key, text, html), False
+
+    def clear(self) -> None:
+        """Drop all cached replies."""
+        self.entries.clear()
+        self.bytes = 0
+
+    def export_state(self) -> Dict[str, Any]:
+        """Checkpoint columns in LRU order; expiry is stored as wall-clock time."""
+        offset = time.time() - time.monotonic()
+        return {
+            "entries": [[key, entry.text, entry.html, entry.expires_at + offset]
+                        for key, entry in self.entries.items()]
+        }
+
+    def load_state(self, state: Any) -> None:
+        """Replace the cached replies with those saved by ``export_state`` that have not expired."""
+        now = time.monotonic()
+        offset = now - time.time()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        for key, text, html, expires_at in state["entries"]:
+            entry = CachedResponse(text, html, expires_at + offset)
+            if self.enabled and entry.expires_at > now and entry.size <= self.max_bytes:
+                self._insert(key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and memory usage."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "shared_hits": self.shared_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "in_flight": len(self._inflight)
+        }
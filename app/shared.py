@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS published (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    published_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    html TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_expires_at ON responses (expires_at);
+"""
+
+
+def worker_id() -> str:
+    """Identify this worker process among the others sharing the state."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class SharedState:
+    """State shared by the worker processes of one host through a SQLite file.
+
+    - Leases elect a single leader for periodic jobs such as the GitHub
+      refresh; a lease the leader stops renewing expires and another worker
+      takes over.
+    - Published values (the GitHub context) are versioned so followers fetch
+      the payload only when it changed.
+    - LLM replies are shared so a question answered by one worker is not
+      sent to the LLM again by another. The leader drops expired ones from
+      its periodic poll (``expire_responses``).
+
+    The database runs in WAL mode, so readers never block the writer.
+    Timestamps are wall-clock seconds, comparable across processes.
+    """
+
+    def __init__(self, path: str, owner: Optional[str] = None):
+        self.path = path
+        self.owner = owner or worker_id()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        with self._lock:
+            self.conn.executescript(SCHEMA)
+        self.leading: Dict[str, bool] = {}
+        self.counters = {
+            "response_hits": 0,
+            "response_misses": 0,
+            "response_writes": 0,
+            "response_expired": 0,
+            "publishes": 0,
+            "fetches": 0
+        }
+
+    def _write(self, statements) -> None:
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self.conn.execute(sql, params)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def try_lead(self, name: str, ttl: float) -> bool:
+        """Take or renew the lease ``name`` for ``ttl`` seconds; returns whether we hold it."""
+        now = time.time()
+        self._write([(
+            "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+            (name, self.owner, now + ttl, now)
+        )])
+        with self._lock:
+            row = self.conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+        self.leading[name] = row is not None and row[0] == self.owner
+        return self.leading[name]
+
+    def release(self, name: str) -> None:
+        """Give up the lease ``name`` if we hold it."""
+        self._write([("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner))])
+        self.leading[name] = False
+
+    def publish(self, name: str, payload: Any) -> int:
+        """Store a new version of ``name`` and return its version number."""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT version FROM published WHERE name = ?", (name,)).fetchone()
+                version = (row[0] if row else 0) + 1
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO published (name, version, payload, published_at) VALUES (?, ?, ?, ?)",
+                    (name, version, json.dumps(payload, default=str), time.time())
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        self.counters["publishes"] += 1
+        return version
+
+    def fetch(self, name: str, newer_than: int = 0) -> Optional[Tuple[int, Any, float]]:
+        """Return ``(version, payload, published_at)`` if a version newer than ``newer_than`` exists."""
+        with self._lock:
+            row = self.conn.execute("SELECT version FROM published WHERE name = ?", (name,)).fetchone()
+            if row is None or row[0] <= newer_than:
+                return None
+            row = self.conn.execute(
+                "SELECT version, payload, published_at FROM published WHERE name = ?", (name,)
+            ).fetchone()
+        self.counters["fetches"] += 1
+        return row[0], json.loads(row[1]), row[2]
+
+    def get_response(self, key: str) -> Optional[Tuple[str, str, float]]:
+        """Return ``(text, html, expires_at)`` of a shared reply that has not expired."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT text, html, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        self.counters["response_hits" if row else "response_misses"] += 1
+        return row
+
+    def put_response(self, key: str, text: str, html: str, expires_at: float) -> None:
+        """Share a reply."""
+        self._write([(
+            "INSERT OR REPLACE INTO responses (key, text, html, expires_at) VALUES (?, ?, ?, ?)",
+            (key, text, html, expires_at)
+        )])
+        self.counters["response_writes"] += 1
+
+    def expire_responses(self) -> int:
+        """Drop expired replies and return how many were dropped."""
+        with self._lock:
+            deleted = self.conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),)).rowcount
+        self.counters["response_expired"] += deleted
+        return deleted
+
+    def close(self) -> None:
+        for name, leading in list(self.leading.items()):
+            if leading:
+                self.release(name)
+        with self._lock:
+            self.conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            responses = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        stats = dict(self.counters)
+        stats.update({
+            "path": self.path,
+            "owner": self.owner,
+            "leading": dict(self.leading),
+            "responses": responses
+        })
+        return stats
@@ -0,0 +1,309 @@
+import time
+import asyncio
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Optional, Tuple
+from app.github import AsyncGitHubFetcher
+from app.metrics import span
+from app.shared import SharedState
+from rag_integration import RAGIntegration
+
+# Lease held by the worker that refreshes GitHub for all of them
+LEADER_LEASE = "github-refresh"
+# How often a follower without any snapshot checks for the leader's first one
+FOLLOWER_POLL = 0.25
+
+
+@dataclass(frozen=True)
+class ContextSnapshot:
+    """An immutable view of the GitHub and RAG context at a point in time.
+
+    Snapshots are never modified after they are built; a refresh creates a new
+    one and swaps the reference, so readers never see a half-built state.
+    ``created_at`` is when the GitHub context was fetched; a RAG reload
+    keeps it, so ``age`` shows how stale the GitHub data is.
+    """
+    github: Dict[str, Any] = field(default_factory=lambda: {
+        "username": None,
+        "repositories": [],
+        "recent_activity": []
+    })
+    rag_context: str = ""
+    version: int = 0
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the GitHub context was fetched."""
+        return time.time() - self.created_at
+
+
+class SnapshotRefresher:
+    """Keeps a ``ContextSnapshot`` fresh from a background task.
+
+    Handlers read ``snapshot`` without doing any I/O. The task rebuilds it
+    every ``interval`` seconds or immediately when ``trigger`` is called.
+    While a refresh is running the previous snapshot keeps being served.
+    A second task polls the RAG source files every ``rag_poll_interval``
+    seconds and swaps in a new snapshot when they change.
+
+    With ``shared`` state, worker processes elect one leader that fetches
+    from GitHub and publishes the result; the others check for a new
+    version every ``shared_poll_interval`` seconds and adopt it, so GitHub
+    traffic does not grow with the number of workers. If the leader stops
+    renewing its lease, another worker takes over.
+    """
+
+    def __init__(self, fetcher: AsyncGitHubFetcher, rag: RAGIntegration, interval: float = 300.0,
+                 rag_poll_interval: float = 5.0, shared: Optional[SharedState] = None,
+                 shared_poll_interval: float = 5.0, follower_wait: float = 10.0):
+        self.fetcher = fetcher
+        self.rag = rag
+        self.interval = interval
+        self.rag_poll_interval = rag_poll_interval
+        self.shared = shared
+        self.shared_poll_interval = shared_poll_interval
+        self.follower_wait = follower_wait
+        self.snapshot = ContextSnapshot()
+        self.last_error: Optional[str] = None
+        self.shared_version = 0
+        self._last_fetch = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._watch_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _ensure_primitives(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+            self._ready = asyncio.Event()
+            if self.snapshot.version:
+                self._ready.set()
+
+    @property
+    def ready(self) -> bool:
+        """Whether at least one snapshot has been built."""
+        return self.snapshot.version > 0
+
+    @property
+    def leading(self) -> bool:
+        """Whether this worker fetches from GitHub (always, without shared state)."""
+        return self.shared is None or self.shared.leading.get(LEADER_LEASE, False)
+
+    @property
+    def _poll_interval(self) -> float:
+        return self.interval if self.shared is None else min(self.interval, self.shared_poll_interval)
+
+    async def _try_lead(self) -> bool:
+        # Renewed every poll, so the lease outlives a few missed renewals only
+        return await asyncio.to_thread(self.shared.try_lead, LEADER_LEASE, 3 * self._poll_interval)
+
+    async def _fetch_github(self) -> Optional[Dict[str, Any]]:
+        """Fetch and publish the GitHub context; ``None`` if the fetch failed."""
+        try:
+            with span("github_refresh"):
+                github = await self.fetcher.get_github_context()
+            self.last_error = None
+        except Exception as e:
+            print(f"GitHub refresh failed: {str(e)}")
+            self.last_error = str(e)
+            return None
+        self._last_fetch = time.monotonic()
+        if self.shared is not None:
+            self.shared_version = await asyncio.to_thread(self.shared.publish, "github", github)
+        return github
+
+    async def _published_github(self) -> Optional[Tuple[Dict[str, Any], float]]:
+        """The leader's GitHub context and when it was published, if newer than ours."""
+        published = await asyncio.to_thread(self.shared.fetch, "github", self.shared_version)
+        if published is None:
+            return None
+        self.shared_version = published[0]
+        return published[1], published[2]
+
+    async def _swap(self, github: Dict[str, Any], fetched_at: Optional[float] = None) -> ContextSnapshot:
+        previous = self.snapshot
+        # Only READMEs of repositories that changed are re-indexed
+        await asyncio.to_thread(self.rag.update_readmes, github["repositories"])
+        rag_context = await asyncio.to_thread(self.rag.get_context)
+        self.snapshot = ContextSnapshot(
+            github=github,
+            rag_context=rag_context,
+            version=previous.version + 1,
+            created_at=time.time() if fetched_at is None else fetched_at
+        )
+        self._ready.set()
+        return self.snapshot
+
+    async def refresh(self) -> ContextSnapshot:
+        """Rebuild the snapshot now and swap it in.
+
+        A follower adopts the leader's latest GitHub context instead, waiting
+        up to ``follower_wait`` seconds for the first one before fetching it
+        itself. If the fetch fails, the previous snapshot is kept unchanged
+        and the error is reported in ``last_error``.
+        """
+        self._ensure_primitives()
+        async with self._lock:
+            if self.shared is not None and not await self._try_lead():
+                deadline = time.monotonic() + self.follower_wait
+                while True:
+                    published = await self._published_github()
+                    if published is not None:
+                        return await self._swap(*published)
+                    if self.ready:
+                        return self.snapshot
+                    if time.monotonic() >= deadline:
+                        break
+                    await asyncio.sleep(FOLLOWER_POLL)
+            github = await self._fetch_github()
+            if github is None:
+                if self.ready:
+                    # Keep serving the previous snapshot as it was
+                    return self.snapshot
+                # The first snapshot is built anyway, from the RAG sources alone
+                github = self.snapshot.github
+            return await self._swap(github)
+
+    async def sync_shared(self) -> bool:
+        """One poll with shared state: renew or take the lead, or adopt a new published version.
+
+        The leader drops expired shared replies and fetches from GitHub once
+        ``interval`` seconds have passed since its last fetch. Returns whether
+        the snapshot changed.
+        """
+        self._ensure_primitives()
+        async with self._lock:
+            if await self._try_lead():
+                # Expired shared replies are dropped here rather than on every write
+                await asyncio.to_thread(self.shared.expire_responses)
+                if time.monotonic() - self._last_fetch < self.interval:
+                    return False
+                github = await self._fetch_github()
+                if github is None:
+                    return False
+                await self._swap(github)
+            else:
+                published = await self._published_github()
+                if published is None:
+                    return False
+                await self._swap(*published)
+            return True
+
+    async def refresh_rag(self) -> bool:
+        """Reload the RAG sources if they changed and swap in a new snapshot.
+
+        The new snapshot keeps the GitHub context and its ``created_at``.
+        """
+        self._ensure_primitives()
+        changed = await asyncio.to_thread(self.rag.reload_if_changed)
+        if not changed:
+            return False
+        rag_context = await asyncio.to_thread(self.rag.get_context)
+        async with self._lock:
+            previous = self.snapshot
+            self.snapshot = replace(previous, rag_context=rag_context, version=previous.version + 1)
+        return True
+
+    async def current(self) -> ContextSnapshot:
+        """Return the current snapshot, waiting for the first one if needed."""
+        if self.ready:
+            return self.snapshot
+        self._ensure_primitives()
+        if self._task is None:
+            return await self.refresh()
+        await self._ready.wait()
+        return self.snapshot
+
+    def trigger(self) -> None:
+        """Wake the background task to refresh ahead of schedule."""
+        self._ensure_primitives()
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        refresh = True
+        while True:
+            try:
+                if refresh or self.shared is None:
+                    await self.refresh()
+                else:
+                    await self.sync_shared()
+            except Exception as e:
+                print(f"Snapshot refresh failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+                refresh = True
+            except asyncio.TimeoutError:
+                refresh = False
+            self._wakeup.clear()
+
+    async def _watch_rag(self) -> None:
+        while True:
+            await asyncio.sleep(self.rag_poll_interval)
+            try:
+                await self.refresh_rag()
+            except Exception as e:
+                print(f"RAG reload failed: {str(e)}")
+
+    def start(self) -> None:
+        """Start the background refresh tasks."""
+        self._ensure_primitives()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if self._watch_task is None and self.rag_poll_interval > 0:
+            self._watch_task = asyncio.create_task(self._watch_rag())
+
+    async def stop(self) -> None:
+        """Cancel the background refresh tasks."""
+        for task in (self._task, self._watch_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._watch_task = None
+
+    def export_state(self) -> Dict[str, Any]:
+        """Checkpoint columns for the GitHub part of the current snapshot."""
+        if not self.ready:
+            return {}
+        return {
+            "github": self.snapshot.github,
+            "version": self.snapshot.version,
+            "created_at": self.snapshot.created_at
+        }
+
+    def load_state(self, state: Any) -> None:
+        """Serve the saved GitHub context until the first refresh; RAG is read from disk."""
+        if "github" not in state:
+            # Saved before the first snapshot was built
+            self.rag.update_readmes([])
+            self.snapshot = ContextSnapshot()
+            if self._ready is not None:
+                self._ready.clear()
+            return
+        self.rag.update_readmes(state["github"]["repositories"])
+        self.snapshot = ContextSnapshot(
+            github=state["github"],
+            rag_context=self.rag.get_context(),
+            version=state["version"],
+            created_at=state["created_at"]
+        )
+        if self._ready is not None:
+            self._ready.set()
+
+    def status(self) -> Dict[str, Any]:
+        """Return readiness information about the current snapshot."""
+        return {
+            "ready": self.ready,
+            "version": self.snapshot.version,
+            "age_seconds": round(self.snapshot.age, 3) if self.ready else None,
+            "refresh_interval": self.interval,
+            "shared": self.shared is not None,
+            "leading": self.leading,
+            "shared_version": self.shared_version,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,80 @@
+"""Benchmark writing and restoring a protocol checkpoint.
+
+Usage: python -m benchmarks.bench_checkpoint [--count 1000000]
+
+Fills a protocol with context items as ``ContextManager`` builds them, saves
+a checkpoint and times restoring it into a fresh protocol, followed by the
+first ranked lookup (which thaws the parts of the index restored lazily).
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+from mcp.checkpoint import read_checkpoint, write_checkpoint
+from mcp.context import ASSISTANT_MESSAGE_METADATA, USER_MESSAGE_METADATA
+from mcp.protocol import MCPProtocol
+from mcp.records import ContextRecord
+
+WORDS = [f"word{i}" for i in range(5000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(WORDS))]
+
+
+def fill(protocol: MCPProtocol, count: int) -> None:
+    start = time.time() - count
+    for i in range(count):
+        user = i % 2 == 0
+        protocol.add_context_item(ContextRecord(
+            protocol.new_id(),
+            "user_message" if user else "assistant_message",
+            " ".join(random.choices(WORDS, WEIGHTS, k=12)),
+            USER_MESSAGE_METADATA if user else ASSISTANT_MESSAGE_METADATA,
+            start + i,
+            start + i,
+            "user" if user else "assistant",
+            1.0 if user else 0.7
+        ))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    protocol = MCPProtocol()
+    fill(protocol, args.count)
+    path = os.path.join(tempfile.mkdtemp(), "state.ckpt")
+
+    start = time.perf_counter()
+    size = write_checkpoint(path, {"protocol": protocol.export_state()})
+    saved = time.perf_counter() - start
+    probe = protocol.get_context_item(args.count).content
+    # Restore into a process that no longer holds the original items
+    del protocol
+    gc.collect()
+
+    start = time.perf_counter()
+    restored = MCPProtocol()
+    checkpoint = read_checkpoint(path)
+    restored.load_state(checkpoint.section("protocol"))
+    checkpoint.close()
+    loaded = time.perf_counter() - start
+    # As the app does after restoring at startup
+    gc.freeze()
+
+    start = time.perf_counter()
+    restored.get_relevant_context("word3 word250")
+    first_query = time.perf_counter() - start
+    assert len(restored.context.items) == args.count
+    assert restored.get_context_item(args.count).content == probe
+
+    print(f"{args.count:,} items, checkpoint {size / 1e6:.1f} MB")
+    print(f"{'save':<24}{saved * 1e3:>10.0f}ms")
+    print(f"{'restore':<24}{loaded * 1e3:>10.0f}ms")
+    print(f"{'first ranked lookup':<24}{first_query * 1e3:>10.0f}ms")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Microbenchmarks of the per-request hot paths, compared against stored baselines.
+
+Usage: python -m benchmarks.bench_micro [--save] [--baseline benchmarks/baselines.json] [--tolerance 0.25]
+
+Times RAG search over ``info.txt`` and a synthetic knowledge base,
+fast-path routing, ``MCPProtocol`` inserts, updates and lookups on a filled
+protocol, and system-prompt assembly from a synthetic GitHub snapshot. Each benchmark
+reports the best of ``--rounds`` rounds, which is less sensitive to noise
+than the mean.
+
+Results are compared with the baseline file; a benchmark slower than its
+baseline by more than ``--tolerance`` is flagged and the exit status is 1.
+``--save`` records the current results as the new baselines. Baselines only
+mean something on the machine they were recorded on; re-record them after
+moving to new hardware.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from itertools import cycle
+from typing import Callable, Dict, List, Tuple
+from app.fastpath import FastPathRouter
+from app.prompt import PromptBuilder
+from benchmarks.bench_prompt import QUERY, make_snapshot
+from mcp.context import USER_MESSAGE_METADATA
+from mcp.protocol import MCPProtocol
+from mcp.records import ContextRecord
+from rag_integration import RAGIntegration
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+QUERIES = ["what projects has he built", "education and college", "python fastapi skills", "contact email"]
+WORDS = [f"term{i}" for i in range(2000)]
+
+
+def best_time(fn: Callable[[], object], repeat: int, rounds: int) -> float:
+    """Fastest average seconds per call over ``rounds`` rounds of ``repeat`` calls, after a warm-up."""
+    for _ in range(max(1, repeat // 10)):
+        fn()
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def synthetic_knowledge(path: str, sections: int, lines: int) -> None:
+    rng = random.Random(0)
+    with open(path, "w") as f:
+        for section in range(sections):
+            f.write(f"SECTION {section}:\n")
+            for _ in range(lines):
+                f.write(" ".join(rng.choices(WORDS, k=12)) + "\n")
+            f.write("\n")
+
+
+def rag_benchmarks(directory: str) -> List[Tuple[str, Callable[[], object], int]]:
+    rag = RAGIntegration("info.txt")
+    path = os.path.join(directory, "knowledge.txt")
+    synthetic_knowledge(path, sections=100, lines=100)
+    large = RAGIntegration(path)
+    queries = cycle(QUERIES)
+    large_queries = cycle([" ".join(random.Random(i).choices(WORDS, k=4)) for i in range(100)])
+    router = FastPathRouter(rag)
+    fast_queries = cycle(QUERIES + ["what's his email", "languages known", "when was he born"])
+    return [
+        ("rag.search_content info.txt", lambda: rag.search_content(next(queries)), 2000),
+        ("rag.search_content 10k lines", lambda: large.search_content(next(large_queries)), 200),
+        ("fastpath.route info.txt", lambda: router.route(next(fast_queries)), 20000),
+    ]
+
+
+def protocol_benchmarks(count: int) -> List[Tuple[str, Callable[[], object], int]]:
+    rng = random.Random(0)
+    protocol = MCPProtocol()
+    start = time.time() - count
+    for i in range(count):
+        protocol.add_context_item(ContextRecord(
+            protocol.new_id(), "user_message" if i % 2 else "assistant_message",
+            " ".join(rng.choices(WORDS, k=10)), USER_MESSAGE_METADATA, start + i, start + i, "user", 1.0
+        ))
+    ids = [rng.randint(1, count) for _ in range(1000)]
+    probes = cycle(ids)
+    queries = cycle([" ".join(rng.choices(WORDS[:200], k=3)) for _ in range(100)])
+
+    def add() -> None:
+        now = time.time()
+        protocol.add_context_item(ContextRecord(
+            protocol.new_id(), "user_message", "a new message about term1 and term2", USER_MESSAGE_METADATA,
+            now, now, "user", 1.0
+        ))
+
+    return [
+        ("protocol.add_context_item", add, 5000),
+        ("protocol.update_context_item", lambda: protocol.update_context_item(next(probes), {"relevance_score": 0.5}),
+         5000),
+        ("protocol.get_relevant_context", lambda: protocol.get_relevant_context(next(queries)), 500),
+        ("protocol.get_recent_context_items",
+         lambda: protocol.get_recent_context_items(["user_message", "assistant_message"], 10), 5000),
+    ]
+
+
+def prompt_benchmarks() -> List[Tuple[str, Callable[[], object], int]]:
+    rag = RAGIntegration("info.txt")
+    result = rag.search(QUERY)
+    snapshot = make_snapshot(100, 5000)
+    builder = PromptBuilder(token_budget=2000)
+    builder.build(snapshot, result, QUERY)
+    history = [{"role": "user", "content": "earlier question"}, {"role": "assistant", "content": "earlier answer"}]
+    return [
+        ("prompt.messages 100 repos", lambda: builder.messages(snapshot, result, QUERY, (), history, 10), 2000),
+    ]
+
+
+def run(rounds: int, protocol_size: int) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        benchmarks = rag_benchmarks(directory) + protocol_benchmarks(protocol_size) + prompt_benchmarks()
+        for name, fn, repeat in benchmarks:
+            results[name] = best_time(fn, repeat, rounds)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="record the results as the new baselines")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--protocol-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    results = run(args.rounds, args.protocol_size)
+    baselines: Dict[str, float] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'benchmark':<36}{'time':>12}{'baseline':>12}{'change':>9}")
+    for name, elapsed in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"{name:<36}{elapsed * 1e6:>10.1f}us{'-':>12}")
+            continue
+        change = elapsed / baseline - 1
+        flag = ""
+        if change > args.tolerance:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<36}{elapsed * 1e6:>10.1f}us{baseline * 1e6:>10.1f}us{change:>+8.0%}{flag}")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "machine": {"python": platform.python_version(), "platform": platform.platform()},
+                "protocol_size": args.protocol_size,
+                "results": results
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Baselines saved to {args.baseline}")
+    elif regressions:
+        print(f"{regressions} benchmark(s) slower than baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark system-prompt assembly: per-message concatenation vs PromptBuilder.
+
+Usage: python -m benchmarks.bench_prompt [--repos 10 100] [--readme-size 5000] [--budget 2000]
+
+A synthetic GitHub snapshot is built for each repository count. The legacy
+build (``+=`` over every repository and one big f-string) is timed next to
+``PromptBuilder.build`` without a budget, which must produce the same prompt,
+and with ``--budget`` for a query that matches a few repositories.
+``tracemalloc`` measures the peak bytes allocated per request, temporaries
+included, and every row reports the estimated prompt tokens.
+"""
+import argparse
+import time
+import tracemalloc
+from app.prompt import PromptBuilder, estimate_tokens
+from app.snapshot import ContextSnapshot
+
+RAG_HITS = "SKILLS:\nPython, FastAPI\nEDUCATION:\nB.E. Computer Science"
+QUERY = "tell me about project 7 and project 42"
+
+
+def make_snapshot(repo_count: int, readme_size: int) -> ContextSnapshot:
+    repositories = [
+        {
+            "name": f"repo-{i}",
+            "description": f"Project number {i}",
+            "language": "Python",
+            "stars": i,
+            "url": f"https://github.com/user/repo-{i}",
+            "readme": ("# Readme\n" + "lorem ipsum " * readme_size)[:readme_size] if i % 5 else None
+        }
+        for i in range(repo_count)
+    ]
+    github = {
+        "username": "user",
+        "repositories": repositories,
+        "recent_activity": [f"PushEvent on user/repo-{i}" for i in range(min(repo_count, 5))]
+    }
+    return ContextSnapshot(github=github, rag_context="", version=1)
+
+
+def legacy_build(github_context, rag_data: str) -> str:
+    repo_info = ""
+    for repo in github_context["repositories"]:
+        repo_info += f"\nRepository: {repo['name']}\n"
+        repo_info += f"Description: {repo['description']}\n"
+        repo_info += f"Language: {repo['language']}\n"
+        if repo['readme']:
+            repo_info += f"README Preview: {repo['readme'][:200]}...\n"
+        repo_info += "---\n"
+
+    return f"""Hi! I'm Dhurkesh's personal assistant. I have access to his information and can help answer questions about him.
+
+    Here's what I know about Dhurkesh:
+    {rag_data}
+
+    Repository Information:
+    {repo_info}
+
+    Recent Activity:
+    {', '.join(github_context['recent_activity'])}
+    
+    I can help you with:
+    - Information about Dhurkesh's background and experience
+    - Details about his projects and work
+    - Any other questions you might have about him
+    
+    Please feel free to ask your question, and I'll provide a helpful response based on the available information."""
+
+
+def timed(fn, repeat: int) -> float:
+    """Average seconds per call over ``repeat`` calls."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def peak_allocation(fn, repeat: int = 100) -> float:
+    """Average peak bytes allocated while one call runs, including its temporaries."""
+    total = 0
+    tracemalloc.start()
+    for _ in range(repeat):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - before
+        del result
+    tracemalloc.stop()
+    return total / repeat
+
+
+def run(repo_count: int, readme_size: int, repeat: int, budget: int) -> None:
+    snapshot = make_snapshot(repo_count, readme_size)
+    unbudgeted = PromptBuilder()
+    budgeted = PromptBuilder(token_budget=budget)
+    # README text now reaches the prompt as RAG passages instead of previews
+    without_readmes = dict(snapshot.github, repositories=[
+        dict(repo, readme=None) for repo in snapshot.github["repositories"]
+    ])
+    assert unbudgeted.build(snapshot, RAG_HITS)[0] == legacy_build(without_readmes, RAG_HITS)
+
+    builds = [
+        ("legacy", lambda: legacy_build(snapshot.github, RAG_HITS)),
+        ("PromptBuilder", lambda: unbudgeted.build(snapshot, RAG_HITS)[0]),
+        (f"budget {budget}", lambda: budgeted.build(snapshot, RAG_HITS, QUERY)[0])
+    ]
+    print(f"\n{repo_count} repositories, {readme_size} byte READMEs")
+    print(f"{'build':<14}{'time':>12}{'peak bytes/req':>16}{'tokens':>10}")
+    baseline = None
+    for name, build in builds:
+        elapsed = timed(build, repeat)
+        peak = peak_allocation(build)
+        baseline = baseline or elapsed
+        print(f"{name:<14}{elapsed * 1e6:>10.1f}us{peak:>16,.0f}{estimate_tokens(build()):>10,}"
+              f"{baseline / elapsed:>8.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repos", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--readme-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--budget", type=int, default=2000)
+    args = parser.parse_args()
+    for count in args.repos:
+        run(count, args.readme_size, args.repeat, args.budget)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark MCPProtocol lookups against plain list scans.
+
+Usage: python -m benchmarks.bench_protocol [--sizes 100000 1000000]
+
+For each size the protocol is filled with context items of a few types and
+the indexed operations are timed next to the list-scan versions they replace.
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from mcp.protocol import ContextItem, MCPProtocol
+
+TYPES = ["github", "rag", "user_message", "assistant_message"]
+
+
+def fill(protocol: MCPProtocol, count: int) -> list:
+    start = datetime.now() - timedelta(seconds=count)
+    ids = []
+    for i in range(count):
+        item = ContextItem.model_construct(
+            id=str(uuid.uuid4()),
+            type=TYPES[i % len(TYPES)] if i % 1000 else "rare",
+            content=f"message {i}",
+            metadata={},
+            created_at=start + timedelta(seconds=i),
+            updated_at=start + timedelta(seconds=i),
+            source="bench",
+            relevance_score=random.random()
+        )
+        protocol.add_context_item(item)
+        ids.append(item.id)
+    return ids
+
+
+def timed(fn, repeat: int) -> float:
+    """Average seconds per call over ``repeat`` calls."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def scan_update(items, item_id):
+    for item in items:
+        if item.id == item_id:
+            item.relevance_score = 0.5
+            return True
+    return False
+
+
+def scan_conversation(items, limit=10):
+    messages = [i for i in items if i.type == "user_message"] + \
+               [i for i in items if i.type == "assistant_message"]
+    messages.sort(key=lambda x: x.created_at, reverse=True)
+    return messages[:limit]
+
+
+def run(count: int) -> None:
+    protocol = MCPProtocol()
+    start = time.perf_counter()
+    ids = fill(protocol, count)
+    fill_time = time.perf_counter() - start
+    items = protocol.context.items
+    probe = [random.choice(ids) for _ in range(100)]
+
+    rows = [
+        ("update by id", timed(lambda: protocol.update_context_item(random.choice(probe), {"relevance_score": 0.5}), 1000),
+         timed(lambda: scan_update(items, random.choice(probe)), 5)),
+        ("filter rare type", timed(lambda: protocol.get_context_items(type="rare"), 100),
+         timed(lambda: [i for i in items if i.type == "rare"], 5)),
+        ("top-5 relevance", timed(lambda: protocol.get_relevant_context("q"), 3),
+         timed(lambda: sorted(items, key=lambda x: x.relevance_score, reverse=True)[:5], 3)),
+        ("conversation top-10", timed(lambda: protocol.get_recent_context_items(["user_message", "assistant_message"], 10), 1000),
+         timed(lambda: scan_conversation(items), 3)),
+    ]
+
+    print(f"\n{count:,} items (filled in {fill_time:.2f}s)")
+    print(f"{'operation':<22}{'indexed':>14}{'list scan':>14}{'speedup':>10}")
+    for name, indexed, scan in rows:
+        print(f"{name:<22}{indexed * 1e6:>12.1f}us{scan * 1e6:>12.1f}us{scan / indexed:>9.0f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    for count in args.sizes:
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark compact context records against Pydantic context items.
+
+Usage: python -m benchmarks.bench_records [--count 100000]
+
+Measures memory retained per stored item and insertion throughput for the
+old path (a validated ``ContextItem`` with a UUID, datetimes and its own
+metadata dict) and for ``ContextRecord`` objects as ``ContextManager`` builds
+them: integer ids, float timestamps and shared metadata.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from mcp.context import USER_MESSAGE_METADATA
+from mcp.protocol import ContextItem, ItemIndex, MCPProtocol
+from mcp.records import ContextRecord
+from mcp.relevance import RelevanceIndex
+
+
+def legacy_add(index: ItemIndex, relevance: RelevanceIndex, message: str) -> None:
+    item = ContextItem(
+        id=str(uuid.uuid4()),
+        type="user_message",
+        content=message,
+        metadata={
+            "source": "user_input",
+            "data_type": "message"
+        },
+        created_at=datetime.now(),
+        updated_at=datetime.now(),
+        source="user",
+        relevance_score=1.0
+    )
+    # What the protocol held before records: the model itself
+    index.add(item)
+    relevance.add(item, at=item.created_at.timestamp())
+
+
+def record_add(protocol: MCPProtocol, message: str) -> None:
+    # As built by ContextManager
+    now = time.time()
+    protocol.add_context_item(ContextRecord(
+        protocol.new_id(), "user_message", message, USER_MESSAGE_METADATA, now, now, "user", 1.0
+    ))
+
+
+def measure(add, count: int):
+    """Seconds per insert and bytes retained per item, excluding message text."""
+    messages = [f"message number {i}" for i in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for message in messages:
+        add(message)
+    elapsed = time.perf_counter() - start
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return elapsed / count, retained / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    index, relevance = ItemIndex(time_field="created_at"), RelevanceIndex()
+    index.sync([])
+    legacy_time, legacy_bytes = measure(lambda message: legacy_add(index, relevance, message), args.count)
+
+    protocol = MCPProtocol()
+    record_time, record_bytes = measure(lambda message: record_add(protocol, message), args.count)
+
+    print(f"{args.count:,} items (tracemalloc on; times are relative)")
+    print(f"{'storage':<18}{'insert':>10}{'bytes/item':>12}")
+    print(f"{'ContextItem':<18}{legacy_time * 1e6:>8.1f}us{legacy_bytes:>12,.0f}")
+    print(f"{'ContextRecord':<18}{record_time * 1e6:>8.1f}us{record_bytes:>12,.0f}")
+    print(f"{'ratio':<18}{legacy_time / record_time:>9.1f}x{legacy_bytes / record_bytes:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
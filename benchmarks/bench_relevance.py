@@ -0,0 +1,84 @@
+"""Benchmark lazy time-decay relevance against rescanning every context item.
+
+Usage: python -m benchmarks.bench_relevance [--sizes 10000 100000]
+
+For each size the protocol is filled with user messages and the per-query
+cost of the old ``update_relevance_scores`` scan plus a top-5 sort is timed
+next to an index boost plus ``get_relevant_context``.
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from mcp.protocol import ContextItem, MCPProtocol
+
+# Zipf-distributed vocabulary, like words in real messages
+WORDS = [f"word{i}" for i in range(5000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(WORDS))]
+QUERIES = ["tell me about word3 and word250", "what is word40", "word900 word1200 word7", "word15 or word60"]
+
+
+def fill(protocol: MCPProtocol, count: int) -> None:
+    start = datetime.now() - timedelta(seconds=count)
+    for i in range(count):
+        protocol.add_context_item(ContextItem.model_construct(
+            id=str(uuid.uuid4()),
+            type="user_message",
+            content=" ".join(random.choices(WORDS, WEIGHTS, k=12)),
+            metadata={},
+            created_at=start + timedelta(seconds=i),
+            updated_at=start + timedelta(seconds=i),
+            source="bench",
+            relevance_score=random.random()
+        ))
+
+
+def scan_scores(items, query: str):
+    """The old per-query rescan followed by a top-5 selection."""
+    for item in items:
+        if isinstance(item.content, str) and query.lower() in item.content.lower():
+            item.relevance_score = min(1.0, item.relevance_score + 0.2)
+        else:
+            item.relevance_score = max(0.0, item.relevance_score - 0.1)
+    return sorted(items, key=lambda x: x.relevance_score, reverse=True)[:5]
+
+
+def timed(fn, repeat: int) -> float:
+    """Average seconds per call over ``repeat`` calls."""
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(QUERIES[i % len(QUERIES)])
+    return (time.perf_counter() - start) / repeat
+
+
+def run(count: int) -> None:
+    protocol = MCPProtocol()
+    fill(protocol, count)
+    items = protocol.context.items
+
+    def lazy(query: str):
+        protocol.relevance.boost(query)
+        return protocol.get_relevant_context(query)
+
+    scan = timed(lambda query: scan_scores(items, query), 5)
+    indexed = timed(lambda query: protocol.get_relevant_context(query), 50)
+    boosted = timed(lazy, 5)
+
+    print(f"\n{count:,} items")
+    print(f"{'operation':<28}{'time':>12}{'speedup':>10}")
+    print(f"{'rescan + sort':<28}{scan * 1e3:>10.2f}ms")
+    print(f"{'ranked lookup':<28}{indexed * 1e3:>10.2f}ms{scan / indexed:>9.0f}x")
+    print(f"{'index boost + ranked lookup':<28}{boosted * 1e3:>10.2f}ms{scan / boosted:>9.0f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    for count in args.sizes:
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
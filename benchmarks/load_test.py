@@ -0,0 +1,267 @@
+"""Load-test the running service against local Groq and GitHub stand-ins.
+
+Usage: python -m benchmarks.load_test [--endpoints chat ws] [--concurrency 16] [--duration 30]
+                                      [--llm-latency 0.2] [--repos 20] [--readme-size 4000]
+
+Starts the stub servers from ``benchmarks.stubs``, launches ``uvicorn
+app.main:app`` pointed at them and waits for ``/ready``. Then
+``--concurrency`` virtual users per endpoint send questions back to back for
+``--duration`` seconds: ``/chat`` posts with one ``session_id`` per user, and
+``/ws`` users keep one connection each and wait for the ``end`` frame. A
+``--repeat-ratio`` share of the questions comes from a small fixed set, so
+the reply cache sees realistic repeats.
+
+Reports p50/p95/p99 latency and throughput per endpoint (plus time to the
+first streamed token for ``/ws``), and the server's RSS sampled over the
+run. ``--json`` also writes the results to a file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+import httpx
+import websockets
+from benchmarks.stubs import StubGitHub, StubLLM
+
+COMMON_QUESTIONS = [
+    "What projects has he built?",
+    "Tell me about his education",
+    "Which languages does he use?",
+    "What is his most recent work?",
+]
+TOPICS = ["python", "fastapi", "projects", "skills", "experience", "education", "github", "go", "typescript"]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of ``values`` (``q`` in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def rss_bytes(pid: int) -> int:
+    """Resident memory of ``pid`` and its child processes (Linux ``/proc``)."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+class Results:
+    """Latencies and errors of one endpoint."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.latencies: List[float] = []
+        self.first_tokens: List[float] = []
+        self.errors = 0
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        summary = {
+            "endpoint": self.endpoint,
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "throughput": len(self.latencies) / elapsed if elapsed else 0.0,
+        }
+        for q in (50, 95, 99):
+            summary[f"p{q}_ms"] = percentile(self.latencies, q) * 1e3
+        if self.first_tokens:
+            summary["first_token_p50_ms"] = percentile(self.first_tokens, 50) * 1e3
+            summary["first_token_p95_ms"] = percentile(self.first_tokens, 95) * 1e3
+        return summary
+
+
+def question(rng: random.Random, repeat_ratio: float) -> str:
+    if rng.random() < repeat_ratio:
+        return rng.choice(COMMON_QUESTIONS)
+    return f"Question {rng.getrandbits(32):x}: what about his {rng.choice(TOPICS)} and {rng.choice(TOPICS)}?"
+
+
+async def chat_user(base_url: str, user: int, deadline: float, results: Results, repeat_ratio: float) -> None:
+    rng = random.Random(user)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/chat", json={
+                    "message": question(rng, repeat_ratio),
+                    "session_id": f"load-{user}"
+                })
+                if response.status_code != 200 or "error" in response.json():
+                    results.errors += 1
+                    continue
+            except (httpx.HTTPError, ValueError):
+                results.errors += 1
+                continue
+            results.latencies.append(time.perf_counter() - start)
+
+
+async def ws_user(ws_url: str, user: int, deadline: float, results: Results, repeat_ratio: float) -> None:
+    rng = random.Random(-user - 1)
+    try:
+        async with websockets.connect(ws_url, max_size=None) as connection:
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                first_token: Optional[float] = None
+                await connection.send(question(rng, repeat_ratio))
+                while True:
+                    frame = json.loads(await connection.recv())
+                    if frame["type"] == "delta" and first_token is None:
+                        first_token = time.perf_counter() - start
+                    elif frame["type"] in ("end", "error"):
+                        break
+                if frame["type"] == "error":
+                    results.errors += 1
+                    continue
+                results.latencies.append(time.perf_counter() - start)
+                results.first_tokens.append(first_token if first_token is not None else results.latencies[-1])
+    except (OSError, websockets.WebSocketException):
+        results.errors += 1
+
+
+async def sample_rss(pid: int, interval: float, samples: List[tuple], stop: asyncio.Event) -> None:
+    start = time.monotonic()
+    while not stop.is_set():
+        samples.append((time.monotonic() - start, rss_bytes(pid)))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+    samples.append((time.monotonic() - start, rss_bytes(pid)))
+
+
+async def wait_ready(base_url: str, server: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with status {server.returncode}")
+            try:
+                if (await client.get("/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+async def drive(args: argparse.Namespace, server: subprocess.Popen, base_url: str) -> Dict[str, Any]:
+    await wait_ready(base_url, server)
+    samples: List[tuple] = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(server.pid, args.sample_interval, samples, stop))
+
+    deadline = time.monotonic() + args.duration
+    results = {endpoint: Results(endpoint) for endpoint in args.endpoints}
+    users = []
+    for user in range(args.concurrency):
+        if "chat" in results:
+            users.append(chat_user(base_url, user, deadline, results["chat"], args.repeat_ratio))
+        if "ws" in results:
+            users.append(ws_user(base_url.replace("http", "ws", 1) + "/ws", user, deadline, results["ws"],
+                                 args.repeat_ratio))
+    start = time.perf_counter()
+    await asyncio.gather(*users)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await sampler
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+        "elapsed": elapsed,
+        "endpoints": [result.summary(elapsed) for result in results.values()],
+        "rss": [{"t": round(t, 1), "bytes": size} for t, size in samples]
+    }
+
+
+def report(results: Dict[str, Any]) -> None:
+    config = results["config"]
+    print(f"{config['concurrency']} users per endpoint for {results['elapsed']:.1f}s "
+          f"(LLM latency {config['llm_latency']}s, {config['repos']} repos)")
+    print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'ttft p50':>11}")
+    for row in results["endpoints"]:
+        first_token = f"{row['first_token_p50_ms']:.0f}ms" if "first_token_p50_ms" in row else "-"
+        print(f"{row['endpoint']:<10}{row['requests']:>10}{row['errors']:>8}{row['throughput']:>9.1f}"
+              f"{row['p50_ms']:>8.0f}ms{row['p95_ms']:>8.0f}ms{row['p99_ms']:>8.0f}ms{first_token:>11}")
+    rss = results["rss"]
+    if rss and rss[0]["bytes"]:
+        first, last = rss[0]["bytes"], rss[-1]["bytes"]
+        peak = max(sample["bytes"] for sample in rss)
+        print(f"RSS start {first / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB, end {last / 1e6:.1f} MB "
+              f"(growth {(last - first) / 1e6:+.1f} MB)")
+        step = max(1, len(rss) // 10)
+        print("RSS over time: " + ", ".join(f"{s['t']:.0f}s {s['bytes'] / 1e6:.0f}MB" for s in rss[::step]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoints", nargs="+", choices=["chat", "ws"], default=["chat", "ws"])
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users per endpoint")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="share of questions from a small fixed set")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--llm-tokens", type=int, default=16)
+    parser.add_argument("--token-interval", type=float, default=0.01)
+    parser.add_argument("--repos", type=int, default=20)
+    parser.add_argument("--readme-size", type=int, default=4000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=18700)
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="seconds between RSS samples")
+    parser.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE", help="extra settings for the server")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    llm = StubLLM(args.llm_latency, args.llm_tokens, args.token_interval).start()
+    github = StubGitHub(args.repos, args.readme_size).start()
+    env = dict(
+        os.environ,
+        GROQ_API_KEY="stub",
+        GROQ_BASE_URL=llm.url,
+        GITHUB_API_URL=github.url,
+        GITHUB_USER="stub",
+        GITHUB_TOKEN="stub",
+        **dict(setting.split("=", 1) for setting in args.env)
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+        # The service prints a line per message; keep the report readable
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        results = asyncio.run(drive(args, server, f"http://127.0.0.1:{args.port}"))
+    finally:
+        server.terminate()
+        server.wait()
+        llm.stop()
+        github.stop()
+
+    results["stub_calls"] = {"llm": llm.calls, "github": github.calls}
+    report(results)
+    print(f"Stub calls: LLM {llm.calls}, GitHub {github.calls}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Local stand-ins for the Groq and GitHub APIs used by the load test.
+
+``StubLLM`` serves OpenAI/Groq-compatible chat completions, streamed or not,
+after a configurable latency. ``StubGitHub`` serves a user's repositories,
+events and READMEs with a configurable repository count and README size,
+answering conditional requests with 304 like the real API. Both run on a
+background thread, count the requests they received and can be told to
+fail, for the tests.
+"""
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+REPLY = "The stub model answers with a short **markdown** reply about the projects listed in the prompt."
+
+
+class StubServer:
+    """A threaded HTTP server on a free local port."""
+
+    def __init__(self, handler: type):
+        self.calls = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(handler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def count(self) -> None:
+                with stub._lock:
+                    stub.calls += 1
+
+        Handler.stub = self
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _LLMHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        self.count()
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        stub = self.stub
+        with stub._lock:
+            fail = stub.fail_first > 0
+            stub.fail_first -= fail
+        if fail:
+            body = json.dumps({"error": {"message": "stub failure", "type": "stub"}}).encode("utf-8")
+            self.send_response(stub.fail_status)
+            if stub.retry_after is not None:
+                self.send_header("Retry-After", stub.retry_after)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        time.sleep(stub.latency)
+        words = [word + " " for word in REPLY.split(" ")][:stub.tokens]
+        if request.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for word in words:
+                    self._chunk(self._event({"content": word}, None))
+                    time.sleep(stub.token_interval)
+                self._chunk(self._event({}, "stop"))
+                self._chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except ConnectionError:
+                # The client closed the stream before the end
+                with stub._lock:
+                    stub.disconnects += 1
+                self.close_connection = True
+            return
+        body = json.dumps({
+            "id": "stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(words)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)}
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @staticmethod
+    def _event(delta: Dict[str, str], finish_reason: Any) -> str:
+        chunk = {
+            "id": "stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": "stub",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    def _chunk(self, data: str) -> None:
+        data = data.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class StubLLM(StubServer):
+    """Groq-compatible completions: ``latency`` seconds before the first token,
+    then ``tokens`` words ``token_interval`` seconds apart when streaming.
+    ``disconnects`` counts streams the client closed before the end. The
+    next ``fail_first`` requests are answered with ``fail_status`` and, if
+    set, a ``Retry-After`` header."""
+
+    def __init__(self, latency: float = 0.2, tokens: int = 16, token_interval: float = 0.01):
+        self.latency = latency
+        self.tokens = tokens
+        self.token_interval = token_interval
+        self.disconnects = 0
+        self.fail_first = 0
+        self.fail_status = 429
+        self.retry_after: Optional[str] = None
+        super().__init__(_LLMHandler)
+
+
+class _GitHubHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        self.count()
+        if self.stub.fail_status:
+            self.send_response(self.stub.fail_status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.stub.route(self.path.split("?", 1)[0])
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{self.stub.generation}:{self.path}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubGitHub(StubServer):
+    """A GitHub user with ``repos`` repositories whose READMEs are ``readme_size`` bytes.
+
+    Bumping ``generation`` changes every ETag, as if the user pushed. While
+    ``fail_status`` is set, every request is answered with that status.
+    """
+
+    def __init__(self, repos: int = 20, readme_size: int = 4000):
+        self.generation = 0
+        self.fail_status: Optional[int] = None
+        self.repos: List[Dict[str, Any]] = [
+            {
+                "name": f"project-{i}",
+                "description": f"Stub project number {i}",
+                "language": ["Python", "TypeScript", "Go"][i % 3],
+                "stargazers_count": i,
+                "html_url": f"https://github.com/stub/project-{i}"
+            }
+            for i in range(repos)
+        ]
+        text = f"# Project\n{'A stub README line about building services. ' * (readme_size // 43 + 1)}"
+        self.readme = {"content": base64.b64encode(text[:readme_size].encode("utf-8")).decode("ascii")}
+        super().__init__(_GitHubHandler)
+
+    def route(self, path: str) -> Any:
+        if path.endswith("/repos") and path.startswith("/users/"):
+            return self.repos
+        if path.endswith("/events"):
+            return [{"type": "PushEvent", "repo": {"name": repo["name"]}} for repo in self.repos[:10]]
+        if path.endswith("/readme"):
+            return self.readme
+        return None
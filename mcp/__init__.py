@@ -1,6 +1,10 @@
 from .protocol import MCPProtocol, ContextItem, MemoryItem, Context, Memory
+from .records import ContextRecord, MemoryRecord
 from .context import ContextManager
-from .memory import MemoryManager
+from .memory import MemoryManager, MemoryBackend, InMemoryBackend
+from .sqlite_memory import SQLiteMemoryBackend
+from .store import ContextStore
+from .conversation import ConversationStore
 
 __all__ = [
     'MCPProtocol',
@@ -8,6 +12,13 @@ __all__ = [
     'MemoryItem',
     'Context',
     'Memory',
+    'ContextRecord',
+    'MemoryRecord',
     'ContextManager',
-    'MemoryManager'
+    'MemoryManager',
+    'MemoryBackend',
+    'InMemoryBackend',
+    'SQLiteMemoryBackend',
+    'ContextStore',
+    'ConversationStore'
 ] 
\ No newline at end of file
@@ -1,92 +1,74 @@
-from typing import Dict, List, Optional, Any
-from datetime import datetime
-import uuid
-from .protocol import ContextItem, MCPProtocol
+from typing import Dict, List, Optional, Any, Tuple, Union
+import time
+from .protocol import MCPProtocol
+from .records import ContextRecord
+from .store import ContextStore
+from .conversation import ConversationStore
+
+DEFAULT_SESSION = "default"
+
+# Metadata templates shared by every item of a type; never mutated in place
+GITHUB_METADATA = {"source": "github_api", "data_type": "repository_info"}
+RAG_METADATA = {"source": "local_content", "data_type": "rag_search"}
+USER_MESSAGE_METADATA = {"source": "user_input", "data_type": "message"}
+ASSISTANT_MESSAGE_METADATA = {"source": "assistant", "data_type": "message"}
 
 class ContextManager:
     """Manages context for the MCP implementation."""
     
-    def __init__(self, mcp_protocol: MCPProtocol):
+    def __init__(self, mcp_protocol: MCPProtocol, store: Optional[ContextStore] = None,
+                 conversations: Optional[ConversationStore] = None):
         self.mcp = mcp_protocol
+        self.store = store or ContextStore(mcp_protocol)
+        self.conversations = conversations or ConversationStore()
 
-    def add_github_context(self, github_data: Dict[str, Any]) -> str:
-        """Add GitHub data to the context."""
-        item = ContextItem(
-            id=str(uuid.uuid4()),
-            type="github",
-            content=github_data,
-            metadata={
-                "source": "github_api",
-                "data_type": "repository_info"
-            },
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-            source="github",
-            relevance_score=0.8
-        )
+    def _add(self, type: str, content: Any, metadata: Dict[str, Any], source: str,
+             relevance_score: float, session_id: str, payload_key: Optional[str] = None) -> Union[int, str]:
+        now = time.time()
+        item = ContextRecord(self.mcp.new_id(), type, content, metadata, now, now, source, relevance_score)
         self.mcp.add_context_item(item)
+        self.store.track(session_id, item.id, item.content, payload_key)
         return item.id
 
-    def add_rag_context(self, rag_data: Dict[str, Any]) -> str:
+    def add_github_context(self, github_data: Dict[str, Any], session_id: str = DEFAULT_SESSION) -> Union[int, str]:
+        """Add GitHub data to the context."""
+        github_data, payload_key = self.store.intern(github_data, kind="github")
+        return self._add("github", github_data, GITHUB_METADATA, "github", 0.8, session_id, payload_key)
+
+    def add_rag_context(self, rag_data: Dict[str, Any], session_id: str = DEFAULT_SESSION) -> Union[int, str]:
         """Add RAG data to the context."""
-        item = ContextItem(
-            id=str(uuid.uuid4()),
-            type="rag",
-            content=rag_data,
-            metadata={
-                "source": "local_content",
-                "data_type": "rag_search"
-            },
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-            source="rag",
-            relevance_score=0.9
-        )
-        self.mcp.add_context_item(item)
-        return item.id
+        rag_data, payload_key = self.store.intern(rag_data, kind="rag")
+        return self._add("rag", rag_data, RAG_METADATA, "rag", 0.9, session_id, payload_key)
 
-    def add_user_message(self, message: str) -> str:
+    def add_user_message(self, message: str, session_id: str = DEFAULT_SESSION) -> Union[int, str]:
         """Add a user message to the context."""
-        item = ContextItem(
-            id=str(uuid.uuid4()),
-            type="user_message",
-            content=message,
-            metadata={
-                "source": "user_input",
-                "data_type": "message"
-            },
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-            source="user",
-            relevance_score=1.0
-        )
-        self.mcp.add_context_item(item)
-        return item.id
+        self.conversations.add(session_id, "user", message)
+        return self._add("user_message", message, USER_MESSAGE_METADATA, "user", 1.0, session_id)
 
-    def add_assistant_message(self, message: str) -> str:
+    def add_assistant_message(self, message: str, session_id: str = DEFAULT_SESSION) -> Union[int, str]:
         """Add an assistant message to the context."""
-        item = ContextItem(
-            id=str(uuid.uuid4()),
-            type="assistant_message",
-            content=message,
-            metadata={
-                "source": "assistant",
-                "data_type": "message"
-            },
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-            source="assistant",
-            relevance_score=0.7
-        )
-        self.mcp.add_context_item(item)
-        return item.id
+        self.conversations.add(session_id, "assistant", message)
+        return self._add("assistant_message", message, ASSISTANT_MESSAGE_METADATA, "assistant", 0.7, session_id)
+
+    def end_session(self, session_id: str) -> int:
+        """Release all context items and conversation history owned by a session."""
+        self.conversations.drop(session_id)
+        return self.store.drop_session(session_id)
 
-    def get_conversation_context(self, limit: int = 10) -> List[ContextItem]:
-        """Get the recent conversation context."""
-        messages = self.mcp.get_context_items(type="user_message") + \
-                  self.mcp.get_context_items(type="assistant_message")
-        messages.sort(key=lambda x: x.created_at, reverse=True)
-        return messages[:limit]
+    def get_conversation_context(self, limit: int = 10, session_id: Optional[str] = None) -> List[Any]:
+        """Get the recent conversation context.
+
+        With a ``session_id`` the turns come from that session's own history,
+        otherwise from the shared context items.
+        """
+        if session_id is not None:
+            conversation = self.conversations.get(session_id)
+            return list(conversation.turns)[-limit:] if conversation and limit > 0 else []
+        return self.mcp.get_recent_context_items(["user_message", "assistant_message"], limit)
+
+    def get_conversation_history(self, session_id: str, token_budget: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        """Get a session's prior turns as chat messages within a token budget."""
+        return self.conversations.history(session_id, token_budget)
 
     def get_relevant_context_for_query(self, query: str) -> Dict[str, Any]:
         """Get all relevant context for a given query."""
@@ -110,11 +92,11 @@ class ContextManager:
         
         return context
 
-    def update_relevance_scores(self, query: str) -> None:
-        """Update relevance scores based on the current query."""
-        for item in self.mcp.context.items:
-            # Simple relevance scoring based on content matching
-            if isinstance(item.content, str) and query.lower() in item.content.lower():
-                item.relevance_score = min(1.0, item.relevance_score + 0.2)
-            else:
-                item.relevance_score = max(0.0, item.relevance_score - 0.1)
\ No newline at end of file
+    def update_relevance_scores(self, query: str) -> int:
+        """Boost the relevance of context items that match the query.
+
+        Scores decay over time on their own, so items that do not match are
+        left untouched; matching items are found through the term index.
+        Returns how many items were boosted.
+        """
+        return self.mcp.relevance.boost(query)
@@ -0,0 +1,149 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
+
+SUMMARY_QUESTIONS = 5
+SUMMARY_QUESTION_CHARS = 120
+
+
+def approximate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class Turn:
+    """One message of a conversation with its precomputed token count."""
+
+    __slots__ = ("role", "content", "tokens")
+
+    def __init__(self, role: str, content: str, tokens: int):
+        self.role = role
+        self.content = content
+        self.tokens = tokens
+
+
+class Conversation:
+    """The recent turns of one session plus a rolling summary of older ones.
+
+    Turns are kept in a bounded deque, so recording one is O(1). Turns pushed
+    out of the deque leave their user question in the rolling summary.
+    """
+
+    def __init__(self, session_id: str, max_turns: int = 20):
+        self.session_id = session_id
+        self.turns: deque = deque()
+        self.max_turns = max_turns
+        self.tokens = 0
+        self.earlier_questions: deque = deque(maxlen=SUMMARY_QUESTIONS)
+        self.summarized_turns = 0
+
+    def add(self, role: str, content: str, tokens: int) -> None:
+        self.turns.append(Turn(role, content, tokens))
+        self.tokens += tokens
+        while len(self.turns) > self.max_turns:
+            self._summarize(self.turns.popleft())
+
+    def _summarize(self, turn: Turn) -> None:
+        self.tokens -= turn.tokens
+        self.summarized_turns += 1
+        if turn.role == "user":
+            self.earlier_questions.append(turn.content[:SUMMARY_QUESTION_CHARS])
+
+    def window(self, token_budget: int) -> Tuple[List[Turn], List[str]]:
+        """Return the newest turns that fit in ``token_budget`` and the questions left out.
+
+        The window always starts with a user turn so the LLM never sees an
+        answer without its question.
+        """
+        selected: List[Turn] = []
+        used = 0
+        for turn in reversed(self.turns):
+            if used + turn.tokens > token_budget:
+                break
+            selected.append(turn)
+            used += turn.tokens
+        while selected and selected[-1].role != "user":
+            selected.pop()
+        selected.reverse()
+
+        left_out = len(self.turns) - len(selected)
+        questions = list(self.earlier_questions)
+        for i in range(left_out):
+            turn = self.turns[i]
+            if turn.role == "user":
+                questions.append(turn.content[:SUMMARY_QUESTION_CHARS])
+        return selected, questions[-SUMMARY_QUESTIONS:]
+
+
+class ConversationStore:
+    """Per-session conversation history, bounded per session and in session count.
+
+    Each session (e.g. a WebSocket connection) has its own ``Conversation``.
+    The least recently used session is dropped once ``max_sessions`` is
+    exceeded, and callers drop a session explicitly when its connection ends.
+    """
+
+    def __init__(self, max_turns: int = 20, token_budget: int = 1000, max_sessions: int = 1000,
+                 tokenizer: Callable[[str], int] = approximate_tokens):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self.tokenizer = tokenizer
+        self.sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+        self.turns_recorded = 0
+        self.evicted_sessions = 0
+
+    def get(self, session_id: str) -> Optional[Conversation]:
+        return self.sessions.get(session_id)
+
+    def add(self, session_id: str, role: str, content: str) -> None:
+        """Append a turn to the session's conversation."""
+        conversation = self.sessions.get(session_id)
+        if conversation is None:
+            conversation = Conversation(session_id, self.max_turns)
+            self.sessions[session_id] = conversation
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evicted_sessions += 1
+        else:
+            self.sessions.move_to_end(session_id)
+        conversation.add(role, content, self.tokenizer(content))
+        self.turns_recorded += 1
+
+    def history(self, session_id: str, token_budget: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        """Return prior turns of a session as chat messages and their token count.
+
+        Recent turns are sent verbatim within the token budget; older user
+        questions are condensed into one summary message in front of them.
+        """
+        conversation = self.sessions.get(session_id)
+        if conversation is None or self.token_budget <= 0:
+            return [], 0
+        budget = self.token_budget if token_budget is None else token_budget
+
+        messages: List[Dict[str, str]] = []
+        used = 0
+        turns, questions = conversation.window(budget)
+        if questions:
+            summary = "Earlier in this conversation the user asked: " + "; ".join(questions)
+            summary_tokens = self.tokenizer(summary)
+            if summary_tokens + sum(turn.tokens for turn in turns) <= budget:
+                messages.append({"role": "system", "content": summary})
+                used += summary_tokens
+        for turn in turns:
+            messages.append({"role": turn.role, "content": turn.content})
+            used += turn.tokens
+        return messages, used
+
+    def drop(self, session_id: str) -> bool:
+        """Forget a session's conversation."""
+        return self.sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self.sessions),
+            "turns": sum(len(conversation.turns) for conversation in self.sessions.values()),
+            "turns_recorded": self.turns_recorded,
+            "evicted_sessions": self.evicted_sessions,
+            "max_turns": self.max_turns,
+            "token_budget": self.token_budget
+        }
@@ -1,103 +1,192 @@
-from typing import Dict, List, Optional, Any
-from datetime import datetime
-import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Any, Union
+from datetime import datetime, timedelta
+import time
 from .protocol import MemoryItem, MCPProtocol
+from .records import MemoryRecord
+
+# Metadata templates shared by every memory of a type; never mutated in place
+FACT_METADATA = {"source": "user_interaction", "data_type": "fact"}
+PREFERENCE_METADATA = {"source": "user_interaction", "data_type": "preference"}
+PATTERN_METADATA = {"source": "user_interaction", "data_type": "pattern"}
+QUERY_METADATA = {"source": "user_query", "data_type": "query"}
+
+# Memories recorded verbatim from user messages; never shown to the LLM,
+# since they would carry one client's text into every other client's prompt
+USER_QUERY_TYPE = "query"
+
+class MemoryBackend(ABC):
+    """Storage interface used by ``MemoryManager``."""
+
+    # Whether calls do I/O and should run in a worker thread. Backends that
+    # only touch in-process state say False and are called on the event loop.
+    blocking = True
+
+    @abstractmethod
+    def new_id(self) -> Union[int, str]:
+        """Return an id for a new memory, unique within the backend."""
+
+    @abstractmethod
+    def add(self, item: MemoryItem) -> None:
+        pass
+
+    @abstractmethod
+    def get(self, item_id: str) -> Optional[MemoryItem]:
+        pass
+
+    @abstractmethod
+    def items(self, type: Optional[str] = None) -> List[MemoryItem]:
+        pass
+
+    @abstractmethod
+    def update(self, item_id: str, updates: Dict[str, Any]) -> bool:
+        pass
+
+    @abstractmethod
+    def remove(self, item_ids: Iterable[str]) -> int:
+        pass
+
+    @abstractmethod
+    def search(self, query: str, limit: Optional[int] = None,
+               exclude_type: Optional[str] = None) -> List[MemoryItem]:
+        """Memories relevant to ``query``, most relevant first, leaving out those of ``exclude_type``."""
+
+    @abstractmethod
+    def important(self, limit: int) -> List[MemoryItem]:
+        pass
+
+    @abstractmethod
+    def forget(self, created_before: datetime, max_importance: float) -> int:
+        """Remove memories created at or before ``created_before`` with importance up to ``max_importance``."""
+
+    def flush(self) -> None:
+        """Write out any buffered changes."""
+
+    def close(self) -> None:
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+class InMemoryBackend(MemoryBackend):
+    """Keeps memories in ``MCPProtocol.memory``; nothing survives a restart.
+
+    Not thread-safe: the protocol is changed on the event loop, so it is
+    only read there too.
+    """
+
+    blocking = False
 
-class MemoryManager:
-    """Manages memory for the MCP implementation."""
-    
     def __init__(self, mcp_protocol: MCPProtocol):
         self.mcp = mcp_protocol
 
-    def add_important_fact(self, fact: str, importance: float = 0.8) -> str:
-        """Add an important fact to memory."""
-        item = MemoryItem(
-            id=str(uuid.uuid4()),
-            type="fact",
-            content=fact,
-            metadata={
-                "source": "user_interaction",
-                "data_type": "fact"
-            },
-            created_at=datetime.now(),
-            last_accessed=datetime.now(),
-            importance_score=importance
-        )
-        self.mcp.add_memory_item(item)
-        return item.id
+    def new_id(self) -> int:
+        return self.mcp.new_id()
 
-    def add_user_preference(self, preference: Dict[str, Any]) -> str:
-        """Add a user preference to memory."""
-        item = MemoryItem(
-            id=str(uuid.uuid4()),
-            type="preference",
-            content=preference,
-            metadata={
-                "source": "user_interaction",
-                "data_type": "preference"
-            },
-            created_at=datetime.now(),
-            last_accessed=datetime.now(),
-            importance_score=0.9
-        )
+    def add(self, item: MemoryItem) -> None:
         self.mcp.add_memory_item(item)
-        return item.id
 
-    def add_interaction_pattern(self, pattern: Dict[str, Any]) -> str:
-        """Add an interaction pattern to memory."""
-        item = MemoryItem(
-            id=str(uuid.uuid4()),
-            type="pattern",
-            content=pattern,
-            metadata={
-                "source": "user_interaction",
-                "data_type": "pattern"
-            },
-            created_at=datetime.now(),
-            last_accessed=datetime.now(),
-            importance_score=0.7
-        )
-        self.mcp.add_memory_item(item)
-        return item.id
+    def get(self, item_id: str) -> Optional[MemoryItem]:
+        return self.mcp.get_memory_item(item_id)
 
-    def get_relevant_memories(self, query: str) -> List[MemoryItem]:
-        """Get memories relevant to the current query."""
-        memories = self.mcp.get_memory_items()
+    def items(self, type: Optional[str] = None) -> List[MemoryItem]:
+        return self.mcp.get_memory_items(type)
+
+    def update(self, item_id: str, updates: Dict[str, Any]) -> bool:
+        return self.mcp.update_memory_item(item_id, updates)
+
+    def remove(self, item_ids: Iterable[str]) -> int:
+        return self.mcp.remove_memory_items(list(item_ids))
+
+    def search(self, query: str, limit: Optional[int] = None,
+               exclude_type: Optional[str] = None) -> List[MemoryItem]:
+        query = query.lower()
         relevant_memories = []
-        
-        for memory in memories:
+        for memory in self.mcp.get_memory_items():
+            if limit is not None and len(relevant_memories) >= limit:
+                break
+            if memory.type == exclude_type:
+                continue
             # Simple relevance check based on content matching
-            if isinstance(memory.content, str) and query.lower() in memory.content.lower():
+            if isinstance(memory.content, str) and query in memory.content.lower():
                 relevant_memories.append(memory)
             elif isinstance(memory.content, dict):
                 # Check dictionary values for matches
                 for value in memory.content.values():
-                    if isinstance(value, str) and query.lower() in value.lower():
+                    if isinstance(value, str) and query in value.lower():
                         relevant_memories.append(memory)
                         break
-        
         return relevant_memories
 
+    def important(self, limit: int) -> List[MemoryItem]:
+        return self.mcp.get_important_memories(limit)
+
+    def forget(self, created_before: datetime, max_importance: float) -> int:
+        cutoff = created_before.timestamp()
+        forgotten_ids = [
+            memory.id for memory in self.mcp.memory_index.items
+            if memory.created <= cutoff and memory.importance_score <= max_importance
+        ]
+        return self.mcp.remove_memory_items(forgotten_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "items": len(self.mcp.memory.items)}
+
+class MemoryManager:
+    """Manages memory for the MCP implementation.
+
+    Memories are stored by a ``MemoryBackend``; by default the in-memory
+    list of ``MCPProtocol``.
+    """
+    
+    def __init__(self, mcp_protocol: MCPProtocol, backend: Optional[MemoryBackend] = None):
+        self.mcp = mcp_protocol
+        self.backend = backend or InMemoryBackend(mcp_protocol)
+
+    def _add(self, type: str, content: Any, metadata: Dict[str, Any], importance: float) -> Union[int, str]:
+        now = time.time()
+        item = MemoryRecord(self.backend.new_id(), type, content, metadata, now, now, 0, importance)
+        self.backend.add(item)
+        return item.id
+
+    def add_important_fact(self, fact: str, importance: float = 0.8) -> Union[int, str]:
+        """Add an important fact to memory."""
+        return self._add("fact", fact, FACT_METADATA, importance)
+
+    def add_user_preference(self, preference: Dict[str, Any]) -> Union[int, str]:
+        """Add a user preference to memory."""
+        return self._add("preference", preference, PREFERENCE_METADATA, 0.9)
+
+    def add_interaction_pattern(self, pattern: Dict[str, Any]) -> Union[int, str]:
+        """Add an interaction pattern to memory."""
+        return self._add("pattern", pattern, PATTERN_METADATA, 0.7)
+
+    def add_user_query(self, query: str) -> Union[int, str]:
+        """Record a question a user asked; kept out of ``get_prompt_memories``."""
+        return self._add(USER_QUERY_TYPE, query, QUERY_METADATA, 0.5)
+
+    def get_relevant_memories(self, query: str, limit: Optional[int] = None) -> List[MemoryItem]:
+        """Get memories relevant to the current query."""
+        return self.backend.search(query, limit)
+
+    def get_prompt_memories(self, query: str, limit: Optional[int] = None) -> List[MemoryItem]:
+        """Memories relevant to ``query`` that may go into the system prompt (no recorded user text)."""
+        return self.backend.search(query, limit, exclude_type=USER_QUERY_TYPE)
+
     def update_memory_importance(self, memory_id: str, new_importance: float) -> bool:
         """Update the importance score of a memory item."""
-        return self.mcp.update_memory_item(memory_id, {"importance_score": new_importance})
+        return self.backend.update(memory_id, {"importance_score": new_importance})
 
     def get_important_memories(self, limit: int = 5) -> List[MemoryItem]:
         """Get the most important memories."""
-        return self.mcp.get_important_memories(limit)
+        return self.backend.important(limit)
 
     def forget_old_memories(self, days_threshold: int = 30) -> int:
         """Remove memories older than the threshold."""
-        current_time = datetime.now()
-        memories_to_keep = []
-        forgotten_count = 0
-        
-        for memory in self.mcp.memory.items:
-            age_days = (current_time - memory.created_at).days
-            if age_days <= days_threshold or memory.importance_score > 0.8:
-                memories_to_keep.append(memory)
-            else:
-                forgotten_count += 1
-        
-        self.mcp.memory.items = memories_to_keep
-        return forgotten_count
\ No newline at end of file
+        # Same cut-off as comparing whole days of age against the threshold
+        cutoff = datetime.now() - timedelta(days=days_threshold + 1)
+        return self.backend.forget(cutoff, max_importance=0.8)
+
+    def close(self) -> None:
+        """Flush and close the backend."""
+        self.backend.close()
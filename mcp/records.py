@@ -0,0 +1,125 @@
+from typing import Any, Dict, Union, TYPE_CHECKING
+from datetime import datetime
+import sys
+
+if TYPE_CHECKING:
+    from .protocol import ContextItem, MemoryItem
+
+
+class ContextRecord:
+    """Compact in-memory form of a ``ContextItem``.
+
+    Attribute names match the model, but timestamps are stored as floats
+    (``created``/``updated``; ``created_at``/``updated_at`` convert on
+    access), ``type`` and ``source`` are interned and ``metadata`` is usually
+    a shared template dict that must not be mutated in place. Convert with
+    ``to_model`` when serializing; the id keeps its type (``int`` for ids
+    from ``MCPProtocol.new_id``), so a model converted back finds the same
+    item.
+    """
+
+    __slots__ = ("id", "type", "content", "metadata", "created", "updated", "source", "relevance_score")
+
+    def __init__(self, id: Union[int, str], type: str, content: Any, metadata: Dict[str, Any],
+                 created: float, updated: float, source: str, relevance_score: float = 0.0):
+        self.id = id
+        self.type = sys.intern(type)
+        self.content = content
+        self.metadata = metadata
+        self.created = created
+        self.updated = updated
+        self.source = sys.intern(source)
+        self.relevance_score = relevance_score
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromtimestamp(self.created)
+
+    @created_at.setter
+    def created_at(self, value: datetime) -> None:
+        self.created = value.timestamp()
+
+    @property
+    def updated_at(self) -> datetime:
+        return datetime.fromtimestamp(self.updated)
+
+    @updated_at.setter
+    def updated_at(self, value: datetime) -> None:
+        self.updated = value.timestamp()
+
+    @classmethod
+    def from_model(cls, item: "ContextItem") -> "ContextRecord":
+        return cls(item.id, item.type, item.content, item.metadata, item.created_at.timestamp(),
+                   item.updated_at.timestamp(), item.source, item.relevance_score)
+
+    def to_model(self) -> "ContextItem":
+        from .protocol import ContextItem
+        return ContextItem(
+            id=self.id,
+            type=self.type,
+            content=self.content,
+            metadata=dict(self.metadata),
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+            source=self.source,
+            relevance_score=self.relevance_score
+        )
+
+
+class MemoryRecord:
+    """Compact in-memory form of a ``MemoryItem``; see ``ContextRecord``."""
+
+    __slots__ = ("id", "type", "content", "metadata", "created", "accessed", "access_count", "importance_score")
+
+    def __init__(self, id: Union[int, str], type: str, content: Any, metadata: Dict[str, Any],
+                 created: float, accessed: float, access_count: int = 0, importance_score: float = 0.0):
+        self.id = id
+        self.type = sys.intern(type)
+        self.content = content
+        self.metadata = metadata
+        self.created = created
+        self.accessed = accessed
+        self.access_count = access_count
+        self.importance_score = importance_score
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromtimestamp(self.created)
+
+    @created_at.setter
+    def created_at(self, value: datetime) -> None:
+        self.created = value.timestamp()
+
+    @property
+    def last_accessed(self) -> datetime:
+        return datetime.fromtimestamp(self.accessed)
+
+    @last_accessed.setter
+    def last_accessed(self, value: datetime) -> None:
+        self.accessed = value.timestamp()
+
+    @classmethod
+    def from_model(cls, item: "MemoryItem") -> "MemoryRecord":
+        return cls(item.id, item.type, item.content, item.metadata, item.created_at.timestamp(),
+                   item.last_accessed.timestamp(), item.access_count, item.importance_score)
+
+    def to_model(self) -> "MemoryItem":
+        from .protocol import MemoryItem
+        return MemoryItem(
+            id=self.id,
+            type=self.type,
+            content=self.content,
+            metadata=dict(self.metadata),
+            created_at=self.created_at,
+            last_accessed=self.last_accessed,
+            access_count=self.access_count,
+            importance_score=self.importance_score
+        )
+
+
+def as_context_record(item: Union["ContextItem", ContextRecord]) -> ContextRecord:
+    return item if isinstance(item, ContextRecord) else ContextRecord.from_model(item)
+
+
+def as_memory_record(item: Union["MemoryItem", MemoryRecord]) -> MemoryRecord:
+    return item if isinstance(item, MemoryRecord) else MemoryRecord.from_model(item)
@@ -0,0 +1,268 @@
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from array import array
+from collections import OrderedDict
+from operator import itemgetter, neg
+import heapq
+import itertools
+import math
+import time
+from rag_index import tokenize
+from .checkpoint import pack_column, unpack_column
+from .terms import content_text
+
+MIN_SCORE = 1e-9
+# Payloads at least this long have their terms cached by identity; pooled
+# snapshots are added again with every message.
+TERM_CACHE_MIN_CHARS = 1024
+TERM_CACHE_SIZE = 64
+# Terms found in more than this share of the items (once there are at least
+# COMMON_TERM_MIN_ITEMS) do not tell items apart and are ignored in queries.
+COMMON_TERM_SHARE = 0.1
+COMMON_TERM_MIN_ITEMS = 100
+
+
+class RelevanceIndex:
+    """Time-decayed relevance scores of context items, computed when read.
+
+    Scores halve every ``half_life`` seconds. Instead of rewriting every item
+    as time passes, each item keeps ``log(score) + decay * t`` from the last
+    time its score was set (forward decay). The current score is recovered
+    from that on read, and ordering items by the stored value orders them by
+    current score at any moment, so a lazily cleaned heap serves the top items
+    without a scan. Query boosts find matching items through a term index.
+
+    After ``load_state`` the heap is rebuilt on first use and each term's
+    postings when the term is first looked up.
+    """
+
+    STATE_COLUMNS = ("landmark", "ids", "weights", "terms", "offsets", "postings")
+
+    def __init__(self, half_life: float = 900.0, boost: float = 0.2, clock: Callable[[], float] = time.time):
+        self.half_life = half_life
+        self.boost_amount = boost
+        self.clock = clock
+        self.decay = math.log(2) / half_life if half_life > 0 else 0.0
+        self.landmark = clock()
+        self.log_weights: Dict[str, float] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self.item_terms: Dict[str, FrozenSet[str]] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self._term_cache: "OrderedDict[int, Tuple[Any, FrozenSet[str]]]" = OrderedDict()
+        # Restored but not yet materialized: (negated weights, ids) for the
+        # heap, and term -> position in (offsets, ids of all postings)
+        self._frozen_heap: Optional[Tuple[array, List[Any]]] = None
+        self._frozen_terms: Dict[str, int] = {}
+        self._frozen_postings: Optional[Tuple[array, List[Any]]] = None
+        # Whether postings may hold ids of removed items
+        self._stale = False
+        self.boosts = 0
+
+    def __len__(self) -> int:
+        return len(self.log_weights)
+
+    def _log_weight(self, score: float, at: float) -> float:
+        return math.log(max(score, MIN_SCORE)) + self.decay * (at - self.landmark)
+
+    def _thaw_heap(self) -> None:
+        # Saved in descending weight order, which is already a valid heap
+        weights, ids = self._frozen_heap
+        self._frozen_heap = None
+        pushed, self._heap = self._heap, list(zip(weights, self._sequence, ids))
+        for entry in pushed:
+            heapq.heappush(self._heap, entry)
+
+    def _postings(self, term: str) -> Optional[Set[Any]]:
+        ids = self.postings.get(term)
+        if ids is None and self._frozen_terms:
+            position = self._frozen_terms.pop(term, None)
+            if position is not None:
+                offsets, members = self._frozen_postings
+                ids = set(filter(self.log_weights.__contains__, members[offsets[position]:offsets[position + 1]]))
+                if ids:
+                    self.postings[term] = ids
+                else:
+                    ids = None
+        return ids
+
+    def _thaw_postings(self) -> None:
+        for term in list(self._frozen_terms):
+            self._postings(term)
+        self._frozen_postings = None
+
+    def _set(self, item_id: str, log_weight: float) -> None:
+        self.log_weights[item_id] = log_weight
+        heapq.heappush(self._heap, (-log_weight, next(self._sequence), item_id))
+        # Superseded heap entries are skipped lazily; compact once they dominate
+        if len(self._heap) > 2 * len(self.log_weights) + 64:
+            self._frozen_heap = None
+            self._heap = [(-weight, next(self._sequence), key) for key, weight in self.log_weights.items()]
+            heapq.heapify(self._heap)
+
+    def _terms(self, content: Any) -> FrozenSet[str]:
+        key = id(content)
+        cached = self._term_cache.get(key)
+        if cached is not None and cached[0] is content:
+            self._term_cache.move_to_end(key)
+            return cached[1]
+        text = content_text(content)
+        terms = frozenset(tokenize(text))
+        if len(text) >= TERM_CACHE_MIN_CHARS:
+            self._term_cache[key] = (content, terms)
+            if len(self._term_cache) > TERM_CACHE_SIZE:
+                self._term_cache.popitem(last=False)
+        return terms
+
+    def add(self, item: Any, score: Optional[float] = None, at: Optional[float] = None) -> None:
+        """Index ``item`` with its ``relevance_score`` as of its creation time."""
+        if item.id in self.log_weights:
+            self.remove(item.id)
+        score = item.relevance_score if score is None else score
+        at = item.created if at is None else at
+        self._set(item.id, self._log_weight(score, at))
+        terms = self._terms(item.content)
+        self.item_terms[item.id] = terms
+        for term in terms:
+            ids = self._postings(term)
+            if ids is None:
+                ids = self.postings[term] = set()
+            ids.add(item.id)
+
+    def remove(self, item_id: str) -> bool:
+        if self.log_weights.pop(item_id, None) is None:
+            return False
+        # Items restored from a checkpoint have no term list; their ids are
+        # dropped from the postings lazily, see ``_postings`` and ``matches``
+        terms = self.item_terms.pop(item_id, None)
+        if terms is None:
+            self._stale = True
+            return True
+        for term in terms:
+            ids = self.postings[term]
+            ids.discard(item_id)
+            if not ids:
+                del self.postings[term]
+        return True
+
+    def rebuild(self, items: Iterable[Any]) -> None:
+        self.log_weights = {}
+        self.postings = {}
+        self.item_terms = {}
+        self._heap = []
+        self._frozen_heap = None
+        self._frozen_terms = {}
+        self._frozen_postings = None
+        self._stale = False
+        for item in items:
+            self.add(item)
+
+    def export_state(self) -> Dict[str, Any]:
+        """Checkpoint columns: weights in heap order and all postings in one column."""
+        self._thaw_postings()
+        if self._stale:
+            for term in list(self.postings):
+                ids = self.postings[term] = set(filter(self.log_weights.__contains__, self.postings[term]))
+                if not ids:
+                    del self.postings[term]
+            self._stale = False
+        ordered = sorted(self.log_weights.items(), key=itemgetter(1), reverse=True)
+        return {
+            "landmark": self.landmark,
+            "ids": pack_column(list(map(itemgetter(0), ordered))),
+            "weights": array("d", map(neg, map(itemgetter(1), ordered))),
+            "terms": list(self.postings),
+            "offsets": array("q", itertools.chain((0,), itertools.accumulate(map(len, self.postings.values())))),
+            "postings": pack_column(list(itertools.chain.from_iterable(self.postings.values())))
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Restore the columns of ``export_state``, replacing the current index."""
+        ids = unpack_column(state["ids"])
+        weights = state["weights"]
+        self.landmark = state["landmark"]
+        self.log_weights = dict(zip(ids, map(neg, weights)))
+        self.postings = {}
+        self.item_terms = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._frozen_heap = (weights, ids)
+        self._frozen_terms = dict(zip(state["terms"], itertools.count()))
+        self._frozen_postings = (state["offsets"], unpack_column(state["postings"]))
+        self._stale = False
+
+    def score(self, item_id: str, now: Optional[float] = None) -> float:
+        """The current, decayed score of an item (0 if unknown)."""
+        log_weight = self.log_weights.get(item_id)
+        if log_weight is None:
+            return 0.0
+        now = self.clock() if now is None else now
+        return math.exp(log_weight - self.decay * (now - self.landmark))
+
+    def set_score(self, item_id: str, score: float) -> None:
+        """Set an item's score as of now."""
+        if item_id in self.log_weights:
+            self._set(item_id, self._log_weight(score, self.clock()))
+
+    def matches(self, query: str) -> Dict[str, float]:
+        """Items containing query terms, with the share of the terms each contains."""
+        terms = set(tokenize(query))
+        common = max(COMMON_TERM_MIN_ITEMS, COMMON_TERM_SHARE * len(self.log_weights))
+        matched: Dict[str, float] = {}
+        live = self.log_weights
+        for term in terms:
+            ids = self._postings(term) or ()
+            if len(ids) > common:
+                continue
+            for item_id in ids:
+                if item_id in live:
+                    matched[item_id] = matched.get(item_id, 0.0) + 1.0 / len(terms)
+        return matched
+
+    def boost(self, query: str) -> int:
+        """Raise the scores of items matching ``query``; returns how many matched."""
+        now = self.clock()
+        matched = self.matches(query)
+        for item_id, share in matched.items():
+            score = min(1.0, self.score(item_id, now) + self.boost_amount * share)
+            self._set(item_id, self._log_weight(score, now))
+        self.boosts += 1
+        return len(matched)
+
+    def top(self, limit: int) -> List[str]:
+        """Ids of the ``limit`` items with the highest current score."""
+        if self._frozen_heap is not None:
+            self._thaw_heap()
+        result: List[str] = []
+        kept = []
+        while self._heap and len(result) < limit:
+            entry = heapq.heappop(self._heap)
+            neg_weight, _, item_id = entry
+            if self.log_weights.get(item_id) != -neg_weight or item_id in result:
+                continue
+            result.append(item_id)
+            kept.append(entry)
+        for entry in kept:
+            heapq.heappush(self._heap, entry)
+        return result
+
+    def rank(self, query: str, limit: int) -> List[Tuple[float, str]]:
+        """Top ``(score, id)`` pairs for ``query``: current score plus a bonus for matching terms."""
+        now = self.clock()
+        matched = self.matches(query) if query else {}
+        candidates = set(self.top(limit))
+        candidates.update(matched)
+        scored = [
+            (self.score(item_id, now) + self.boost_amount * matched.get(item_id, 0.0), item_id)
+            for item_id in candidates
+        ]
+        # By score only: ids of mixed types (int and str) cannot be compared on ties
+        return heapq.nlargest(limit, scored, key=lambda pair: pair[0])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": len(self.log_weights),
+            "terms": len(self.postings) + len(self._frozen_terms),
+            "heap_entries": len(self._heap),
+            "half_life": self.half_life,
+            "boosts": self.boosts
+        }
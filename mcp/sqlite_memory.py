@@ -0,0 +1,233 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from .protocol import MemoryItem
+from .memory import MemoryBackend
+from rag_index import tokenize
+from .records import MemoryRecord, as_memory_record
+from .terms import content_text
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_accessed REAL NOT NULL,
+    access_count INTEGER NOT NULL DEFAULT 0,
+    importance_score REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_memories_importance ON memories (importance_score DESC);
+CREATE INDEX IF NOT EXISTS idx_memories_created_at ON memories (created_at);
+CREATE INDEX IF NOT EXISTS idx_memories_type ON memories (type);
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5 (text);
+"""
+
+COLUMNS = "id, type, content, metadata, created_at, last_accessed, access_count, importance_score"
+
+
+def match_expression(query: str) -> Optional[str]:
+    """An FTS5 query matching any of the terms of ``query``, ranked by BM25.
+
+    Terms have plurals folded, so each is matched as a prefix: "project"
+    also finds "projects".
+    """
+    terms = dict.fromkeys(tokenize(query))
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"*' for term in terms)
+
+
+class SQLiteMemoryBackend(MemoryBackend):
+    """Stores memories in a local SQLite database so they survive restarts.
+
+    An FTS5 table ranks ``search`` results by BM25, weighted by importance,
+    and indexes on ``importance_score`` and ``created_at`` serve
+    ``important`` and ``forget``. The database runs in WAL mode so other
+    processes can read while this one writes. New memories are buffered and
+    written in one transaction once ``batch_size`` accumulate, when an add
+    finds the oldest buffered one ``flush_interval`` seconds old, before any
+    read, and on ``close``, which the app calls at shutdown.
+    """
+
+    def __init__(self, path: str = "memory.db", batch_size: int = 64, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._pending: List[Tuple[tuple, str]] = []
+        self._pending_since = 0.0
+        self.flushes = 0
+        self.writes = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _row(item: MemoryRecord) -> tuple:
+        return (
+            str(item.id),
+            item.type,
+            json.dumps(item.content, default=str),
+            json.dumps(item.metadata, default=str),
+            item.created,
+            item.accessed,
+            item.access_count,
+            item.importance_score
+        )
+
+    @staticmethod
+    def _item(row: tuple) -> MemoryRecord:
+        return MemoryRecord(row[0], row[1], json.loads(row[2]), json.loads(row[3]), row[4], row[5], row[6], row[7])
+
+    def new_id(self) -> str:
+        # Ids must stay unique across restarts and processes sharing the file
+        return uuid.uuid4().hex
+
+    def _query(self, sql: str, params: tuple = ()) -> List[MemoryRecord]:
+        with self._lock:
+            self.flush()
+            return [self._item(row) for row in self.conn.execute(sql, params)]
+
+    def add(self, item: MemoryItem) -> None:
+        item = as_memory_record(item)
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append((self._row(item), content_text(item.content)))
+            if len(self._pending) >= self.batch_size or \
+                    time.monotonic() - self._pending_since >= self.flush_interval:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    f"INSERT INTO memories ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET type = excluded.type, content = excluded.content, "
+                    "metadata = excluded.metadata, created_at = excluded.created_at, "
+                    "last_accessed = excluded.last_accessed, access_count = excluded.access_count, "
+                    "importance_score = excluded.importance_score",
+                    [row for row, _ in pending]
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO memories_fts (rowid, text) SELECT rowid, ? FROM memories WHERE id = ?",
+                    [(text, row[0]) for row, text in pending]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.flushes += 1
+            self.writes += len(pending)
+
+    def get(self, item_id: str) -> Optional[MemoryRecord]:
+        items = self._query(f"SELECT {COLUMNS} FROM memories WHERE id = ?", (item_id,))
+        return items[0] if items else None
+
+    def items(self, type: Optional[str] = None) -> List[MemoryRecord]:
+        if type:
+            return self._query(f"SELECT {COLUMNS} FROM memories WHERE type = ? ORDER BY rowid", (type,))
+        return self._query(f"SELECT {COLUMNS} FROM memories ORDER BY rowid")
+
+    def update(self, item_id: str, updates: Dict[str, Any]) -> bool:
+        with self._lock:
+            item = self.get(item_id)
+            if item is None:
+                return False
+            for key, value in updates.items():
+                setattr(item, key, value)
+            item.accessed = time.time()
+            item.access_count += 1
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.execute(
+                    "UPDATE memories SET id = ?, type = ?, content = ?, metadata = ?, created_at = ?, "
+                    "last_accessed = ?, access_count = ?, importance_score = ? WHERE id = ?",
+                    self._row(item) + (item_id,)
+                )
+                if "content" in updates:
+                    self.conn.execute(
+                        "UPDATE memories_fts SET text = ? WHERE rowid = (SELECT rowid FROM memories WHERE id = ?)",
+                        (content_text(item.content), str(item.id))
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return True
+
+    def _delete(self, where: str, params: tuple) -> int:
+        with self._lock:
+            self.flush()
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.execute(f"DELETE FROM memories_fts WHERE rowid IN (SELECT rowid FROM memories WHERE {where})", params)
+                removed = self.conn.execute(f"DELETE FROM memories WHERE {where}", params).rowcount
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return removed
+
+    def remove(self, item_ids: Iterable[str]) -> int:
+        item_ids = list(item_ids)
+        if not item_ids:
+            return 0
+        removed = 0
+        # Stay below SQLite's limit on bound parameters
+        for start in range(0, len(item_ids), 500):
+            chunk = tuple(item_ids[start:start + 500])
+            removed += self._delete(f"id IN ({', '.join('?' * len(chunk))})", chunk)
+        return removed
+
+    def search(self, query: str, limit: Optional[int] = None,
+               exclude_type: Optional[str] = None) -> List[MemoryRecord]:
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        return self._query(
+            f"SELECT {', '.join('m.' + column for column in COLUMNS.split(', '))} "
+            "FROM memories_fts JOIN memories m ON m.rowid = memories_fts.rowid "
+            "WHERE memories_fts MATCH ? AND m.type IS NOT ? "
+            "ORDER BY bm25(memories_fts) * (0.5 + m.importance_score) LIMIT ?",
+            (expression, exclude_type, -1 if limit is None else limit)
+        )
+
+    def important(self, limit: int) -> List[MemoryRecord]:
+        return self._query(
+            f"SELECT {COLUMNS} FROM memories ORDER BY importance_score DESC, rowid LIMIT ?", (limit,)
+        )
+
+    def forget(self, created_before: datetime, max_importance: float) -> int:
+        return self._delete("created_at <= ? AND importance_score <= ?",
+                            (created_before.timestamp(), max_importance))
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self.conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self.conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+            return {
+                "backend": "sqlite",
+                "path": self.path,
+                "items": count + len(self._pending),
+                "pending": len(self._pending),
+                "flushes": self.flushes,
+                "writes": self.writes
+            }
@@ -0,0 +1,267 @@
+from typing import Dict, List, Optional, Any, Tuple
+from array import array
+from collections import Counter, OrderedDict, deque
+from itertools import accumulate
+import hashlib
+import json
+import time
+from .checkpoint import pack_column, paused_gc, unpack_column
+from .protocol import MCPProtocol
+
+ITEM_OVERHEAD_BYTES = 256
+
+
+def approximate_size(content: Any) -> int:
+    """Approximate the in-memory footprint of a context payload in bytes."""
+    if isinstance(content, str):
+        return len(content) + ITEM_OVERHEAD_BYTES
+    try:
+        return len(json.dumps(content, default=str)) + ITEM_OVERHEAD_BYTES
+    except (TypeError, ValueError):
+        return ITEM_OVERHEAD_BYTES
+
+
+class PooledPayload:
+    """A deduplicated payload shared by every context item that references it."""
+
+    def __init__(self, key: str, content: Any, size: int):
+        self.key = key
+        self.content = content
+        self.size = size
+        self.refcount = 0
+
+
+class SessionContext:
+    """Bookkeeping for the context items owned by one session."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        # (item id, bytes charged to the session, pooled payload key)
+        self.items: deque = deque()
+        self.bytes = 0
+        self.last_used = time.monotonic()
+
+
+class ContextStore:
+    """Bounded, per-session ownership of the items in ``MCPProtocol.context``.
+
+    Every context item belongs to a session (e.g. a WebSocket connection).
+    Sessions are capped by item count and approximate bytes, idle sessions are
+    evicted in LRU order once the global caps are reached, and evicted items
+    are removed from the protocol. Large payloads such as the GitHub snapshot
+    or the RAG text are pooled by content hash so identical copies are stored
+    once and only referenced from each item.
+    """
+
+    def __init__(self, mcp_protocol: MCPProtocol, max_items_per_session: int = 200,
+                 max_bytes_per_session: int = 1_000_000, max_sessions: int = 1000,
+                 max_total_items: int = 50_000, max_total_bytes: int = 100_000_000):
+        self.mcp = mcp_protocol
+        self.max_items_per_session = max_items_per_session
+        self.max_bytes_per_session = max_bytes_per_session
+        self.max_sessions = max_sessions
+        self.max_total_items = max_total_items
+        self.max_total_bytes = max_total_bytes
+        self.sessions: "OrderedDict[str, SessionContext]" = OrderedDict()
+        self.payloads: Dict[str, PooledPayload] = {}
+        self.total_items = 0
+        self.session_bytes = 0
+        self.payload_bytes = 0
+        self.evicted_items = 0
+        self.evicted_sessions = 0
+        self.dedup_hits = 0
+        self._recent: Dict[str, Tuple[Any, str]] = {}
+
+    @property
+    def total_bytes(self) -> int:
+        return self.session_bytes + self.payload_bytes
+
+    def intern(self, content: Any, kind: str = "payload") -> Tuple[Any, str]:
+        """Return the pooled copy of ``content`` and its key.
+
+        The last payload seen for each ``kind`` is remembered by identity, so
+        passing the same snapshot object again skips re-hashing it.
+        """
+        recent = self._recent.get(kind)
+        if recent is not None and recent[0] is content and recent[1] in self.payloads:
+            self.dedup_hits += 1
+            return self.payloads[recent[1]].content, recent[1]
+
+        encoded = content.encode("utf-8") if isinstance(content, str) else \
+            json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+        key = hashlib.sha1(encoded).hexdigest()
+        pooled = self.payloads.get(key)
+        if pooled is None:
+            pooled = PooledPayload(key, content, len(encoded) + ITEM_OVERHEAD_BYTES)
+            self.payloads[key] = pooled
+            self.payload_bytes += pooled.size
+        else:
+            self.dedup_hits += 1
+        self._recent[kind] = (content, key)
+        return pooled.content, key
+
+    def _session(self, session_id: str) -> SessionContext:
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = SessionContext(session_id)
+            self.sessions[session_id] = session
+        else:
+            self.sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        return session
+
+    def track(self, session_id: str, item_id: str, content: Any, payload_key: Optional[str] = None) -> None:
+        """Record that ``item_id`` belongs to ``session_id`` and enforce the caps."""
+        session = self._session(session_id)
+        if payload_key is not None:
+            self.payloads[payload_key].refcount += 1
+            size = ITEM_OVERHEAD_BYTES
+        else:
+            size = approximate_size(content)
+        session.items.append((item_id, size, payload_key))
+        session.bytes += size
+        self.session_bytes += size
+        self.total_items += 1
+
+        evicted: List[str] = []
+        while session.items and (len(session.items) > self.max_items_per_session or
+                                 session.bytes > self.max_bytes_per_session):
+            evicted.append(self._pop_oldest(session))
+
+        while len(self.sessions) > 1 and (len(self.sessions) > self.max_sessions or
+                                          self.total_items > self.max_total_items or
+                                          self.total_bytes > self.max_total_bytes):
+            idle_id = next(iter(self.sessions))
+            evicted.extend(self._release(self.sessions.pop(idle_id)))
+            self.evicted_sessions += 1
+
+        while session.items and (self.total_items > self.max_total_items or
+                                 self.total_bytes > self.max_total_bytes):
+            evicted.append(self._pop_oldest(session))
+
+        if evicted:
+            self.evicted_items += len(evicted)
+            self.mcp.remove_context_items(evicted)
+
+    def _pop_oldest(self, session: SessionContext) -> str:
+        item_id, size, payload_key = session.items.popleft()
+        self._discharge(session, size, payload_key)
+        return item_id
+
+    def _discharge(self, session: SessionContext, size: int, payload_key: Optional[str]) -> None:
+        session.bytes -= size
+        self.session_bytes -= size
+        self.total_items -= 1
+        if payload_key is not None:
+            pooled = self.payloads[payload_key]
+            pooled.refcount -= 1
+            if pooled.refcount <= 0:
+                del self.payloads[payload_key]
+                self.payload_bytes -= pooled.size
+
+    def _release(self, session: SessionContext) -> List[str]:
+        item_ids = []
+        while session.items:
+            item_ids.append(self._pop_oldest(session))
+        return item_ids
+
+    def drop_session(self, session_id: str) -> int:
+        """Remove a session and all of its context items."""
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return 0
+        item_ids = self._release(session)
+        self.mcp.remove_context_items(item_ids)
+        return len(item_ids)
+
+    def session_item_ids(self, session_id: str) -> List[str]:
+        """Return the ids of the items owned by a session, oldest first."""
+        session = self.sessions.get(session_id)
+        return [item_id for item_id, _, _ in session.items] if session else []
+
+    def export_state(self) -> Dict[str, Any]:
+        """Checkpoint columns for session ownership and pooled payloads, in LRU order."""
+        keys = list(self.payloads)
+        codes = {key: i for i, key in enumerate(keys)}
+        item_ids: List[Any] = []
+        sizes = array("q")
+        payload_codes = array("i")
+        lengths = array("I")
+        for session in self.sessions.values():
+            lengths.append(len(session.items))
+            for item_id, size, payload_key in session.items:
+                item_ids.append(item_id)
+                sizes.append(size)
+                payload_codes.append(-1 if payload_key is None else codes[payload_key])
+        # Payload contents are taken back from the restored context items
+        owners: List[Any] = [None] * len(keys)
+        for item_id, code in zip(item_ids, payload_codes):
+            if code >= 0 and owners[code] is None:
+                owners[code] = item_id
+        return {
+            "sessions": list(self.sessions),
+            "lengths": lengths,
+            "item_ids": pack_column(item_ids),
+            "sizes": sizes,
+            "payload_codes": payload_codes,
+            "payload_keys": keys,
+            "payload_sizes": array("q", (self.payloads[key].size for key in keys)),
+            "payload_owners": owners
+        }
+
+    def load_state(self, state: Any) -> None:
+        """Restore ``export_state`` columns; the protocol must be restored first."""
+        with paused_gc():
+            keys = state["payload_keys"]
+            payloads: Dict[str, PooledPayload] = {}
+            for key, size, owner in zip(keys, state["payload_sizes"], state["payload_owners"]):
+                item = self.mcp.get_context_item(owner)
+                if item is not None:
+                    payloads[key] = PooledPayload(key, item.content, size)
+            payload_codes = state["payload_codes"]
+            for code, refcount in Counter(payload_codes).items():
+                if code >= 0 and keys[code] in payloads:
+                    payloads[keys[code]].refcount = refcount
+
+            item_ids = unpack_column(state["item_ids"])
+            sizes = state["sizes"]
+            resolved = [key if key in payloads else None for key in keys] + [None]
+            payload_keys = list(map(resolved.__getitem__, payload_codes))
+            sessions: "OrderedDict[str, SessionContext]" = OrderedDict()
+            now = time.monotonic()
+            start = 0
+            for session_id, end in zip(state["sessions"], accumulate(state["lengths"])):
+                session = SessionContext(session_id)
+                session.items = deque(zip(item_ids[start:end], sizes[start:end], payload_keys[start:end]))
+                session.bytes = sum(sizes[start:end])
+                session.last_used = now
+                sessions[session_id] = session
+                start = end
+
+            self.sessions = sessions
+            self.payloads = payloads
+            self.total_items = len(item_ids)
+            self.session_bytes = sum(sizes)
+            self.payload_bytes = sum(pooled.size for pooled in payloads.values())
+            self._recent = {}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return memory usage statistics for the store."""
+        return {
+            "sessions": len(self.sessions),
+            "items": self.total_items,
+            "approx_bytes": self.total_bytes,
+            "session_bytes": self.session_bytes,
+            "pooled_payloads": len(self.payloads),
+            "pooled_bytes": self.payload_bytes,
+            "dedup_hits": self.dedup_hits,
+            "evicted_items": self.evicted_items,
+            "evicted_sessions": self.evicted_sessions,
+            "limits": {
+                "max_items_per_session": self.max_items_per_session,
+                "max_bytes_per_session": self.max_bytes_per_session,
+                "max_sessions": self.max_sessions,
+                "max_total_items": self.max_total_items,
+                "max_total_bytes": self.max_total_bytes
+            }
+        }
@@ -0,0 +1,14 @@
+from typing import Any
+
+
+def content_text(content: Any) -> str:
+    """The searchable text of a context or memory payload.
+
+    Strings are used whole; for dicts only the top-level string values count.
+    Terms are taken from it with ``rag_index.tokenize``, like RAG lines.
+    """
+    if isinstance(content, str):
+        return content
+    if isinstance(content, dict):
+        return "\n".join(value for value in content.values() if isinstance(value, str))
+    return ""
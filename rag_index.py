@@ -0,0 +1,259 @@
+import re
+import math
+import heapq
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours yourself yourselves tell know
+""".split())
+
+
+# Other words for the terms in the section headers and field names of
+# info.txt, by the term they stand for. The fast path reads a query term
+# listed here as that term; semantic search adds the term to the query.
+SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "email": ("mail", "gmail"),
+    "contact": ("reach", "contacts", "handle", "social", "socials", "phone"),
+    "instagram": ("insta",),
+    "location": ("live", "lives", "living", "located", "city", "based"),
+    "native": ("hometown", "home"),
+    "birth": ("born", "birthday", "dob", "age"),
+    "education": ("study", "studied", "studying", "college", "school", "degree", "qualification",
+                  "university", "educational"),
+    "language": ("speak", "speaks", "spoken"),
+    "hobbie": ("hobby", "interest", "pastime", "free", "leisure"),
+    "movie": ("film",),
+    "favorite": ("favourite",),
+    "about": ("bio", "summary", "introduction", "himself"),
+    "objective": ("goal", "aim", "career"),
+    "title": ("job", "role"),
+    "experience": ("work",),
+    "expertise": ("skill",),
+}
+
+
+def normalize_term(token: str) -> str:
+    """Fold simple plurals so "projects" and "project" share a term."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase, stop-word-free, normalized terms."""
+    return [normalize_term(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def synonym_terms(synonyms: Dict[str, Tuple[str, ...]] = SYNONYMS) -> Dict[str, str]:
+    """Map each normalized synonym to the term it stands for."""
+    return {normalize_term(word): term for term, words in synonyms.items() for word in words}
+
+
+# Markdown images/badges and HTML tags carry no searchable text
+MARKUP_PATTERN = re.compile(r"!\[[^\]]*\]\([^)]*\)|<[^>]+>")
+PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+
+
+def chunk_passages(text: str, words: int = 80, limit: int = 40) -> List[str]:
+    """Split a document (e.g. a README) into passages of about ``words`` words.
+
+    Passages start at markdown headings. Paragraphs are kept together and
+    short ones are merged with the paragraphs that follow; longer paragraphs
+    are split. Each passage is a single line, and at most ``limit`` passages
+    are returned.
+    """
+    passages: List[str] = []
+    current: List[str] = []
+    for paragraph in PARAGRAPH_PATTERN.split(MARKUP_PATTERN.sub(" ", text)):
+        paragraph_words = paragraph.split()
+        # A markdown heading starts a new passage
+        if current and paragraph_words and paragraph_words[0].startswith("#"):
+            passages.append(" ".join(current))
+            current = []
+        while paragraph_words:
+            room = words - len(current)
+            current.extend(paragraph_words[:room])
+            paragraph_words = paragraph_words[room:]
+            if len(current) >= words:
+                passages.append(" ".join(current))
+                current = []
+        if len(current) >= words // 2:
+            passages.append(" ".join(current))
+            current = []
+        if len(passages) >= limit:
+            return passages[:limit]
+    if current:
+        passages.append(" ".join(current))
+    return passages[:limit]
+
+
+def ngrams(term: str, n: int = 3) -> Set[str]:
+    """Character n-grams of a term, padded so short terms still have some."""
+    padded = f" {term} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class SectionIndex:
+    """Tokenized lines and per-term postings for one section."""
+
+    __slots__ = ("name", "lines", "lengths", "postings")
+
+    def __init__(self, name: str, content: str):
+        self.name = name
+        self.lines: List[str] = [line.strip() for line in content.split("\n") if line.strip()]
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        # Header terms are added to every line so "education" finds the
+        # lines of the Education section.
+        header_terms = tokenize(name) if name != "general" else []
+        for line_no, line in enumerate(self.lines):
+            terms = tokenize(line) + header_terms
+            self.lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, []).append((line_no, tf))
+
+
+class InvertedIndex:
+    """BM25-ranked inverted index over the lines of many sections.
+
+    Each line is a document. Sections can be added and removed individually,
+    which keeps corpus statistics up to date without re-tokenizing the other
+    sections. Query terms missing from the vocabulary are expanded to similar
+    vocabulary terms through a character trigram index.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.sections: Dict[str, SectionIndex] = {}
+        self.postings: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+        self.df: Dict[str, int] = {}
+        self.gram_index: Dict[str, Set[str]] = {}
+        self.doc_count = 0
+        self.total_length = 0
+
+    @classmethod
+    def from_sections(cls, sections: Dict[str, str]) -> "InvertedIndex":
+        index = cls()
+        for name, content in sections.items():
+            index.add_section(SectionIndex(name, content))
+        return index
+
+    def copy(self) -> "InvertedIndex":
+        """Copy the index structure, sharing the immutable section indexes."""
+        clone = InvertedIndex(self.k1, self.b)
+        clone.sections = dict(self.sections)
+        clone.postings = {term: dict(by_section) for term, by_section in self.postings.items()}
+        clone.df = dict(self.df)
+        clone.gram_index = {gram: set(terms) for gram, terms in self.gram_index.items()}
+        clone.doc_count = self.doc_count
+        clone.total_length = self.total_length
+        return clone
+
+    def add_section(self, section: SectionIndex) -> None:
+        if section.name in self.sections:
+            self.remove_section(section.name)
+        self.sections[section.name] = section
+        self.doc_count += len(section.lines)
+        self.total_length += sum(section.lengths)
+        for term, postings in section.postings.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                for gram in ngrams(term):
+                    self.gram_index.setdefault(gram, set()).add(term)
+            self.postings[term][section.name] = postings
+            self.df[term] = self.df.get(term, 0) + len(postings)
+
+    def remove_section(self, name: str) -> None:
+        section = self.sections.pop(name, None)
+        if section is None:
+            return
+        self.doc_count -= len(section.lines)
+        self.total_length -= sum(section.lengths)
+        for term, postings in section.postings.items():
+            by_section = self.postings[term]
+            del by_section[name]
+            self.df[term] -= len(postings)
+            if not by_section:
+                del self.postings[term]
+                del self.df[term]
+                for gram in ngrams(term):
+                    terms = self.gram_index[gram]
+                    terms.discard(term)
+                    if not terms:
+                        del self.gram_index[gram]
+
+    def similar_terms(self, term: str, limit: int = 3, threshold: float = 0.45) -> List[Tuple[str, float]]:
+        """Vocabulary terms whose trigram sets overlap ``term`` (Dice coefficient)."""
+        grams = ngrams(term)
+        shared: Counter = Counter()
+        for gram in grams:
+            for candidate in self.gram_index.get(gram, ()):
+                shared[candidate] += 1
+        scored = []
+        for candidate, overlap in shared.items():
+            similarity = 2 * overlap / (len(grams) + len(ngrams(candidate)))
+            if similarity >= threshold:
+                scored.append((candidate, similarity))
+        return heapq.nlargest(limit, scored, key=lambda pair: pair[1])
+
+    def expand_query(self, terms: Iterable[str], fuzzy: bool = True) -> Dict[str, float]:
+        """Map query terms to vocabulary terms with weights."""
+        weights: Dict[str, float] = {}
+        for term in terms:
+            if term in self.postings:
+                weights[term] = max(weights.get(term, 0.0), 1.0)
+            elif fuzzy:
+                for candidate, similarity in self.similar_terms(term):
+                    weights[candidate] = max(weights.get(candidate, 0.0), similarity)
+        return weights
+
+    def search(self, query: str, top_k: int = 10, fuzzy: bool = True) -> List[Tuple[float, str, int]]:
+        """Return up to ``top_k`` ``(score, section, line_no)`` hits for ``query``."""
+        weights = self.expand_query(tokenize(query), fuzzy=fuzzy)
+        if not weights or not self.doc_count:
+            return []
+
+        avg_length = self.total_length / self.doc_count
+        k1, b = self.k1, self.b
+        scores: Dict[Tuple[str, int], float] = {}
+        for term, weight in weights.items():
+            df = self.df[term]
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5)) * weight
+            for section_name, postings in self.postings[term].items():
+                lengths = self.sections[section_name].lengths
+                for line_no, tf in postings:
+                    norm = k1 * (1 - b + b * lengths[line_no] / avg_length)
+                    key = (section_name, line_no)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda pair: pair[1])
+        return [(score, section_name, line_no) for (section_name, line_no), score in best]
+
+    def line(self, section_name: str, line_no: int) -> str:
+        return self.sections[section_name].lines[line_no]
+
+    def format_hits(self, hits: List[Tuple[float, str, int]], section_order: Optional[List[str]] = None) -> List[str]:
+        """Render hits grouped under their section headers in document order."""
+        by_section: Dict[str, List[int]] = {}
+        for _, section_name, line_no in hits:
+            by_section.setdefault(section_name, []).append(line_no)
+
+        order = section_order if section_order is not None else list(self.sections)
+        lines = []
+        for section_name in order:
+            if section_name not in by_section:
+                continue
+            if section_name != "general":
+                lines.append(f"\n{section_name.upper()}:")
+            lines.extend(self.line(section_name, line_no) for line_no in sorted(by_section[section_name]))
+        return lines
@@ -1,104 +1,361 @@
 import os
-from typing import List, Dict
+import time
+import hashlib
+import threading
+from typing import Any, List, Dict, Optional, Tuple, Union
 import json
+from rag_index import InvertedIndex, SectionIndex, chunk_passages
+
+SEARCH_MODES = ("keyword", "semantic", "hybrid")
+SOURCE_EXTENSIONS = (".txt", ".md")
+NO_RESULTS = "No specific information found in the records."
+# README passages are indexed as one section per repository, named "<repo> README".
+# Section names parsed from the sources are lowercase, so the two never collide.
+README_SECTION_SUFFIX = " README"
+README_PASSAGE_WORDS = 80
+README_MAX_PASSAGES = 40
+
+class RAGState:
+    """Everything derived from the source files, swapped in as one object."""
+
+    def __init__(self, content: str, sections: Dict[str, str], section_hashes: Dict[str, str],
+                 signatures: Dict[str, Tuple[int, int]], index: InvertedIndex, vectors=None,
+                 readme_fingerprints: Optional[Dict[str, str]] = None):
+        self.content = content
+        self.sections = sections
+        self.section_hashes = section_hashes
+        self.signatures = signatures
+        self.index = index
+        self.vectors = vectors
+        # README section name -> fingerprint of the repository it was indexed from
+        self.readme_fingerprints = readme_fingerprints or {}
+        self.context: Optional[str] = None
+
+class SearchResult:
+    """Ranked hits for one query, tied to the index they were found in."""
+
+    def __init__(self, index: InvertedIndex, hits: List[Tuple[float, str, int]]):
+        self.index = index
+        self.hits = hits
+
+    def text(self, hit: Tuple[float, str, int]) -> str:
+        return self.index.line(hit[1], hit[2])
+
+    def render(self, hits: Optional[List[Tuple[float, str, int]]] = None) -> str:
+        """Render ``hits`` (all hits by default) grouped under their section headers."""
+        lines = self.index.format_hits(self.hits if hits is None else hits)
+        return "\n".join(lines) if lines else NO_RESULTS
 
 class RAGIntegration:
-    def __init__(self, file_path: str = "info.txt"):
+    def __init__(self, file_path: Union[str, List[str]] = "info.txt", top_k: int = 10, mode: str = "keyword",
+                 vector_cache_dir: str = ".rag_cache"):
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode!r}, expected one of {SEARCH_MODES}")
         self.file_path = file_path
-        self.content = self._load_content()
-        self.sections = self._parse_sections()
-
-    def _load_content(self) -> str:
-        """Load content from the info.txt file"""
-        try:
-            if os.path.exists(self.file_path):
-                with open(self.file_path, 'r', encoding='utf-8') as file:
-                    return file.read()
-            return ""
-        except Exception as e:
-            print(f"Error loading content: {str(e)}")
-            return ""
-
-    def _parse_sections(self) -> Dict:
+        self.file_paths = [file_path] if isinstance(file_path, str) else list(file_path)
+        self.top_k = top_k
+        self.mode = mode
+        self.vector_cache_dir = vector_cache_dir
+        self.version = 1
+        self.reload_stats = {
+            "reloads": 0,
+            "sections_rebuilt": 0,
+            "sections_removed": 0,
+            "last_reload_seconds": 0.0,
+            "last_sections_rebuilt": 0,
+            "readme_updates": 0,
+            "readmes_indexed": 0,
+            "last_readmes_indexed": 0
+        }
+        self._reload_lock = threading.Lock()
+
+        signatures = self._source_signatures()
+        content, sections = self._load_sections(list(signatures))
+        index = InvertedIndex.from_sections(sections)
+        self._state = RAGState(content, sections, self._hash_sections(sections), signatures,
+                               index, self._build_vectors(index))
+
+    # Readers take one reference to the current state, so a reload that swaps
+    # it in never exposes a half-updated index.
+    @property
+    def content(self) -> str:
+        return self._state.content
+
+    @property
+    def sections(self) -> Dict[str, str]:
+        return self._state.sections
+
+    @property
+    def index(self) -> InvertedIndex:
+        return self._state.index
+
+    @property
+    def vectors(self):
+        return self._state.vectors
+
+    def _build_vectors(self, index: InvertedIndex):
+        """Build the vector index for semantic/hybrid mode (NumPy is only needed then)."""
+        if self.mode == "keyword":
+            return None
+        from rag_vectors import VectorIndex
+        return VectorIndex.build(index, cache_dir=self.vector_cache_dir)
+
+    def _source_files(self) -> List[str]:
+        """Expand the configured paths into the list of source files."""
+        files = []
+        for path in self.file_paths:
+            if os.path.isdir(path):
+                for root, _, names in sorted(os.walk(path)):
+                    files.extend(
+                        os.path.join(root, name) for name in sorted(names)
+                        if name.lower().endswith(SOURCE_EXTENSIONS)
+                    )
+            elif os.path.exists(path):
+                files.append(path)
+        return files
+
+    def _source_signatures(self) -> Dict[str, Tuple[int, int]]:
+        """Return ``(mtime_ns, size)`` for every source file."""
+        signatures = {}
+        for path in self._source_files():
+            try:
+                stat = os.stat(path)
+                signatures[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+        return signatures
+
+    def _load_sections(self, paths: Optional[List[str]] = None) -> Tuple[str, Dict[str, str]]:
+        """Load the source files and return their combined content and sections.
+
+        Each file is parsed on its own, so a file never continues the last
+        section of the one before it. Lines before the first header belong
+        to ``general`` in the first file and to a section named after the
+        file in the others. A header that appears more than once, in one
+        file or several, is one section holding all of its lines in order.
+        """
+        contents = []
+        sections: Dict[str, str] = {}
+        for path in (paths if paths is not None else self._source_files()):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    content = file.read()
+            except Exception as e:
+                print(f"Error loading content: {str(e)}")
+                continue
+            first_section = "general" if not contents else os.path.splitext(os.path.basename(path))[0].lower()
+            contents.append(content)
+            for name, text in self._parse_sections(content, first_section).items():
+                self._append_section(sections, name, text)
+        return "\n\n".join(contents), sections
+
+    def _parse_sections(self, content: Optional[str] = None, first_section: str = "general") -> Dict:
         """Parse the content into sections based on headers and natural breaks."""
         sections = {}
-        current_section = "general"
+        current_section = first_section
         current_content = []
-        
-        for line in self.content.split('\n'):
+
+        for line in (self.content if content is None else content).split('\n'):
             line = line.strip()
             if not line:
                 continue
-                
+
             # Check if line is a section header (ends with ':' and next line is not empty)
             if line.endswith(':') and not line.startswith(' '):
                 # Save previous section
                 if current_content:
-                    sections[current_section] = '\n'.join(current_content)
+                    self._append_section(sections, current_section, '\n'.join(current_content))
                     current_content = []
                 current_section = line[:-1].lower()
             else:
                 current_content.append(line)
-        
+
         # Save the last section
         if current_content:
-            sections[current_section] = '\n'.join(current_content)
-            
+            self._append_section(sections, current_section, '\n'.join(current_content))
+
         return sections
 
+    @staticmethod
+    def _append_section(sections: Dict[str, str], name: str, text: str) -> None:
+        # A repeated header continues its section instead of replacing it
+        sections[name] = f"{sections[name]}\n{text}" if name in sections else text
+
+    @staticmethod
+    def _hash_sections(sections: Dict[str, str]) -> Dict[str, str]:
+        return {name: hashlib.sha1(content.encode("utf-8")).hexdigest() for name, content in sections.items()}
+
+    def reload_if_changed(self) -> bool:
+        """Re-index the sources if any file changed, returning whether a reload happened.
+
+        Files are compared by mtime and size. Only sections whose content hash
+        changed are re-tokenized (and re-embedded in semantic/hybrid mode);
+        the rest of the index is reused. The new state is swapped in at once.
+        """
+        with self._reload_lock:
+            state = self._state
+            signatures = self._source_signatures()
+            if signatures == state.signatures:
+                return False
+
+            start = time.perf_counter()
+            content, sections = self._load_sections(list(signatures))
+            hashes = self._hash_sections(sections)
+            changed = [name for name, digest in hashes.items() if state.section_hashes.get(name) != digest]
+            removed = [name for name in state.section_hashes if name not in hashes]
+
+            index = state.index
+            vectors = state.vectors
+            if changed or removed or list(hashes) != list(state.section_hashes):
+                index = index.copy()
+                for name in removed:
+                    index.remove_section(name)
+                for name in changed:
+                    index.add_section(SectionIndex(name, sections[name]))
+                # Keep the section order of the file, README sections last
+                index.sections = {
+                    name: index.sections[name] for name in [*sections, *state.readme_fingerprints]
+                    if name in index.sections
+                }
+                if vectors is not None:
+                    vectors = vectors.rebuild(index, changed, cache_dir=self.vector_cache_dir)
+
+            self._state = RAGState(content, sections, hashes, signatures, index, vectors, state.readme_fingerprints)
+            self.version += 1
+
+            elapsed = time.perf_counter() - start
+            self.reload_stats["reloads"] += 1
+            self.reload_stats["sections_rebuilt"] += len(changed)
+            self.reload_stats["sections_removed"] += len(removed)
+            self.reload_stats["last_reload_seconds"] = elapsed
+            self.reload_stats["last_sections_rebuilt"] = len(changed)
+            print(f"Reloaded RAG sources in {elapsed * 1000:.1f}ms: "
+                  f"{len(changed)} sections rebuilt, {len(removed)} removed, {len(sections)} total")
+            return True
+
+    @staticmethod
+    def _readme_fingerprint(repo: Dict[str, Any]) -> str:
+        readme = repo.get("readme") or ""
+        etag = repo.get("readme_etag") or hashlib.sha1(readme.encode("utf-8")).hexdigest()
+        return f"{repo.get('updated_at') or ''}\0{etag}"
+
+    def update_readmes(self, repositories: List[Dict[str, Any]]) -> bool:
+        """Index the READMEs of ``repositories`` as passages, returning whether anything changed.
+
+        Each README is split into passages that are searched like the lines of
+        the source files, under a section named after the repository. Only
+        repositories whose ``updated_at`` or README ETag changed are re-chunked;
+        READMEs of repositories that are gone are dropped.
+        """
+        with self._reload_lock:
+            state = self._state
+            fingerprints = {}
+            changed = {}
+            for repo in repositories:
+                name = f"{repo['name'].lower()}{README_SECTION_SUFFIX}"
+                fingerprint = self._readme_fingerprint(repo)
+                fingerprints[name] = fingerprint
+                if state.readme_fingerprints.get(name) != fingerprint:
+                    changed[name] = repo.get("readme") or ""
+            removed = [name for name in state.readme_fingerprints if name not in fingerprints]
+            if not changed and not removed:
+                return False
+
+            start = time.perf_counter()
+            index = state.index.copy()
+            for name in removed:
+                index.remove_section(name)
+            for name, readme in changed.items():
+                passages = chunk_passages(readme, README_PASSAGE_WORDS, README_MAX_PASSAGES)
+                if passages:
+                    index.add_section(SectionIndex(name, "\n".join(passages)))
+                else:
+                    index.remove_section(name)
+            vectors = state.vectors
+            if vectors is not None:
+                # README vectors change with every push; they are not worth caching on disk
+                vectors = vectors.rebuild(index, changed)
+
+            self._state = RAGState(state.content, state.sections, state.section_hashes, state.signatures,
+                                   index, vectors, fingerprints)
+            self.version += 1
+
+            self.reload_stats["readme_updates"] += 1
+            self.reload_stats["readmes_indexed"] += len(changed)
+            self.reload_stats["last_readmes_indexed"] = len(changed)
+            print(f"Indexed READMEs in {(time.perf_counter() - start) * 1000:.1f}ms: "
+                  f"{len(changed)} re-indexed, {len(removed)} removed, {len(fingerprints)} total")
+            return True
+
+    def stats(self) -> Dict:
+        """Return index size and reload metrics."""
+        state = self._state
+        stats = dict(self.reload_stats)
+        stats.update({
+            "version": self.version,
+            "mode": self.mode,
+            "sources": len(state.signatures),
+            "sections": len(state.sections),
+            "readmes": len(state.readme_fingerprints),
+            "indexed_lines": state.index.doc_count
+        })
+        return stats
+
     def get_context(self) -> str:
         """Get formatted context from all sections."""
+        state = self._state
+        if state.context is not None:
+            return state.context
+
         context = []
-        
-        for section, content in self.sections.items():
+
+        for section, content in state.sections.items():
             if section != "general":
                 context.append(f"{section.upper()}:")
             context.append(content)
             context.append("")  # Add spacing between sections
-        
-        return "\n".join(context) if context else "No information available."
+
+        state.context = "\n".join(context) if context else "No information available."
+        return state.context
+
+    def search(self, query: str) -> SearchResult:
+        """Rank the lines relevant to ``query``.
+
+        Lines are ranked with BM25 over the inverted index built at load time;
+        query terms that are not in the vocabulary fall back to similar terms
+        from the trigram index. In ``semantic`` mode lines are ranked by
+        hashed-vector similarity instead, and ``hybrid`` blends both. The top
+        ``top_k`` lines are returned, best first.
+        """
+        state = self._state
+        if self.mode == "keyword":
+            hits = state.index.search(query, top_k=self.top_k)
+        elif self.mode == "semantic":
+            hits = state.vectors.search(query, top_k=self.top_k)
+        else:
+            hits = self._hybrid_search(state, query)
+        return SearchResult(state.index, hits)
 
     def search_content(self, query: str) -> Dict:
-        """Search through all sections for relevant information."""
-        relevant_info = []
-        query_terms = query.lower().split()
-        
-        # Search in each section
-        for section, content in self.sections.items():
-            section_matches = []
-            
-            # Search through each line in the section
-            for line in content.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # Check if any query term matches
-                if any(term in line.lower() for term in query_terms):
-                    section_matches.append(line)
-            
-            # If matches found in this section, add them with section header
-            if section_matches:
-                if section != "general":
-                    relevant_info.append(f"\n{section.upper()}:")
-                relevant_info.extend(section_matches)
-        
-        # If no exact matches, try fuzzy matching
-        if not relevant_info:
-            for section, content in self.sections.items():
-                for line in content.split('\n'):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # Check if line contains any word that's similar to query terms
-                    line_words = set(line.lower().split())
-                    if any(any(term in word or word in term for word in line_words) for term in query_terms):
-                        if section != "general":
-                            relevant_info.append(f"\n{section.upper()}:")
-                        relevant_info.append(line)
-        
+        """Search through all sections for relevant information.
+
+        Returns the top hits grouped under their section headers.
+        """
+        result = self.search(query)
         return {
-            "found": len(relevant_info) > 0,
-            "content": "\n".join(relevant_info) if relevant_info else "No specific information found in the records."
-        } 
\ No newline at end of file
+            "found": len(result.hits) > 0,
+            "content": result.render()
+        }
+
+    def _hybrid_search(self, state: RAGState, query: str) -> List:
+        """Blend max-normalized BM25 scores with vector similarities."""
+        combined = {}
+        keyword_hits = state.index.search(query, top_k=self.top_k)
+        if keyword_hits:
+            best = keyword_hits[0][0]
+            for score, section, line_no in keyword_hits:
+                combined[(section, line_no)] = 0.5 * score / best
+        for score, section, line_no in state.vectors.search(query, top_k=self.top_k):
+            combined[(section, line_no)] = combined.get((section, line_no), 0.0) + 0.5 * score
+        ranked = sorted(combined.items(), key=lambda pair: pair[1], reverse=True)[:self.top_k]
+        return [(score, section, line_no) for (section, line_no), score in ranked]
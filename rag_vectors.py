@@ -0,0 +1,251 @@
+import os
+import re
+import zlib
+import hashlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from rag_index import InvertedIndex, SectionIndex, ngrams, synonym_terms, tokenize
+
+VECTOR_FORMAT_VERSION = "1"
+
+# "<cache key>.npy" holds the matrix and "<cache key>.df.npy" its document frequencies
+CACHE_FILE_PATTERN = re.compile(r"^([0-9a-f]{40})(?:\.df)?\.npy$")
+
+
+class HashingEmbedder:
+    """Hashing-trick bag of words and character trigrams.
+
+    Features are hashed with CRC32 (stable across processes) into ``dim``
+    signed buckets. Term counts are dampened with ``1 + log(tf)`` and rows are
+    L2-normalized. IDF weighting is applied to the query side only, so stored
+    rows do not depend on corpus statistics and can be reused when other
+    sections change.
+    """
+
+    def __init__(self, dim: int = 1024, gram_weight: float = 0.3):
+        self.dim = dim
+        self.gram_weight = gram_weight
+        self.synonyms = synonym_terms()
+
+    def features(self, text: str) -> Counter:
+        counts: Counter = Counter()
+        for term in tokenize(text):
+            counts["w:" + term] += 1.0
+            for gram in ngrams(term):
+                counts["g:" + gram] += self.gram_weight
+        return counts
+
+    def embed_into(self, row: np.ndarray, text: str) -> None:
+        for feature, count in self.features(text).items():
+            h = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            row[h % self.dim] += sign * (1.0 + np.log(count) if count >= 1 else count)
+        norm = np.linalg.norm(row)
+        if norm:
+            row /= norm
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            self.embed_into(matrix[i], text)
+        return matrix
+
+    def embed_query(self, query: str) -> np.ndarray:
+        # The terms that synonyms in the query stand for, so paraphrases reach
+        # the right section, e.g. "where does he study" -> Education
+        expanded = [query] + [self.synonyms[term] for term in tokenize(query) if term in self.synonyms]
+        row = np.zeros(self.dim, dtype=np.float32)
+        self.embed_into(row, " ".join(expanded))
+        return row
+
+
+def section_rows(section: SectionIndex) -> Tuple[List[str], List[Tuple[str, int]]]:
+    """Texts and ``(section, line_no)`` keys for one section; line -1 is the whole section."""
+    header = section.name if section.name != "general" else ""
+    texts = [f"{header}\n" + "\n".join(section.lines)]
+    keys = [(section.name, -1)]
+    for line_no, line in enumerate(section.lines):
+        texts.append(f"{header} {line}")
+        keys.append((section.name, line_no))
+    return texts, keys
+
+
+def document_frequencies(matrix: np.ndarray) -> np.ndarray:
+    """Number of rows with a non-zero value in each column."""
+    return np.count_nonzero(matrix, axis=0).astype(np.int64)
+
+
+class VectorIndex:
+    """Dense hashed vectors for every section and line in one contiguous array.
+
+    Queries are scored with a single matrix-vector product and the top-k rows
+    are picked with ``argpartition``. The matrix can be persisted as ``.npy``
+    and memory-mapped on the next start instead of being recomputed, together
+    with the document frequencies ``df`` (rows with a non-zero value in each
+    column) the query IDF is derived from.
+    """
+
+    def __init__(self, embedder: HashingEmbedder, matrix: np.ndarray, keys: List[Tuple[str, int]],
+                 sections: Dict[str, SectionIndex], df: Optional[np.ndarray] = None):
+        self.embedder = embedder
+        self.matrix = matrix
+        self.keys = keys
+        self.sections = sections
+        if df is None:
+            df = document_frequencies(matrix) if len(keys) else np.zeros(embedder.dim, dtype=np.int64)
+        self.df = df
+        self.idf = np.log((1 + len(keys)) / (1 + df)).astype(np.float32) + 1.0
+        # Row range of every section, so unchanged sections can be reused
+        self.ranges: Dict[str, Tuple[int, int]] = {}
+        for row, (section_name, _) in enumerate(keys):
+            start, _ = self.ranges.get(section_name, (row, row))
+            self.ranges[section_name] = (start, row + 1)
+
+    @staticmethod
+    def cache_key(index: InvertedIndex, dim: int) -> str:
+        digest = hashlib.sha1(f"{VECTOR_FORMAT_VERSION}:{dim}".encode("utf-8"))
+        for name, section in index.sections.items():
+            digest.update(name.encode("utf-8"))
+            digest.update(b"\0")
+            digest.update("\n".join(section.lines).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, index: InvertedIndex, embedder: Optional[HashingEmbedder] = None,
+              cache_dir: Optional[str] = None) -> "VectorIndex":
+        """Build vectors for ``index``, loading them from ``cache_dir`` when possible."""
+        embedder = embedder or HashingEmbedder()
+        texts, keys = [], []
+        for section in index.sections.values():
+            section_texts, section_keys = section_rows(section)
+            texts.extend(section_texts)
+            keys.extend(section_keys)
+
+        key = cls.cache_key(index, embedder.dim)
+        if cache_dir:
+            cached = cls._load(cache_dir, key, (len(keys), embedder.dim))
+            if cached is not None:
+                return cls(embedder, cached[0], keys, dict(index.sections), df=cached[1])
+
+        matrix = embedder.embed_many(texts)
+        vectors = cls(embedder, matrix, keys, dict(index.sections))
+        if cache_dir:
+            cls._save(cache_dir, key, matrix, vectors.df)
+        return vectors
+
+    @staticmethod
+    def _load(cache_dir: str, key: str, shape: Tuple[int, int]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Memory-map the cached matrix for ``key`` and load its document frequencies."""
+        path = os.path.join(cache_dir, f"{key}.npy")
+        if not os.path.exists(path):
+            return None
+        try:
+            matrix = np.load(path, mmap_mode="r")
+            if matrix.shape != shape:
+                return None
+            df_path = os.path.join(cache_dir, f"{key}.df.npy")
+            df = np.load(df_path) if os.path.exists(df_path) else None
+            if df is None or df.shape != (shape[1],):
+                # Written before df was cached; count once and keep it
+                df = document_frequencies(matrix)
+                VectorIndex._write(df_path, df)
+            return matrix, df
+        except (OSError, ValueError) as e:
+            print(f"Error loading vector cache: {str(e)}")
+            return None
+
+    @staticmethod
+    def _write(path: str, array: np.ndarray) -> None:
+        """Write-then-rename so readers never see a partial file."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            np.save(file, array)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _save(cache_dir: str, key: str, matrix: np.ndarray, df: np.ndarray) -> None:
+        """Cache the matrix and its document frequencies and drop the files they supersede."""
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # The matrix goes last: a loader that finds it also finds df
+            VectorIndex._write(os.path.join(cache_dir, f"{key}.df.npy"), df)
+            VectorIndex._write(os.path.join(cache_dir, f"{key}.npy"), matrix)
+        except OSError as e:
+            print(f"Error writing vector cache: {str(e)}")
+            return
+        # Processes still mapping a removed file keep reading it until they let go
+        for name in os.listdir(cache_dir):
+            match = CACHE_FILE_PATTERN.match(name)
+            if match and match.group(1) != key:
+                try:
+                    os.remove(os.path.join(cache_dir, name))
+                except OSError:
+                    pass
+
+    def rebuild(self, index: InvertedIndex, changed: Iterable[str], cache_dir: Optional[str] = None) -> "VectorIndex":
+        """Return a vector index for ``index`` that re-embeds only the ``changed`` sections.
+
+        Rows of every other section are copied from this index.
+        """
+        changed = set(changed)
+        blocks, keys = [], []
+        # Document frequencies are updated by the rows that come and go
+        df = self.df.copy()
+        reused = set()
+        for section in index.sections.values():
+            if section.name not in changed and section.name in self.ranges:
+                start, end = self.ranges[section.name]
+                blocks.append(np.asarray(self.matrix[start:end]))
+                keys.extend(self.keys[start:end])
+                reused.add(section.name)
+            else:
+                texts, section_keys = section_rows(section)
+                block = self.embedder.embed_many(texts)
+                df += document_frequencies(block)
+                blocks.append(block)
+                keys.extend(section_keys)
+        for name, (start, end) in self.ranges.items():
+            if name not in reused:
+                df -= document_frequencies(self.matrix[start:end])
+
+        matrix = np.concatenate(blocks) if blocks else np.zeros((0, self.embedder.dim), dtype=np.float32)
+        vectors = VectorIndex(self.embedder, matrix, keys, dict(index.sections), df=df)
+        if cache_dir:
+            self._save(cache_dir, self.cache_key(index, self.embedder.dim), matrix, df)
+        return vectors
+
+    def search(self, query: str, top_k: int = 10, min_score: float = 0.12,
+               relative_cutoff: float = 0.3) -> List[Tuple[float, str, int]]:
+        """Return up to ``top_k`` ``(score, section, line_no)`` hits, most similar first.
+
+        Rows scoring below ``min_score`` or below ``relative_cutoff`` times the
+        best score are dropped. A whole-section row in the top-k contributes
+        all of its lines.
+        """
+        if not self.keys:
+            return []
+        query_vector = self.embedder.embed_query(query) * self.idf
+        norm = np.linalg.norm(query_vector)
+        if not norm:
+            return []
+        scores = self.matrix @ (query_vector / norm)
+
+        k = min(top_k, len(self.keys))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+
+        hits, seen = [], set()
+        threshold = max(min_score, relative_cutoff * float(scores[top[0]]))
+        for row in top:
+            score = float(scores[row])
+            if score < threshold:
+                break
+            section_name, line_no = self.keys[row]
+            line_nos = range(len(self.sections[section_name].lines)) if line_no < 0 else [line_no]
+            for number in line_nos:
+                if (section_name, number) not in seen:
+                    seen.add((section_name, number))
+                    hits.append((score, section_name, number))
+        return hits[:top_k]
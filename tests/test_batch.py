@@ -0,0 +1,127 @@
+"""RequestPipeline.batch and the /chat/batch endpoint."""
+import asyncio
+import json
+from contextlib import aclosing
+from types import SimpleNamespace
+import pytest
+from app.pipeline import RequestPipeline
+from app.prompt import PromptBuilder
+from app.response_cache import ResponseCache
+from app.snapshot import SnapshotRefresher
+from mcp.memory import MemoryManager
+from mcp.protocol import MCPProtocol
+from rag_integration import RAGIntegration
+from tests.conftest import ROOT
+
+
+class StubFetcher:
+    async def get_github_context(self):
+        return {"username": "stub", "repositories": [], "recent_activity": []}
+
+
+class ScriptedLLM:
+    """Answers with the question; fails on "fail" and hangs on "slow" until cancelled."""
+
+    def __init__(self):
+        self.calls = []
+        self.cancelled = []
+
+    async def complete(self, messages, **kwargs):
+        question = messages[-1]["content"]
+        self.calls.append(question)
+        if "fail" in question:
+            raise RuntimeError(f"cannot answer {question}")
+        if "slow" in question:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled.append(question)
+                raise
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"Answer: {question}"))])
+
+
+def make_pipeline(tmp_path, llm) -> RequestPipeline:
+    source = tmp_path / "info.txt"
+    source.write_text("About Me\nA stub profile.\n")
+    rag = RAGIntegration([str(source)], vector_cache_dir="")
+    return RequestPipeline(SnapshotRefresher(StubFetcher(), rag, rag_poll_interval=0), None, rag,
+                           MemoryManager(MCPProtocol()), PromptBuilder(), ResponseCache(), llm)
+
+
+def collect(pipeline, messages, concurrency=8):
+    async def run():
+        async with aclosing(pipeline.batch(messages, concurrency)) as results:
+            return [result async for result in results]
+
+    return asyncio.run(run())
+
+
+def test_duplicate_questions_are_answered_once(tmp_path):
+    llm = ScriptedLLM()
+    results = collect(make_pipeline(tmp_path, llm), ["Who is he?", "what are his projects", "who is he"])
+
+    by_indices = {tuple(indices): reply.text for indices, reply, _ in results}
+    assert by_indices == {(0, 2): "Answer: Who is he?", (1,): "Answer: what are his projects"}
+    assert sorted(llm.calls) == ["Who is he?", "what are his projects"]
+
+
+def test_a_failing_question_does_not_stop_the_others(tmp_path):
+    llm = ScriptedLLM()
+    results = collect(make_pipeline(tmp_path, llm), ["first", "please fail", "third"])
+
+    replies = {indices[0]: reply for indices, reply, _ in results}
+    assert isinstance(replies[1], RuntimeError)
+    assert (replies[0].text, replies[2].text) == ("Answer: first", "Answer: third")
+
+
+def test_closing_the_batch_cancels_pending_questions(tmp_path):
+    llm = ScriptedLLM()
+    pipeline = make_pipeline(tmp_path, llm)
+
+    async def first_result():
+        async with aclosing(pipeline.batch(["quick", "slow one", "slow two"], 8)) as results:
+            async for indices, reply, _ in results:
+                return indices, reply.text
+
+    assert asyncio.run(first_result()) == ([0], "Answer: quick")
+    # What a client disconnect does: the endpoint closes the generator
+    assert sorted(llm.cancelled) == ["slow one", "slow two"]
+    assert pipeline.response_cache.stats()["in_flight"] == 0
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    from fastapi.testclient import TestClient
+    from app import main
+
+    llm = ScriptedLLM()
+    monkeypatch.setattr(main.pipeline, "llm", llm)
+    monkeypatch.setattr(main.pipeline, "fast_path", None)
+    monkeypatch.setattr(main.pipeline, "response_cache", ResponseCache())
+    monkeypatch.setattr(main.refresher, "follower_wait", 0)
+    monkeypatch.setattr(main.refresher.fetcher, "get_github_context", StubFetcher().get_github_context)
+    monkeypatch.setattr(main, "BATCH_MAX_MESSAGES", 3)
+    return TestClient(main.app), llm
+
+
+def test_batch_endpoint_streams_one_line_per_question(client):
+    client, llm = client
+    response = client.post("/chat/batch", json={"messages": ["who is he", "please fail", "Who is he?"]})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda line: line["index"])
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert lines[0]["response"] == lines[2]["response"] == "<p>Answer: who is he</p>"
+    assert lines[1]["error"] == "cannot answer please fail"
+    assert len(llm.calls) == 2
+
+
+def test_batch_endpoint_rejects_too_many_messages(client):
+    client, llm = client
+    response = client.post("/chat/batch", json={"messages": ["a", "b", "c", "d"]})
+
+    assert response.status_code == 413
+    assert "At most 3" in response.json()["error"]
+    assert llm.calls == []
@@ -0,0 +1,95 @@
+"""Per-session conversation history sent to the LLM."""
+from mcp.context import ContextManager
+from mcp.conversation import SUMMARY_QUESTIONS, ConversationStore
+from mcp.protocol import MCPProtocol
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+def make_context(**options) -> ContextManager:
+    options.setdefault("tokenizer", words)
+    return ContextManager(MCPProtocol(), conversations=ConversationStore(**options))
+
+
+def ask(context: ContextManager, session_id: str, question: str, answer: str) -> None:
+    context.add_user_message(question, session_id)
+    context.add_assistant_message(answer, session_id)
+
+
+def test_history_is_cut_to_the_token_budget():
+    context = make_context(token_budget=8)
+    ask(context, "s", "one two three", "four five six")
+    ask(context, "s", "seven eight", "nine ten")
+
+    messages, tokens = context.get_conversation_history("s")
+    # The first exchange no longer fits; its question moves into the summary, which does not fit either
+    assert messages == [{"role": "user", "content": "seven eight"}, {"role": "assistant", "content": "nine ten"}]
+    assert tokens == 4
+    assert context.get_conversation_history("s", token_budget=0) == ([], 0)
+
+
+def test_history_starts_at_a_user_turn():
+    context = make_context(token_budget=6)
+    ask(context, "s", "a long first question here", "short answer")
+    ask(context, "s", "hi", "short answer")
+
+    messages, tokens = context.get_conversation_history("s")
+    # The first answer fits the budget but its question does not, so both are left out
+    assert messages == [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "short answer"}]
+    assert tokens == 3
+
+
+def test_older_questions_are_condensed_into_a_summary():
+    context = make_context(max_turns=4, token_budget=1000)
+    for n in range(4):
+        ask(context, "s", f"question {n}", f"answer {n}")
+
+    messages, tokens = context.get_conversation_history("s")
+    assert messages[0] == {"role": "system",
+                           "content": "Earlier in this conversation the user asked: question 0; question 1"}
+    assert [message["content"] for message in messages[1:]] == ["question 2", "answer 2", "question 3", "answer 3"]
+    assert tokens == sum(words(message["content"]) for message in messages)
+
+
+def test_summary_keeps_the_latest_questions():
+    context = make_context(max_turns=2, token_budget=1000)
+    for n in range(SUMMARY_QUESTIONS + 3):
+        ask(context, "s", f"question {n}", f"answer {n}")
+
+    summary = context.get_conversation_history("s")[0][0]["content"]
+    asked = summary.split(": ", 1)[1].split("; ")
+    assert asked == [f"question {n}" for n in range(2, SUMMARY_QUESTIONS + 2)]
+
+
+def test_sessions_are_isolated():
+    context = make_context()
+    ask(context, "a", "question for a", "answer for a")
+    ask(context, "b", "question for b", "answer for b")
+
+    assert [message["content"] for message in context.get_conversation_history("a")[0]] == \
+        ["question for a", "answer for a"]
+    assert [message["content"] for message in context.get_conversation_history("b")[0]] == \
+        ["question for b", "answer for b"]
+    assert context.get_conversation_history("c") == ([], 0)
+
+
+def test_ending_a_session_frees_its_history():
+    context = make_context()
+    ask(context, "a", "question", "answer")
+    ask(context, "b", "question", "answer")
+
+    context.end_session("a")
+    assert context.get_conversation_history("a") == ([], 0)
+    assert context.conversations.get("a") is None
+    assert context.conversations.stats()["sessions"] == 1
+
+
+def test_least_recently_used_session_is_dropped_beyond_max_sessions():
+    context = make_context(max_sessions=2)
+    for session in "abc":
+        ask(context, session, "question", "answer")
+
+    assert list(context.conversations.sessions) == ["b", "c"]
+    assert context.conversations.evicted_sessions == 1
@@ -0,0 +1,78 @@
+"""FastPathRouter: direct answers from info.txt and when it leaves a message to the LLM."""
+import os
+from app.fastpath import FastPathRouter
+from rag_integration import RAGIntegration
+
+INFO = """Name: Stub Person
+Title: Python Developer
+
+Contact:
+Email: stub@example.com
+Location: Chennai
+
+Education:
+- Stub College of Engineering
+
+Hobbies:
+- Chess
+"""
+
+
+def make_router(tmp_path, **options):
+    source = tmp_path / "info.txt"
+    source.write_text(INFO)
+    rag = RAGIntegration([str(source)], vector_cache_dir="")
+    return FastPathRouter(rag, **options), source
+
+
+def test_confident_lookup_is_answered_directly(tmp_path):
+    router, _ = make_router(tmp_path)
+
+    reply = router.route("What's his email?")
+    assert reply.text == "**Email:** stub@example.com"
+    assert "<strong>Email:</strong>" in reply.html
+    # Synonyms, and the owner's name, count as the terms they stand for
+    assert router.route("where did Stub study").text.startswith("**Education:**")
+    assert router.stats()["hits_by_entry"] == {"contact/email": 1, "education": 1}
+
+
+def test_tie_between_entries_goes_to_the_llm(tmp_path):
+    router, source = make_router(tmp_path)
+    source.write_text(INFO + "\nOffice:\nEmail: stub@office.example.com\n")
+    router.rag.reload_if_changed()
+
+    # Both email fields explain the whole message equally well
+    assert router.table.match(["email"]) == (None, 1.0)
+    assert router.route("his email") is None
+    # Naming the section breaks the tie
+    assert router.route("his office email").text == "**Email:** stub@office.example.com"
+
+
+def test_low_confidence_goes_to_the_llm(tmp_path):
+    router, _ = make_router(tmp_path)
+
+    assert router.route("which email provider does he recommend") is None
+    assert router.route("tell me a joke") is None
+    assert router.stats()["misses"] == {"no_match": 1, "low_confidence": 1}
+
+    lenient = FastPathRouter(router.rag, min_confidence=0.3)
+    assert lenient.route("which email provider does he recommend").text == "**Email:** stub@example.com"
+
+
+def test_long_messages_go_to_the_llm(tmp_path):
+    router, _ = make_router(tmp_path, max_terms=3)
+
+    assert router.route("email email email email") is None
+
+
+def test_table_is_rebuilt_after_a_rag_reload(tmp_path):
+    router, source = make_router(tmp_path)
+    assert router.route("his hobbies").text == "**Hobbies:**\n\n- Chess"
+    entries = router.table
+
+    source.write_text(INFO.replace("- Chess", "- Carrom"))
+    os.utime(source, ns=(1, 1))
+    assert router.rag.reload_if_changed()
+
+    assert router.route("his hobbies").text == "**Hobbies:**\n\n- Carrom"
+    assert router.table is not entries
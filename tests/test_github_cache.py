@@ -0,0 +1,160 @@
+"""GitHubCache revalidation and stale fallback against a local GitHub stub."""
+import asyncio
+import pytest
+from app.github import AsyncGitHubFetcher, GitHubCache, decode_readme
+from benchmarks.stubs import StubGitHub
+
+
+@pytest.fixture
+def github():
+    stub = StubGitHub(repos=3, readme_size=200).start()
+    yield stub
+    stub.stop()
+
+
+def repos_url(stub: StubGitHub) -> str:
+    return f"{stub.url}/users/stub/repos"
+
+
+def run(cache: GitHubCache, scenario):
+    """Run ``scenario(fetcher)`` with a fetcher over ``cache`` and close it afterwards."""
+    async def main():
+        fetcher = AsyncGitHubFetcher(cache, timeout=2)
+        try:
+            return await scenario(fetcher)
+        finally:
+            await fetcher.aclose()
+
+    return asyncio.run(main())
+
+
+def test_fresh_entry_is_served_without_a_request(github):
+    cache = GitHubCache(ttl=60)
+
+    async def scenario(fetcher):
+        return await fetcher.get_json(repos_url(github), {}), await fetcher.get_json(repos_url(github), {})
+
+    first, second = run(cache, scenario)
+    assert second == first
+    assert github.calls == 1
+    assert cache.counters["hits"] == 1
+
+
+def test_expired_entry_is_revalidated_with_its_etag(github):
+    cache = GitHubCache(ttl=0)
+    url = repos_url(github)
+
+    async def scenario(fetcher):
+        first = await fetcher.get_json(url, {})
+        etag = cache.entries[url].etag
+        return first, etag, await fetcher.get_json(url, {})
+
+    first, etag, second = run(cache, scenario)
+    assert second == first
+    assert github.calls == 2
+    assert cache.counters["misses"] == 1
+    assert cache.counters["revalidations"] == 1
+    assert cache.etags([url]) == [etag]
+
+
+def test_changed_resource_is_fetched_again(github):
+    cache = GitHubCache(ttl=0)
+    url = repos_url(github)
+
+    async def scenario(fetcher):
+        await fetcher.get_json(url, {})
+        github.generation += 1
+        github.repos[0]["description"] = "changed"
+        return await fetcher.get_json(url, {})
+
+    assert run(cache, scenario)[0]["description"] == "changed"
+    assert cache.counters["misses"] == 2
+    assert cache.counters["revalidations"] == 0
+
+
+def test_parse_only_runs_on_a_full_response(github):
+    cache = GitHubCache(ttl=0)
+    url = f"{github.url}/repos/stub/project-0/readme"
+    parsed = []
+
+    def parse(payload):
+        parsed.append(payload)
+        return decode_readme(payload)
+
+    async def scenario(fetcher):
+        return await fetcher.get_json(url, {}, parse=parse), await fetcher.get_json(url, {}, parse=parse)
+
+    first, second = run(cache, scenario)
+    assert second == first
+    assert first.startswith("# Project")
+    assert len(parsed) == 1
+
+
+@pytest.mark.parametrize("status", [502, 503])
+def test_server_error_serves_the_last_good_copy(github, status):
+    cache = GitHubCache(ttl=0)
+    url = repos_url(github)
+
+    async def scenario(fetcher):
+        first = await fetcher.get_json(url, {})
+        github.fail_status = status
+        return first, await fetcher.get_json(url, {})
+
+    first, second = run(cache, scenario)
+    assert second == first
+    assert cache.counters["errors"] == 1
+    assert cache.counters["stale"] == 1
+
+
+def test_unreachable_server_serves_the_last_good_copy(github):
+    cache = GitHubCache(ttl=0)
+    url = repos_url(github)
+
+    async def scenario(fetcher):
+        first = await fetcher.get_json(url, {})
+        github.stop()
+        # Drop the kept-alive connection, which the stopped server still answers
+        await fetcher.aclose()
+        return first, await fetcher.get_json(url, {})
+
+    first, second = run(cache, scenario)
+    assert second == first
+    assert cache.counters["stale"] == 1
+
+
+def test_error_without_a_copy_returns_none(github):
+    cache = GitHubCache(ttl=0)
+    github.fail_status = 500
+
+    async def scenario(fetcher):
+        return await fetcher.get_json(repos_url(github), {})
+
+    assert run(cache, scenario) is None
+    assert cache.counters["errors"] == 1
+    assert cache.counters["stale"] == 0
+
+
+def test_missing_readme_is_cached_as_a_negative_entry(github):
+    cache = GitHubCache(ttl=60)
+    url = f"{github.url}/repos/stub/missing/file"
+
+    async def scenario(fetcher):
+        return await fetcher.get_json(url, {}), await fetcher.get_json(url, {})
+
+    assert run(cache, scenario) == (None, None)
+    assert github.calls == 1
+
+
+def test_github_context_is_revalidated_as_a_whole(github, monkeypatch):
+    monkeypatch.setattr("app.github.GITHUB_API_URL", github.url)
+    monkeypatch.setenv("GITHUB_USER", "stub")
+    cache = GitHubCache(ttl=0)
+
+    async def scenario(fetcher):
+        return await fetcher.get_github_context(), await fetcher.get_github_context()
+
+    first, second = run(cache, scenario)
+    assert second == first
+    assert [repo["readme"].startswith("# Project") for repo in first["repositories"]] == [True] * 3
+    # Repositories, events and three READMEs, each fetched once and then revalidated
+    assert (cache.counters["misses"], cache.counters["revalidations"]) == (5, 5)
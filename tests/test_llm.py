@@ -0,0 +1,169 @@
+"""LLMClient retries, the concurrency limit and the 503 mapping, against a local Groq stub."""
+import asyncio
+import time
+from contextlib import aclosing
+from email.utils import formatdate
+import groq
+import pytest
+from groq import AsyncGroq
+from app.llm import ConcurrencyLimiter, LLMClient, LLMOverloaded, parse_retry_after
+from benchmarks.stubs import REPLY, StubLLM
+from tests.conftest import ROOT
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.fixture
+def stub():
+    server = StubLLM(latency=0.0, tokens=8, token_interval=0.0).start()
+    yield server
+    server.stop()
+
+
+def make_client(stub: StubLLM, limiter: ConcurrencyLimiter = None, **kwargs) -> LLMClient:
+    kwargs.setdefault("base_delay", 0.01)
+    return LLMClient(AsyncGroq(api_key="test", base_url=stub.url, max_retries=0),
+                     limiter or ConcurrencyLimiter(), **kwargs)
+
+
+def expected_text(tokens: int) -> str:
+    return "".join(word + " " for word in REPLY.split(" ")[:tokens])
+
+
+def test_rate_limited_requests_are_retried(stub):
+    stub.fail_first = 2
+    stub.retry_after = "0"
+    llm = make_client(stub)
+
+    response = asyncio.run(llm.complete(MESSAGES))
+
+    assert response.choices[0].message.content == expected_text(8)
+    assert stub.calls == 3
+    assert (llm.requests, llm.retries, llm.failures) == (3, 2, 0)
+
+
+def test_server_errors_are_retried_up_to_max_retries(stub):
+    stub.fail_first = 10
+    stub.fail_status = 500
+    llm = make_client(stub, max_retries=2)
+
+    with pytest.raises(groq.InternalServerError):
+        asyncio.run(llm.complete(MESSAGES))
+
+    assert stub.calls == 3
+    assert (llm.retries, llm.failures) == (2, 1)
+    assert llm.limiter.in_flight == 0
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.fail_first = 1
+    stub.fail_status = 400
+    llm = make_client(stub)
+
+    with pytest.raises(groq.BadRequestError):
+        asyncio.run(llm.complete(MESSAGES))
+
+    assert stub.calls == 1
+    assert (llm.retries, llm.failures) == (0, 1)
+
+
+def test_retry_after_is_the_minimum_delay(stub):
+    llm = make_client(stub, base_delay=0.5, max_delay=8.0)
+
+    assert all(llm.backoff(0) <= 0.5 for _ in range(50))
+    assert all(llm.backoff(10) <= 8.0 for _ in range(50))
+    assert llm.backoff(0, retry_after=3.0) >= 3.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("-1") == 0.0
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_stream_is_retried_while_opening(stub):
+    stub.fail_first = 1
+    llm = make_client(stub)
+
+    async def collect():
+        return [delta async for delta in llm.stream(MESSAGES)]
+
+    assert "".join(asyncio.run(collect())) == expected_text(8)
+    assert llm.retries == 1
+
+
+def test_closing_a_stream_early_releases_the_slot_and_the_response(stub):
+    stub.tokens = 50
+    stub.token_interval = 0.02
+    llm = make_client(stub)
+
+    async def first_delta():
+        async with aclosing(llm.stream(MESSAGES)) as stream:
+            async for delta in stream:
+                return delta
+
+    assert asyncio.run(first_delta())
+    assert llm.limiter.in_flight == 0
+    deadline = time.monotonic() + 5
+    while stub.disconnects == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert stub.disconnects == 1
+
+
+def test_limiter_queues_then_rejects():
+    limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        order = []
+
+        async def call(name):
+            async with limiter.slot():
+                order.append(name)
+                await release.wait()
+
+        first = asyncio.create_task(call("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(call("second"))
+        await asyncio.sleep(0)
+        assert (limiter.in_flight, limiter.waiting) == (1, 1)
+        assert limiter.is_full()
+        with pytest.raises(LLMOverloaded):
+            async with limiter.slot():
+                pass
+        release.set()
+        await asyncio.gather(first, second)
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "second"]
+    stats = limiter.stats()
+    assert (stats["admitted"], stats["rejected"], stats["in_flight"], stats["queue_depth"]) == (2, 1, 0, 0)
+
+
+def test_full_queue_is_reported_as_503(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    from fastapi.testclient import TestClient
+    from app import main
+
+    # No slot free and no room to wait for one
+    monkeypatch.setattr(main.llm.limiter, "max_in_flight", 0)
+    monkeypatch.setattr(main.llm.limiter, "max_queue", 0)
+    monkeypatch.setattr(main, "fast_path", None)
+    monkeypatch.setattr(main.pipeline, "fast_path", None)
+    monkeypatch.setattr(main.refresher, "follower_wait", 0)
+    monkeypatch.setattr(main.refresher.fetcher, "get_github_context", no_github)
+    client = TestClient(main.app)
+
+    response = client.post("/chat", json={"message": "tell me about the projects"})
+    assert response.status_code == 503
+    assert "queue is full" in response.json()["error"]
+
+    response = client.post("/chat/stream", json={"message": "tell me about the projects"})
+    assert response.status_code == 503
+
+
+async def no_github():
+    return {"username": "stub", "repositories": [], "recent_activity": []}
@@ -0,0 +1,76 @@
+"""Memory backends: the backend interface, prompt memories and flushing buffered SQLite writes."""
+import pytest
+from mcp.memory import MemoryBackend, MemoryManager
+from mcp.protocol import MCPProtocol
+from mcp.sqlite_memory import SQLiteMemoryBackend
+from tests.conftest import ROOT
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        MemoryBackend()
+
+    class Partial(MemoryBackend):
+        def new_id(self):
+            return 1
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def manager(request, tmp_path):
+    if request.param == "memory":
+        manager = MemoryManager(MCPProtocol())
+    else:
+        manager = MemoryManager(MCPProtocol(), SQLiteMemoryBackend(str(tmp_path / "memory.db")))
+    yield manager
+    manager.close()
+
+
+def test_recorded_queries_never_reach_the_prompt(manager):
+    for n in range(20):
+        manager.add_user_query(f"what is project {n} about")
+    manager.add_important_fact("Every project ships with tests", importance=0.1)
+
+    assert [memory.content for memory in manager.get_prompt_memories("project")] == \
+        ["Every project ships with tests"]
+    assert [memory.content for memory in manager.get_prompt_memories("project", limit=1)] == \
+        ["Every project ships with tests"]
+    assert manager.get_prompt_memories("project", limit=0) == []
+    # The recorded questions are still stored and searchable
+    assert len(manager.get_relevant_memories("project")) == 21
+
+
+def test_buffered_writes_are_flushed_on_close(tmp_path):
+    path = str(tmp_path / "memory.db")
+    backend = SQLiteMemoryBackend(path, batch_size=64, flush_interval=3600)
+    manager = MemoryManager(MCPProtocol(), backend)
+    manager.add_important_fact("The stub likes tea")
+    assert backend.stats()["pending"] == 1
+
+    manager.close()
+    reopened = SQLiteMemoryBackend(path)
+    assert [memory.content for memory in reopened.items()] == ["The stub likes tea"]
+
+
+async def no_github():
+    return {"username": "stub", "repositories": [], "recent_activity": []}
+
+
+def test_app_shutdown_flushes_buffered_memories(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    from fastapi.testclient import TestClient
+    from app import main
+
+    path = str(tmp_path / "memory.db")
+    manager = MemoryManager(main.mcp_protocol, SQLiteMemoryBackend(path, batch_size=64, flush_interval=3600))
+    monkeypatch.setattr(main, "memory_manager", manager)
+    monkeypatch.setattr(main.refresher.fetcher, "get_github_context", no_github)
+
+    with TestClient(main.app):
+        manager.add_important_fact("Remembered across restarts")
+        assert manager.backend.stats()["pending"] == 1
+
+    assert [memory.content for memory in SQLiteMemoryBackend(path).items()] == ["Remembered across restarts"]
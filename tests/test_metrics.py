@@ -0,0 +1,117 @@
+"""Prometheus text output of the metrics registry and the /metrics endpoint."""
+import re
+from types import SimpleNamespace
+import pytest
+from app.metrics import Family, MetricsRegistry, StageProfiler, record_stage, span
+from tests.conftest import ROOT
+
+
+def test_counter_and_escaped_labels():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Failures", ("endpoint", "error"))
+    errors.inc("chat", 'Bad "quote"\\path\nline')
+    errors.inc("chat", 'Bad "quote"\\path\nline', amount=2)
+
+    assert registry.render() == (
+        "# HELP errors_total Failures\n"
+        "# TYPE errors_total counter\n"
+        'errors_total{endpoint="chat",error="Bad \\"quote\\"\\\\path\\nline"} 3\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    registry = MetricsRegistry()
+    seconds = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        seconds.observe(value, "llm")
+
+    assert registry.render().splitlines() == [
+        "# HELP stage_seconds Stage time",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="llm",le="0.1"} 2',
+        'stage_seconds_bucket{stage="llm",le="1.0"} 3',
+        'stage_seconds_bucket{stage="llm",le="+Inf"} 4',
+        'stage_seconds_sum{stage="llm"} 3.65',
+        'stage_seconds_count{stage="llm"} 4'
+    ]
+
+
+def test_collectors_run_at_scrape_time_and_failures_are_skipped():
+    registry = MetricsRegistry()
+    state = {"items": 1}
+
+    @registry.collector
+    def items():
+        yield Family("items", "gauge", "Stored items").add(state["items"])
+
+    @registry.collector
+    def broken():
+        raise RuntimeError("component gone")
+
+    state["items"] = 5
+    assert registry.render() == "# HELP items Stored items\n# TYPE items gauge\nitems 5\n"
+
+
+def test_sampled_requests_keep_their_stage_breakdown(tmp_path):
+    path = tmp_path / "profile.jsonl"
+    profiler = StageProfiler(sample_rate=1.0, path=str(path))
+    with profiler.request("chat"):
+        with span("rag_search"):
+            pass
+        record_stage("llm_first_token", 0.25)
+
+    [breakdown] = profiler.recent
+    assert breakdown["endpoint"] == "chat" and breakdown["error"] is None
+    assert [stage for stage, _ in breakdown["stages"]] == ["rag_search", "llm_first_token"]
+    assert len(path.read_text().splitlines()) == 1
+
+    unsampled = StageProfiler(sample_rate=0.0)
+    with unsampled.request("chat"):
+        record_stage("llm", 0.1)
+    assert (unsampled.sampled, list(unsampled.recent)) == (0, [])
+
+
+async def no_github():
+    return {"username": "stub", "repositories": [], "recent_activity": []}
+
+
+class StubLLM:
+    async def complete(self, messages, **kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="A stub reply"))])
+
+
+def sample(text: str, name: str, **labels) -> float:
+    selector = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{name}{{{re.escape(selector)}}} (\S+)$", text, re.MULTILINE)
+    assert match, f"{name}{{{selector}}} missing"
+    return float(match.group(1))
+
+
+def test_metrics_endpoint_reports_each_stage(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    from fastapi.testclient import TestClient
+    from app import main
+    from app.response_cache import ResponseCache
+
+    monkeypatch.setattr(main.pipeline, "llm", StubLLM())
+    monkeypatch.setattr(main.pipeline, "response_cache", ResponseCache())
+    monkeypatch.setattr(main.refresher, "follower_wait", 0)
+    monkeypatch.setattr(main.refresher.fetcher, "get_github_context", no_github)
+    client = TestClient(main.app)
+
+    before = client.get("/metrics").text
+    assert client.post("/chat", json={"message": "tell me about his projects"}).json()["response"] == \
+        "<p>A stub reply</p>"
+    response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    for stage in ("fast_path", "rag_search", "memory", "context", "prompt", "llm", "markdown"):
+        assert sample(text, "chatbot_stage_seconds_count", stage=stage) >= 1
+        assert sample(text, "chatbot_stage_seconds_bucket", stage=stage, le="+Inf") == \
+            sample(text, "chatbot_stage_seconds_count", stage=stage)
+    chats = sample(text, "chatbot_request_seconds_count", endpoint="chat")
+    assert chats == (sample(before, "chatbot_request_seconds_count", endpoint="chat")
+                     if 'endpoint="chat"' in before else 0) + 1
+    assert "# TYPE chatbot_llm_in_flight gauge" in text
@@ -0,0 +1,67 @@
+"""StateCheckpointer restores every section or none of them."""
+import asyncio
+import pytest
+from app.github import GitHubCache
+from app.persistence import StateCheckpointer
+from app.response_cache import ResponseCache
+from mcp.context import ContextManager
+from mcp.protocol import MCPProtocol
+from mcp.store import ContextStore
+
+
+def make_components():
+    protocol = MCPProtocol()
+    return {
+        "protocol": protocol,
+        "context_store": ContextStore(protocol),
+        "github_cache": GitHubCache(),
+        "response_cache": ResponseCache()
+    }
+
+
+def save(path, components) -> None:
+    asyncio.run(StateCheckpointer(path, components).save())
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    path = str(tmp_path / "state.ckpt")
+    components = make_components()
+    context = ContextManager(components["protocol"], components["context_store"])
+    for n in range(3):
+        context.add_user_message(f"question {n}", "session")
+    components["github_cache"].store("https://api.github.test/repos", 200, {"ETag": '"v1"'}, ["repo"])
+    components["response_cache"].put("key", "text", "<p>text</p>")
+    save(path, components)
+    return path
+
+
+def test_every_section_is_restored(checkpoint):
+    components = make_components()
+    checkpointer = StateCheckpointer(checkpoint, components)
+
+    assert checkpointer.restore()
+    assert len(components["protocol"].get_context_items()) == 3
+    assert components["context_store"].total_items == 3
+    assert list(components["github_cache"].entries) == ["https://api.github.test/repos"]
+    assert list(components["response_cache"].entries) == ["key"]
+    assert checkpointer.restored_sections == 4
+
+
+def test_a_failing_section_rolls_back_the_ones_before_it(checkpoint, monkeypatch):
+    components = make_components()
+
+    def broken(state):
+        raise ValueError("corrupt section")
+
+    # The protocol and the store are loaded by then
+    monkeypatch.setattr(components["github_cache"], "load_state", broken)
+    checkpointer = StateCheckpointer(checkpoint, components)
+
+    assert not checkpointer.restore()
+    assert checkpointer.last_error == "corrupt section"
+    assert checkpointer.restored_sections == 0
+    assert components["protocol"].get_context_items() == []
+    assert components["protocol"].relevance.stats()["items"] == 0
+    assert (components["context_store"].total_items, components["context_store"].sessions) == (0, {})
+    assert components["response_cache"].entries == {}
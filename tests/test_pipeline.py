@@ -0,0 +1,68 @@
+"""Where RequestPipeline runs its lookups, and how it coalesces identical streams."""
+import asyncio
+import threading
+from app.pipeline import RequestPipeline
+from app.response_cache import ResponseCache
+from mcp.memory import MemoryManager
+from mcp.protocol import MCPProtocol
+from mcp.sqlite_memory import SQLiteMemoryBackend
+
+
+def lookup_thread(manager: MemoryManager) -> int:
+    pipeline = RequestPipeline(None, None, None, manager, None, None, None)
+    threads = []
+    lookup = manager.get_prompt_memories
+
+    def recording(query, limit=None):
+        threads.append(threading.get_ident())
+        return lookup(query, limit)
+
+    manager.get_prompt_memories = recording
+    manager.add_important_fact("The stub likes tea")
+    assert [memory.content for memory in asyncio.run(pipeline._memories("tea"))] == ["The stub likes tea"]
+    return threads[0]
+
+
+def test_in_memory_lookup_runs_on_the_event_loop():
+    # The protocol it reads is changed on the loop
+    assert lookup_thread(MemoryManager(MCPProtocol())) == threading.get_ident()
+
+
+def test_sqlite_lookup_runs_in_a_worker_thread(tmp_path):
+    manager = MemoryManager(MCPProtocol(), SQLiteMemoryBackend(str(tmp_path / "memory.db")))
+    assert lookup_thread(manager) != threading.get_ident()
+    manager.close()
+
+
+class FailingOnceLLM:
+    """Streams one word after a short delay; the first call fails instead."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def stream(self, messages, **kwargs):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(0.05)
+        if call == 1:
+            raise RuntimeError("upstream failed")
+        yield "hello"
+
+
+def test_one_waiter_takes_over_a_failed_stream():
+    llm = FailingOnceLLM()
+    pipeline = RequestPipeline(None, None, None, None, None, ResponseCache(), llm)
+    messages = [{"role": "system", "content": "stub"}, {"role": "user", "content": "hi"}]
+
+    async def collect():
+        return [event async for event in pipeline.stream_reply("hi", messages)]
+
+    async def scenario():
+        return await asyncio.gather(*(collect() for _ in range(4)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert isinstance(results[0], RuntimeError)
+    assert [[kind for kind, _ in events] for events in results[1:]] == [["delta", "end"]] * 3
+    assert {events[-1][1].text for events in results[1:]} == {"hello"}
+    # The failed call and the one that replaced it; the rest waited for it
+    assert llm.calls == 2
@@ -0,0 +1,41 @@
+"""How RAGIntegration splits several source files into sections."""
+from rag_integration import RAGIntegration
+
+
+def write(directory, name, text):
+    path = directory / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_each_file_is_parsed_on_its_own(tmp_path):
+    first = write(tmp_path, "info.txt", "Name: Stub\nSkills:\nPython\n")
+    second = write(tmp_path, "notes.md", "A file without a header.\n")
+    rag = RAGIntegration([first, second], vector_cache_dir="")
+
+    assert rag.sections == {
+        "general": "Name: Stub",
+        "skills": "Python",
+        "notes": "A file without a header."
+    }
+
+
+def test_a_header_in_several_files_keeps_the_lines_of_each(tmp_path):
+    first = write(tmp_path, "a.txt", "Projects:\nFirst project\nSkills:\nPython\n")
+    second = write(tmp_path, "b.txt", "Projects:\nSecond project\n")
+    rag = RAGIntegration([first, second], vector_cache_dir="")
+
+    assert rag.sections["projects"] == "First project\nSecond project"
+    assert "First project" in rag.search_content("first project")["content"]
+    assert "Second project" in rag.search_content("second project")["content"]
+
+
+def test_readme_sections_do_not_collide_with_headers(tmp_path):
+    source = write(tmp_path, "info.txt", "Stub readme:\nA header that looks like a README section.\n")
+    rag = RAGIntegration(source, vector_cache_dir="")
+    rag.update_readmes([{"name": "Stub", "readme": "Install the stub with pip.", "updated_at": "1"}])
+
+    assert rag.sections == {"stub readme": "A header that looks like a README section."}
+    assert set(rag.index.sections) == {"stub readme", "stub README"}
+    assert "pip" in rag.search_content("install pip")["content"]
+    assert "looks like" in rag.search_content("header looks")["content"]
@@ -0,0 +1,60 @@
+"""The on-disk cache of VectorIndex (NumPy is required for semantic and hybrid mode)."""
+import os
+import pytest
+from rag_integration import RAGIntegration
+
+np = pytest.importorskip("numpy")
+from rag_vectors import VectorIndex, document_frequencies  # noqa: E402
+
+
+def cache_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".npy"))
+
+
+def make_rag(tmp_path, text="Skills:\nPython and Go\nEducation:\nA degree in engineering\n"):
+    source = tmp_path / "info.txt"
+    source.write_text(text)
+    return RAGIntegration(str(source), mode="semantic", vector_cache_dir=str(tmp_path / "cache")), source
+
+
+def test_matrix_and_document_frequencies_are_cached_together(tmp_path):
+    rag, _ = make_rag(tmp_path)
+    key = VectorIndex.cache_key(rag.index, rag.vectors.embedder.dim)
+    assert cache_files(tmp_path / "cache") == [f"{key}.df.npy", f"{key}.npy"]
+
+    restarted, _ = make_rag(tmp_path)
+    assert isinstance(restarted.vectors.matrix, np.memmap)
+    assert np.array_equal(restarted.vectors.df, document_frequencies(rag.vectors.matrix))
+    assert np.array_equal(restarted.vectors.idf, rag.vectors.idf)
+
+
+def test_missing_document_frequencies_are_recounted_once(tmp_path):
+    rag, _ = make_rag(tmp_path)
+    key = VectorIndex.cache_key(rag.index, rag.vectors.embedder.dim)
+    os.remove(tmp_path / "cache" / f"{key}.df.npy")
+
+    restarted, _ = make_rag(tmp_path)
+    assert np.array_equal(restarted.vectors.df, rag.vectors.df)
+    assert f"{key}.df.npy" in cache_files(tmp_path / "cache")
+
+
+def test_reload_removes_superseded_cache_files(tmp_path):
+    rag, source = make_rag(tmp_path)
+    (tmp_path / "cache" / "notes.txt").write_text("not a cache file")
+    source.write_text("Skills:\nPython, Go and Rust\nHobbies:\nChess\n")
+    os.utime(source, ns=(1, 1))
+    assert rag.reload_if_changed()
+
+    key = VectorIndex.cache_key(rag.index, rag.vectors.embedder.dim)
+    assert cache_files(tmp_path / "cache") == [f"{key}.df.npy", f"{key}.npy"]
+    assert (tmp_path / "cache" / "notes.txt").exists()
+    # Updated incrementally, the frequencies match a full count
+    assert np.array_equal(rag.vectors.df, document_frequencies(rag.vectors.matrix))
+    assert rag.search_content("chess")["found"]
+
+
+def test_query_synonyms_reach_their_section(tmp_path):
+    rag, _ = make_rag(tmp_path)
+
+    # "study" stands for "education" in rag_index.SYNONYMS
+    assert [section for _, section, _ in rag.vectors.search("where does he study", top_k=1)] == ["education"]
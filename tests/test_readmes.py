@@ -0,0 +1,100 @@
+"""README passages: how they are chunked and when they are re-indexed."""
+import pytest
+import rag_integration
+from rag_index import chunk_passages
+from rag_integration import RAGIntegration
+
+
+def paragraph(word: str, count: int) -> str:
+    return " ".join(f"{word}{i}" for i in range(count))
+
+
+def test_long_paragraphs_are_split_into_passages_of_the_given_size():
+    passages = chunk_passages(paragraph("w", 25), words=10)
+
+    assert [len(passage.split()) for passage in passages] == [10, 10, 5]
+    assert " ".join(passages) == paragraph("w", 25)
+
+
+def test_short_paragraphs_are_merged_until_half_a_passage():
+    text = "one two\n\nthree four\n\nfive six\n\nseven"
+
+    assert chunk_passages(text, words=10) == ["one two three four five six", "seven"]
+
+
+def test_headings_start_a_new_passage():
+    text = "# Stub\nA small tool.\n\n## Install\npip install stub\n\n## Usage\nRun it."
+
+    assert chunk_passages(text, words=80) == [
+        "# Stub A small tool.",
+        "## Install pip install stub",
+        "## Usage Run it."
+    ]
+
+
+def test_markup_is_stripped_and_passages_are_capped():
+    text = "![build](https://ci/badge.svg) <b>Fast</b> stub\n\n" + "\n\n".join(
+        f"# Part {i}\nBody" for i in range(10))
+    passages = chunk_passages(text, words=80, limit=4)
+
+    assert passages[0] == "Fast stub"
+    assert len(passages) == 4
+
+
+def repo(name: str, readme: str, updated_at: str = "2024-01-01", etag: str = None) -> dict:
+    return {"name": name, "readme": readme, "updated_at": updated_at, "readme_etag": etag}
+
+
+@pytest.fixture
+def rag(tmp_path):
+    source = tmp_path / "info.txt"
+    source.write_text("Skills:\nPython\n")
+    return RAGIntegration([str(source)], vector_cache_dir="")
+
+
+@pytest.fixture
+def chunked(monkeypatch):
+    """READMEs passed to ``chunk_passages`` by ``update_readmes``."""
+    calls = []
+
+    def counting(text, *args):
+        calls.append(text)
+        return chunk_passages(text, *args)
+
+    monkeypatch.setattr(rag_integration, "chunk_passages", counting)
+    return calls
+
+
+def test_unchanged_repositories_are_not_rechunked(rag, chunked):
+    repositories = [repo("Stub", "Install the stub with pip.", etag='"a"'),
+                    repo("Other", "Another readme.", etag='"b"')]
+    assert rag.update_readmes(repositories)
+    version = rag.version
+
+    assert not rag.update_readmes([dict(r) for r in repositories])
+    assert (len(chunked), rag.version) == (2, version)
+
+    assert rag.update_readmes([repo("Stub", "Install the stub with pip.", etag='"c"'), repositories[1]])
+    assert rag.update_readmes([repo("Stub", "Install the stub with pip.", "2024-02-01", '"c"'), repositories[1]])
+    assert chunked[2:] == ["Install the stub with pip."] * 2
+
+
+def test_readme_without_etag_is_fingerprinted_by_content(rag, chunked):
+    assert rag.update_readmes([repo("Stub", "First readme.")])
+    assert not rag.update_readmes([repo("Stub", "First readme.")])
+    assert rag.update_readmes([repo("Stub", "Second readme.")])
+
+    assert chunked == ["First readme.", "Second readme."]
+    assert "Second" in rag.search_content("second readme")["content"]
+
+
+def test_removed_repositories_lose_their_readme_section(rag, chunked):
+    rag.update_readmes([repo("Stub", "Install the stub with pip."), repo("Other", "Deploy with docker.")])
+    assert set(rag.index.sections) == {"skills", "stub README", "other README"}
+
+    assert rag.update_readmes([repo("Other", "Deploy with docker.")])
+    assert set(rag.index.sections) == {"skills", "other README"}
+    assert rag.stats()["readmes"] == 1
+    assert "pip" not in rag.search_content("install pip")["content"]
+    assert "docker" in rag.search_content("deploy docker")["content"]
+    assert len(chunked) == 2
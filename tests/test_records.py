@@ -0,0 +1,23 @@
+"""Converting protocol records to Pydantic models and back."""
+from mcp.context import USER_MESSAGE_METADATA
+from mcp.protocol import ContextItem, MCPProtocol
+from mcp.records import ContextRecord, MemoryRecord
+
+
+def test_exported_ids_keep_their_type_and_round_trip():
+    protocol = MCPProtocol()
+    item_id = protocol.new_id()
+    protocol.add_context_item(ContextRecord(item_id, "user_message", "hello", USER_MESSAGE_METADATA,
+                                            1.0, 1.0, "user", 1.0))
+    protocol.add_memory_item(MemoryRecord("a1b2", "fact", "likes tea", {}, 1.0, 1.0))
+
+    context = protocol.export_context()
+    memory = protocol.export_memory()
+    assert context.items[0].id == item_id and isinstance(context.items[0].id, int)
+    assert memory.items[0].id == "a1b2"
+
+    restored = MCPProtocol()
+    restored.add_context_item(ContextItem.model_validate_json(context.items[0].model_dump_json()))
+    restored.add_memory_item(memory.items[0])
+    assert restored.get_context_item(item_id).content == "hello"
+    assert restored.get_memory_item("a1b2").content == "likes tea"
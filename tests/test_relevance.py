@@ -0,0 +1,21 @@
+"""RelevanceIndex ranking."""
+from mcp.relevance import RelevanceIndex
+from mcp.records import ContextRecord
+
+
+def test_tied_scores_with_mixed_id_types_rank():
+    relevance = RelevanceIndex()
+    for item_id in (1, "legacy-id", 2):
+        relevance.add(ContextRecord(item_id, "user_message", "same words", {}, 0.0, 0.0, "user", 1.0), at=0.0)
+
+    ranked = relevance.rank("same words", 3)
+    assert sorted(map(str, (item_id for _, item_id in ranked))) == ["1", "2", "legacy-id"]
+    assert len({score for score, _ in ranked}) == 1
+
+
+def test_terms_are_folded_like_rag_lines():
+    relevance = RelevanceIndex()
+    relevance.add(ContextRecord(1, "user_message", "Which projects use Docker?", {}, 0.0, 0.0, "user", 1.0), at=0.0)
+
+    # Plurals fold and stop words ("tell", "about") are dropped, as in rag_index.tokenize
+    assert relevance.matches("tell me about the project") == {1: 1.0}
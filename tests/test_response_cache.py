@@ -0,0 +1,125 @@
+"""ResponseCache single-flight, failure handling, expiry, eviction and keys."""
+import asyncio
+import time
+from app.response_cache import ENTRY_OVERHEAD_BYTES, ResponseCache
+
+
+def chat(system: str, message: str):
+    return [{"role": "system", "content": system}, {"role": "user", "content": message}]
+
+
+def test_concurrent_identical_misses_make_one_upstream_call():
+    cache = ResponseCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "text", "<p>text</p>"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [cached for _, cached in results] == [False, True, True, True, True]
+    assert len({id(entry) for entry, _ in results}) == 1
+    assert (cache.misses, cache.coalesced) == (5, 4)
+
+
+def test_fail_wakes_waiters_with_the_error():
+    cache = ResponseCache()
+    error = ValueError("upstream failed")
+
+    async def scenario():
+        assert cache.claim("key")
+        assert not cache.claim("key")
+        future = cache.inflight("key")
+        waiter = asyncio.create_task(cache.wait("key"))
+        await asyncio.sleep(0)
+        cache.fail("key", error)
+        return future, await waiter
+
+    future, waited = asyncio.run(scenario())
+    assert future.exception() is error
+    # The waiter is released without a reply and nothing is left in flight
+    assert waited is None
+    assert cache.inflight("key") is None
+
+
+def test_failed_computation_is_retried_by_one_waiter():
+    cache = ResponseCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        if len(calls) == 1:
+            raise ValueError("upstream failed")
+        return "text", "<p>text</p>"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(4)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert isinstance(results[0], ValueError)
+    assert {entry.text for entry, _ in results[1:]} == {"text"}
+    assert len(calls) == 2
+
+
+def test_cancelled_computation_fails_its_waiters():
+    cache = ResponseCache()
+
+    async def scenario():
+        cache.claim("key")
+        future = cache.inflight("key")
+        cache.fail("key", asyncio.CancelledError())
+        return future
+
+    assert isinstance(asyncio.run(scenario()).exception(), RuntimeError)
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResponseCache(ttl=0.05)
+    cache.put("key", "text", "<p>text</p>")
+
+    assert asyncio.run(cache.get("key")).text == "text"
+    time.sleep(0.06)
+    assert asyncio.run(cache.get("key")) is None
+    assert (cache.entries, cache.bytes) == ({}, 0)
+
+
+def test_least_recently_used_entries_are_evicted_beyond_max_bytes():
+    size = len("a") + len("<p>a</p>") + ENTRY_OVERHEAD_BYTES
+    cache = ResponseCache(max_bytes=3 * size)
+    for key in "abc":
+        cache.put(key, key, f"<p>{key}</p>")
+    # Reading "a" makes "b" the least recently used
+    asyncio.run(cache.get("a"))
+    cache.put("d", "d", "<p>d</p>")
+
+    assert list(cache.entries) == ["c", "a", "d"]
+    assert (cache.bytes, cache.evictions) == (3 * size, 1)
+
+
+def test_oversized_and_disabled_entries_are_not_stored():
+    cache = ResponseCache(max_bytes=100)
+    cache.put("key", "x" * 100, "")
+    assert cache.entries == {}
+
+    disabled = ResponseCache(ttl=0)
+    disabled.put("key", "text", "<p>text</p>")
+    assert disabled.entries == {}
+
+
+def test_changed_system_prompt_misses():
+    cache = ResponseCache()
+    key = cache.key("What are his projects?", chat("snapshot 1", "What are his projects?"))
+    cache.put(key, "text", "<p>text</p>")
+
+    # The same question, normalized
+    assert cache.key("  what are his PROJECTS ", chat("snapshot 1", "what are his PROJECTS")) == key
+    changed = cache.key("What are his projects?", chat("snapshot 2", "What are his projects?"))
+    assert changed != key
+    assert asyncio.run(cache.get(changed)) is None
@@ -0,0 +1,158 @@
+"""Leader election and failover between worker processes sharing one SQLite file."""
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import pytest
+import app.github
+from app.github import AsyncGitHubFetcher, GitHubCache
+from app.shared import SharedState
+from app.snapshot import LEADER_LEASE, SnapshotRefresher
+from benchmarks.stubs import StubGitHub
+from rag_integration import RAGIntegration
+from tests.conftest import ROOT
+
+# Runs in a separate worker process; prints one JSON result
+WORKER = """
+import json, os, sys, time
+from app.shared import SharedState
+path, action, ttl = sys.argv[1], sys.argv[2], float(sys.argv[3])
+state = SharedState(path, owner=f"worker-{os.getpid()}")
+if action == "race":
+    start = float(sys.argv[4])
+    time.sleep(max(0.0, start - time.time()))
+    print(json.dumps({"owner": state.owner, "leading": state.try_lead("job", ttl)}))
+elif action == "lead_and_die":
+    leading = state.try_lead("job", ttl)
+    state.publish("github", {"username": "from-" + state.owner})
+    state.put_response("key", "text", "html", time.time() + 60)
+    print(json.dumps({"owner": state.owner, "leading": leading}))
+    sys.stdout.flush()
+    # Exit without releasing, as a crashed worker would
+    os._exit(0)
+elif action == "lead_and_close":
+    print(json.dumps({"owner": state.owner, "leading": state.try_lead("job", ttl)}))
+    state.close()
+"""
+
+
+def run_worker(path, action, ttl, *args) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-c", WORKER, str(path), action, str(ttl), *map(str, args)],
+                            cwd=ROOT, stdout=subprocess.PIPE, text=True)
+
+
+def result(process: subprocess.Popen) -> dict:
+    out, _ = process.communicate(timeout=30)
+    assert process.returncode == 0
+    return json.loads(out)
+
+
+def test_one_leader_among_racing_processes(tmp_path):
+    path = tmp_path / "shared.db"
+    SharedState(str(path)).conn.close()
+    start = time.time() + 1.0
+    results = [result(process) for process in [run_worker(path, "race", 30, start) for _ in range(4)]]
+
+    leaders = [r["owner"] for r in results if r["leading"]]
+    assert len(leaders) == 1
+    observer = SharedState(str(path), owner="observer")
+    assert not observer.try_lead("job", 30)
+    owner = observer.conn.execute("SELECT owner FROM leases WHERE name = 'job'").fetchone()[0]
+    assert owner == leaders[0]
+
+
+def test_follower_takes_over_once_a_dead_leader_lease_expires(tmp_path):
+    path = tmp_path / "shared.db"
+    dead = result(run_worker(path, "lead_and_die", 1.0))
+    assert dead["leading"]
+
+    follower = SharedState(str(path), owner="follower")
+    assert not follower.try_lead("job", 1.0)
+    # What the leader published survives it
+    version, payload, _ = follower.fetch("github")
+    assert (version, payload) == (1, {"username": "from-" + dead["owner"]})
+    assert follower.get_response("key")[0] == "text"
+
+    time.sleep(1.1)
+    assert follower.try_lead("job", 1.0)
+    assert follower.leading == {"job": True}
+    assert follower.fetch("github", newer_than=version) is None
+
+
+def test_closed_leader_hands_over_at_once(tmp_path):
+    path = tmp_path / "shared.db"
+    assert result(run_worker(path, "lead_and_close", 60))["leading"]
+
+    assert SharedState(str(path), owner="next").try_lead("job", 60)
+
+
+def test_expired_responses_are_dropped_by_the_sweep(tmp_path):
+    state = SharedState(str(tmp_path / "shared.db"))
+    state.put_response("old", "text", "html", time.time() - 1)
+    state.put_response("new", "text", "html", time.time() + 60)
+
+    assert state.get_response("old") is None
+    assert state.expire_responses() == 1
+    assert state.stats()["responses"] == 1
+
+
+@pytest.fixture
+def github(monkeypatch):
+    stub = StubGitHub(repos=2, readme_size=200).start()
+    monkeypatch.setattr(app.github, "GITHUB_API_URL", stub.url)
+    monkeypatch.setenv("GITHUB_USER", "stub")
+    yield stub
+    stub.stop()
+
+
+def make_refresher(path, owner: str, sources) -> SnapshotRefresher:
+    return SnapshotRefresher(
+        AsyncGitHubFetcher(GitHubCache(ttl=0), timeout=2),
+        RAGIntegration(sources, vector_cache_dir=""),
+        interval=60.0,
+        rag_poll_interval=0,
+        shared=SharedState(str(path), owner=owner),
+        shared_poll_interval=0.2,
+        follower_wait=0
+    )
+
+
+def test_refreshers_fail_over_between_workers(tmp_path, github):
+    path = tmp_path / "shared.db"
+    source = tmp_path / "info.txt"
+    source.write_text("About Me\nA stub profile.\n")
+    leader = make_refresher(path, "leader", [str(source)])
+    follower = make_refresher(path, "follower", [str(source)])
+
+    async def scenario():
+        snapshot = await leader.refresh()
+        assert leader.leading and snapshot.version == 1
+        calls = github.calls
+
+        # The follower adopts the published context without calling GitHub
+        assert await follower.sync_shared()
+        assert not follower.leading
+        assert follower.snapshot.github["repositories"] == snapshot.github["repositories"]
+        assert github.calls == calls
+        # Its age is that of the leader's fetch, not of the adoption
+        assert follower.snapshot.created_at == pytest.approx(snapshot.created_at, abs=0.5)
+
+        # The leader stops renewing; the follower takes over after the lease ttl
+        await asyncio.sleep(3 * follower._poll_interval + 0.1)
+        github.repos[0]["description"] = "changed"
+        github.generation += 1
+        assert await follower.sync_shared()
+        assert follower.shared.leading[LEADER_LEASE]
+        assert github.calls > calls
+        assert follower.snapshot.github["repositories"][0]["description"] == "changed"
+
+        # The old leader finds it lost the lease and adopts the new version
+        assert await leader.sync_shared()
+        assert not leader.leading
+        assert leader.snapshot.github == follower.snapshot.github
+
+        for refresher in (leader, follower):
+            await refresher.fetcher.aclose()
+
+    asyncio.run(scenario())
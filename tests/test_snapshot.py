@@ -0,0 +1,73 @@
+"""SnapshotRefresher behaviour when the GitHub fetch fails."""
+import asyncio
+from app.snapshot import SnapshotRefresher
+from rag_integration import RAGIntegration
+
+
+class FlakyFetcher:
+    """Returns a GitHub context until ``fail`` is set."""
+
+    def __init__(self):
+        self.fail = False
+
+    async def get_github_context(self):
+        if self.fail:
+            raise RuntimeError("GitHub is down")
+        return {"username": "stub", "repositories": [], "recent_activity": ["PushEvent"]}
+
+
+def make_refresher(tmp_path, fetcher) -> SnapshotRefresher:
+    source = tmp_path / "info.txt"
+    source.write_text("About Me\nA stub profile.\n")
+    return SnapshotRefresher(fetcher, RAGIntegration([str(source)], vector_cache_dir=""), rag_poll_interval=0)
+
+
+def test_failed_refresh_keeps_the_previous_snapshot(tmp_path):
+    fetcher = FlakyFetcher()
+    refresher = make_refresher(tmp_path, fetcher)
+
+    async def scenario():
+        first = await refresher.refresh()
+        fetcher.fail = True
+        second = await refresher.refresh()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert second is first
+    assert (second.version, second.github["recent_activity"]) == (1, ["PushEvent"])
+    assert refresher.last_error == "GitHub is down"
+
+
+def test_first_snapshot_is_built_even_if_the_fetch_fails(tmp_path):
+    fetcher = FlakyFetcher()
+    fetcher.fail = True
+    refresher = make_refresher(tmp_path, fetcher)
+
+    snapshot = asyncio.run(refresher.current())
+    assert refresher.ready and snapshot.version == 1
+    assert "A stub profile." in snapshot.rag_context
+    assert refresher.last_error == "GitHub is down"
+
+    fetcher.fail = False
+    assert asyncio.run(refresher.refresh()).version == 2
+    assert refresher.last_error is None
+
+
+def test_rag_reload_keeps_the_github_age(tmp_path):
+    fetcher = FlakyFetcher()
+    refresher = make_refresher(tmp_path, fetcher)
+
+    async def scenario():
+        first = await refresher.refresh()
+        fetcher.fail = True
+        await refresher.refresh()
+        (tmp_path / "info.txt").write_text("About Me\nAn updated stub profile.\n")
+        assert await refresher.refresh_rag()
+        return first
+
+    first = asyncio.run(scenario())
+    snapshot = refresher.snapshot
+    assert snapshot.version == 2 and "An updated stub profile." in snapshot.rag_context
+    # The GitHub context is as old as before the reload
+    assert snapshot.created_at == first.created_at
+    assert snapshot.github is first.github
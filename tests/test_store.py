@@ -0,0 +1,107 @@
+"""ContextStore caps, LRU eviction and payload pooling."""
+from mcp.context import ContextManager
+from mcp.protocol import MCPProtocol
+from mcp.store import ITEM_OVERHEAD_BYTES, ContextStore
+
+
+def make_context(**limits):
+    protocol = MCPProtocol()
+    store = ContextStore(protocol, **limits)
+    return protocol, store, ContextManager(protocol, store)
+
+
+def contents(protocol: MCPProtocol):
+    return [item.content for item in protocol.get_context_items()]
+
+
+def test_session_item_cap_evicts_its_oldest_items():
+    protocol, store, context = make_context(max_items_per_session=3)
+    for n in range(5):
+        context.add_user_message(f"message {n}", "a")
+    context.add_user_message("other", "b")
+
+    assert contents(protocol) == ["message 2", "message 3", "message 4", "other"]
+    assert store.session_item_ids("a") == [item.id for item in protocol.get_context_items()[:3]]
+    assert (store.total_items, store.evicted_items) == (4, 2)
+
+
+def test_session_byte_cap_evicts_its_oldest_items():
+    protocol, store, context = make_context(max_bytes_per_session=2 * (ITEM_OVERHEAD_BYTES + 10))
+    for n in range(3):
+        context.add_user_message(f"message {n:02}", "a")
+
+    assert contents(protocol) == ["message 01", "message 02"]
+    assert store.sessions["a"].bytes == 2 * (ITEM_OVERHEAD_BYTES + 10)
+
+
+def test_global_caps_evict_the_least_recently_used_session():
+    protocol, store, context = make_context(max_total_items=4)
+    context.add_user_message("a1", "a")
+    context.add_user_message("b1", "b")
+    context.add_user_message("c1", "c")
+    # "a" is used again, so "b" is now the least recently used
+    context.add_user_message("a2", "a")
+    context.add_user_message("c2", "c")
+
+    assert list(store.sessions) == ["a", "c"]
+    assert contents(protocol) == ["a1", "c1", "a2", "c2"]
+    assert (store.evicted_sessions, store.total_items) == (1, 4)
+
+
+def test_session_cap_evicts_the_least_recently_used_session():
+    protocol, store, context = make_context(max_sessions=2)
+    for session in "abc":
+        context.add_user_message(f"hello from {session}", session)
+
+    assert list(store.sessions) == ["b", "c"]
+    assert contents(protocol) == ["hello from b", "hello from c"]
+    assert protocol.get_context_item(store.session_item_ids("b")[0]).content == "hello from b"
+
+
+def test_a_lone_session_over_the_global_cap_loses_its_oldest_items():
+    protocol, store, context = make_context(max_total_items=2)
+    for n in range(4):
+        context.add_user_message(f"message {n}", "a")
+
+    assert contents(protocol) == ["message 2", "message 3"]
+    assert list(store.sessions) == ["a"]
+
+
+def test_dropped_session_items_leave_the_protocol():
+    protocol, store, context = make_context()
+    context.add_user_message("mine", "a")
+    context.add_user_message("theirs", "b")
+
+    assert context.end_session("a") == 1
+    assert contents(protocol) == ["theirs"]
+    assert store.stats()["items"] == 1
+
+
+def test_identical_payloads_are_pooled_once():
+    protocol, store, context = make_context()
+    snapshot = {"username": "stub", "repositories": [{"name": "project-0"}]}
+    for session in "abc":
+        context.add_github_context(snapshot, session)
+    # An equal copy is found by its content hash
+    context.add_github_context(dict(snapshot), "d")
+
+    items = protocol.get_context_items("github")
+    assert len(items) == 4
+    assert all(item.content is items[0].content for item in items)
+    [pooled] = store.payloads.values()
+    assert pooled.refcount == 4
+    assert store.dedup_hits == 3
+    # Each item is charged the overhead only; the payload is counted once
+    assert store.session_bytes == 4 * ITEM_OVERHEAD_BYTES
+    assert store.payload_bytes == pooled.size
+
+
+def test_pooled_payload_is_released_with_its_last_item():
+    protocol, store, context = make_context()
+    context.add_rag_context("About Me\nA stub profile.", "a")
+    context.add_rag_context("About Me\nA stub profile.", "b")
+
+    context.end_session("a")
+    assert len(store.payloads) == 1
+    context.end_session("b")
+    assert (store.payloads, store.payload_bytes, store.total_bytes) == ({}, 0, 0)